@@ -0,0 +1,178 @@
+"""Backtest statistics for trade exports: equity curve, drawdown, R histograms.
+
+Everything is computed in one pass over the export's columns and stored as
+a ``store`` derived artifact, so it is cached per file version (the cache
+entry is keyed by mtime/size) and recomputed only when the export changes.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from ingest import TIME_ALIASES, coalesce_number, coalesce_time, normalize_headers, normalize_name
+from signals import PNL_ALIASES
+
+EXIT_TIME_ALIASES = ("close_ts", "exit_time", "close_time", "exit_timestamp")
+BALANCE_ALIASES = ("balance_after", "balance", "equity")
+RISK_ALIASES = ("usd", "risk_usd", "risk")
+FEE_ALIASES = ("fee", "fees", "commission")
+MFE_ALIASES = ("mfe_r",)
+MAE_ALIASES = ("mae_r",)
+
+SOURCE_COLUMNS = tuple(dict.fromkeys(
+    EXIT_TIME_ALIASES + TIME_ALIASES + PNL_ALIASES + BALANCE_ALIASES
+    + RISK_ALIASES + FEE_ALIASES + MFE_ALIASES + MAE_ALIASES
+))
+
+# Lebar bin histogram dalam R; diperlebar (kelipatan 2) jika bin > MAX_BINS
+HIST_STEP = 0.25
+MAX_BINS = 80
+HISTOGRAMS = ("r", "mfe", "mae")
+
+STATS = (
+    "trades", "wins", "losses", "breakeven", "win_rate",
+    "net_pnl", "gross_profit", "gross_loss", "profit_factor",
+    "expectancy", "expectancy_r", "avg_win", "avg_loss", "fees",
+    "start_balance", "end_balance", "max_drawdown", "max_drawdown_pct",
+)
+
+
+def histogram(values: np.ndarray, step: float = HIST_STEP, max_bins: int = MAX_BINS) -> Dict[str, np.ndarray]:
+    """Counts over ``step``-aligned bins covering the finite values."""
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {"edges": np.zeros(0), "counts": np.zeros(0, dtype=np.int64)}
+    lo = np.floor(values.min() / step) * step
+    hi = np.floor(values.max() / step) * step + step
+    while (hi - lo) / step > max_bins:
+        step *= 2
+        lo = np.floor(values.min() / step) * step
+        hi = np.floor(values.max() / step) * step + step
+    edges = lo + step * np.arange(int(round((hi - lo) / step)) + 1)
+    counts, _ = np.histogram(values, bins=edges)
+    return {"edges": edges, "counts": counts.astype(np.int64)}
+
+
+def equity_curve(time: np.ndarray, pnl: np.ndarray, balance: Optional[np.ndarray] = None):
+    """Equity after each close (last value per timestamp) and its drawdown.
+
+    ``time``/``pnl``/``balance`` must already be in close order.  The
+    reported ``balance_after`` is used when present on every trade,
+    otherwise equity is the running sum of ``pnl`` from 0.
+    """
+    if balance is not None and len(balance) and np.isfinite(balance).all():
+        equity = balance.astype(np.float64)
+        start = float(equity[0] - pnl[0])
+    else:
+        start = 0.0
+        equity = start + np.cumsum(pnl)
+    last = np.r_[time[1:] != time[:-1], True] if len(time) else np.zeros(0, dtype=bool)
+    time, equity = time[last], equity[last]
+    peak = np.maximum.accumulate(np.r_[start, equity])[1:]
+    drawdown = equity - peak
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown_pct = np.where(peak > 0, drawdown / peak * 100.0, np.nan)
+    return {
+        "time": time.astype(np.int64),
+        "equity": equity,
+        "drawdown": drawdown,
+        "drawdown_pct": drawdown_pct,
+    }, start
+
+
+def compute(df) -> Dict[str, np.ndarray]:
+    """Curve, histograms and summary stats for a normalized-header frame."""
+    pnl = coalesce_number(df, PNL_ALIASES, default=None)
+    time = coalesce_time(df, EXIT_TIME_ALIASES + TIME_ALIASES)
+    keep = np.flatnonzero(np.isfinite(pnl) & np.isfinite(time))
+    # Ekuitas terealisasi saat posisi ditutup -> urut waktu close
+    order = keep[np.argsort(time[keep], kind="stable")]
+    pnl, time = pnl[order], time[order].astype(np.int64)
+
+    balance = None
+    if any(a in df.columns for a in BALANCE_ALIASES):
+        balance = coalesce_number(df, BALANCE_ALIASES, default=None)[order]
+    risk = coalesce_number(df, RISK_ALIASES, default=None)[order]
+    fee = coalesce_number(df, FEE_ALIASES)[order]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(risk > 0, pnl / risk, np.nan)
+
+    curve, start = equity_curve(time, pnl, balance)
+    wins, losses = pnl > 0, pnl < 0
+    n = len(pnl)
+    gross_profit = float(pnl[wins].sum())
+    gross_loss = float(pnl[losses].sum())
+    stats = {
+        "trades": n,
+        "wins": int(wins.sum()),
+        "losses": int(losses.sum()),
+        "breakeven": int(n - wins.sum() - losses.sum()),
+        "win_rate": wins.sum() / n if n else np.nan,
+        "net_pnl": float(pnl.sum()),
+        "gross_profit": gross_profit,
+        "gross_loss": gross_loss,
+        "profit_factor": gross_profit / -gross_loss if gross_loss < 0 else np.nan,
+        "expectancy": float(pnl.mean()) if n else np.nan,
+        "expectancy_r": float(np.nanmean(r)) if np.isfinite(r).any() else np.nan,
+        "avg_win": float(pnl[wins].mean()) if wins.any() else np.nan,
+        "avg_loss": float(pnl[losses].mean()) if losses.any() else np.nan,
+        "fees": float(fee.sum()),
+        "start_balance": start,
+        "end_balance": float(curve["equity"][-1]) if n else start,
+        "max_drawdown": float(curve["drawdown"].min()) if n else 0.0,
+        "max_drawdown_pct": float(np.nanmin(curve["drawdown_pct"])) if np.isfinite(curve["drawdown_pct"]).any() else np.nan,
+    }
+
+    out = {f"curve.{k}": v for k, v in curve.items()}
+    sources = {
+        "r": r,
+        "mfe": coalesce_number(df, MFE_ALIASES, default=None)[order],
+        "mae": coalesce_number(df, MAE_ALIASES, default=None)[order],
+    }
+    for name in HISTOGRAMS:
+        for k, v in histogram(sources[name]).items():
+            out[f"hist.{name}.{k}"] = v
+    for k in STATS:
+        out[f"stat.{k}"] = np.array([stats[k]], dtype=np.float64)
+    return out
+
+
+def analytics_from_entry(entry) -> Dict[str, np.ndarray]:
+    """``store`` derived builder for an export."""
+    wanted = set(SOURCE_COLUMNS)
+    columns = [c for c in entry.columns if normalize_name(c) in wanted]
+    return compute(normalize_headers(entry.frame(columns)))
+
+
+def _number(value: float):
+    value = float(value)
+    if not np.isfinite(value):
+        return None
+    return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
+
+
+def _nullable(values: np.ndarray) -> list:
+    return [v if np.isfinite(v) else None for v in np.asarray(values, dtype=np.float64).tolist()]
+
+
+def summary(arrays: Dict[str, np.ndarray]) -> dict:
+    return {k: _number(arrays[f"stat.{k}"][0]) for k in STATS}
+
+
+def payload(name: str, arrays: Dict[str, np.ndarray]) -> dict:
+    return {
+        "export": name,
+        "summary": summary(arrays),
+        "equity": {
+            "time": arrays["curve.time"].tolist(),
+            "equity": _nullable(arrays["curve.equity"]),
+            "drawdown": _nullable(arrays["curve.drawdown"]),
+            "drawdown_pct": _nullable(arrays["curve.drawdown_pct"]),
+        },
+        "histograms": {
+            h: {
+                "edges": arrays[f"hist.{h}.edges"].tolist(),
+                "counts": arrays[f"hist.{h}.counts"].tolist(),
+            }
+            for h in HISTOGRAMS
+        },
+    }
@@ -0,0 +1,422 @@
+"""Pre-compressed, ETag-validated responses for the page, static files,
+raw data files and API payloads.
+
+Bodies are compressed once (gzip, plus brotli/zstd when the ``brotli`` /
+``zstandard`` packages are installed) and reused; each request only
+negotiates an encoding and compares ``If-None-Match``, answering 304 when
+the client copy is current.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # opsional
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # opsional
+    zstandard = None
+
+# Urutan preferensi server bila q-value sama
+ENCODINGS = tuple(
+    enc for enc, lib in (("zstd", zstandard), ("br", brotli), ("gzip", gzip)) if lib is not None
+)
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# File lebih besar dari ini dilayani StaticFiles biasa (tanpa cache memori)
+MAX_CACHED_BYTES = 8 << 20
+# Body lebih kecil dari ini tidak dikompres (header lebih mahal dari hematnya)
+MIN_COMPRESS_BYTES = 1024
+
+# Level per pemakaian: aset kecil sekali jalan, file data besar, respons API
+BEST = {"gzip": 9, "br": 11, "zstd": 19}
+FILE = {"gzip": 6, "br": 6, "zstd": 10}
+FAST = {"gzip": 5, "br": 4, "zstd": 3}
+
+NO_CACHE = "no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
+COPY_CHUNK = 1 << 20
+
+
+def _compress(body: bytes, encoding: str, levels=BEST) -> bytes:
+    level = levels[encoding]
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _compress_file(src: str, dst: str, encoding: str, levels=FILE) -> None:
+    """Stream-compress ``src`` into ``dst`` without loading it into memory."""
+    level = levels[encoding]
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        if encoding == "zstd":
+            zstandard.ZstdCompressor(level=level).copy_stream(fin, fout)
+        elif encoding == "br":
+            comp = brotli.Compressor(quality=level)
+            for chunk in iter(lambda: fin.read(COPY_CHUNK), b""):
+                fout.write(comp.process(chunk))
+            fout.write(comp.finish())
+        else:
+            with gzip.GzipFile(fileobj=fout, mode="wb", compresslevel=level, mtime=0) as gz:
+                shutil.copyfileobj(fin, gz, COPY_CHUNK)
+
+
+def _tmp_name(path: str) -> str:
+    # Unik per proses/thread: worker lain bisa menyiapkan file yang sama bersamaan
+    return f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()[:32]
+
+
+def negotiate(accept_encoding: Optional[str], available) -> str:
+    """Best of ``available`` allowed by an Accept-Encoding header ("identity" if none)."""
+    if not accept_encoding:
+        return "identity"
+    quality: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        quality[token.strip().lower()] = q
+    best, best_q = "identity", 0.0
+    for enc in available:
+        q = quality.get(enc, quality.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` check (weak comparison, as RFC 9110 requires for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+
+class Asset:
+    """One in-memory body with its compressed variants and strong ETags."""
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str = NO_CACHE):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, f'"{digest}"')}
+        if media_type.startswith(COMPRESSIBLE) and len(body) >= MIN_COMPRESS_BYTES:
+            for enc in ENCODINGS:
+                packed = _compress(body, enc)
+                if len(packed) < len(body):
+                    # ETag kuat harus beda per content-coding
+                    self.variants[enc] = (packed, f'"{digest}-{enc}"')
+
+    def response(self, headers) -> Response:
+        encoding = negotiate(headers.get("accept-encoding"), [e for e in self.variants if e != "identity"])
+        body, etag = self.variants[encoding]
+        out = {"ETag": etag, "Cache-Control": self.cache_control}
+        if len(self.variants) > 1:
+            out["Vary"] = "Accept-Encoding"
+        if etag_matches(headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=out)
+        if encoding != "identity":
+            out["Content-Encoding"] = encoding
+        return Response(body, media_type=self.media_type, headers=out)
+
+
+class Page:
+    """A template file rendered to an ``Asset``; re-read only when it changes on disk."""
+
+    def __init__(self, path: str, media_type: str = "text/html"):
+        self.path = path
+        self.media_type = media_type
+        self._stamp = None
+        self._asset: Optional[Asset] = None
+
+    def asset(self) -> Asset:
+        st = os.stat(self.path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with open(self.path, "rb") as f:
+                self._asset = Asset(f.read(), self.media_type)
+            self._stamp = stamp
+        return self._asset
+
+    def response(self, headers) -> Response:
+        return self.asset().response(headers)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles serving small files from pre-compressed in-memory assets.
+
+    Files under one of ``immutable`` (path prefixes of versioned files, e.g.
+    ``vendor/``) get a one-year immutable Cache-Control; everything else is
+    ``no-cache`` so browsers revalidate with a cheap conditional request.
+    """
+
+    def __init__(self, *args, immutable: Tuple[str, ...] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable = tuple(immutable)
+        self._assets: Dict[str, Tuple[tuple, Asset]] = {}
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        if status_code != 200 or stat_result.st_size > MAX_CACHED_BYTES:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        path = os.fspath(full_path)
+        stamp = (stat_result.st_mtime_ns, stat_result.st_size)
+        cached = self._assets.get(path)
+        if cached is None or cached[0] != stamp:
+            media_type = mimetypes.guess_type(path)[0] or "text/plain"
+            rel = os.path.relpath(path, self.directory).replace(os.sep, "/")
+            cache = IMMUTABLE if rel.startswith(self.immutable) else NO_CACHE
+            with open(path, "rb") as f:
+                asset = Asset(f.read(), media_type, cache)
+            cached = (stamp, asset)
+            self._assets[path] = cached
+        return cached[1].response(Headers(scope=scope))
+
+
+class DataFiles(StaticFiles):
+    """StaticFiles for large raw files (CSV) with content-hash ETags.
+
+    The sha256 of each file version and its compressed variants are written
+    once under ``cache_dir`` (``<name>/<mtime_ns>-<size>.<enc>``) and served
+    from disk afterwards. ``Range`` requests are answered from the
+    uncompressed file; a matching ``If-None-Match`` returns 304.
+    """
+
+    def __init__(self, *args, cache_dir: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_dir = cache_dir
+        self._versions: Dict[str, Tuple[tuple, Dict[str, Tuple[str, str]]]] = {}
+        self._lock = threading.Lock()
+        self._path_locks: Dict[str, threading.Lock] = {}
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        return _DataFileResponse(self, os.fspath(full_path), stat_result)
+
+    def sweep(self) -> None:
+        """Drop cached variants of files that no longer exist."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, dirs, files in os.walk(self.cache_dir, topdown=False):
+            rel = os.path.relpath(root, self.cache_dir)
+            if rel != "." and files and not os.path.isfile(os.path.join(self.directory, rel)):
+                shutil.rmtree(root, ignore_errors=True)
+            elif rel != "." and not os.listdir(root):
+                os.rmdir(root)
+
+    def variants(self, path: str, stat_result) -> Dict[str, Tuple[str, str]]:
+        """``encoding -> (file, etag)`` for the current version of ``path``."""
+        stamp = (stat_result.st_mtime_ns, stat_result.st_size)
+        cached = self._versions.get(path)
+        if cached is not None and cached[0] == stamp:
+            metrics.cache("data_files", True)
+            return cached[1]
+        with self._lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+        with path_lock:
+            cached = self._versions.get(path)
+            metrics.cache("data_files", cached is not None and cached[0] == stamp)
+            if cached is None or cached[0] != stamp:
+                cached = (stamp, self._prepare(path, stamp))
+                self._versions[path] = cached
+        return cached[1]
+
+    def _prepare(self, path: str, stamp: tuple) -> Dict[str, Tuple[str, str]]:
+        rel = os.path.relpath(path, self.directory)
+        slot = os.path.join(self.cache_dir, rel)
+        os.makedirs(slot, exist_ok=True)
+        version = f"{stamp[0]}-{stamp[1]}"
+        # Versi lama (file sumber sudah berubah) tidak dipakai lagi
+        for name in os.listdir(slot):
+            if not name.startswith(version + "."):
+                os.remove(os.path.join(slot, name))
+
+        digest_path = os.path.join(slot, version + ".sha256")
+        if os.path.exists(digest_path):
+            with open(digest_path) as f:
+                digest = f.read().strip()
+        else:
+            with metrics.span("hash", bytes=stamp[1]):
+                digest = _file_digest(path)
+            tmp = _tmp_name(digest_path)
+            with open(tmp, "w") as f:
+                f.write(digest)
+            os.replace(tmp, digest_path)
+
+        out = {"identity": (path, f'"{digest}"')}
+        media_type = mimetypes.guess_type(path)[0] or "text/plain"
+        if not media_type.startswith(COMPRESSIBLE) or stamp[1] < MIN_COMPRESS_BYTES:
+            return out
+        for enc in ENCODINGS:
+            target = os.path.join(slot, f"{version}.{enc}")
+            if not os.path.exists(target):
+                tmp = _tmp_name(target)
+                with metrics.span("compress." + enc, bytes=stamp[1]):
+                    _compress_file(path, tmp, enc)
+                os.replace(tmp, target)
+            if os.path.getsize(target) < stamp[1]:
+                out[enc] = (target, f'"{digest}-{enc}"')
+        return out
+
+
+class _DataFileResponse:
+    """ASGI response picking a ``DataFiles`` variant (hashing/compressing off the loop)."""
+
+    def __init__(self, owner: DataFiles, path: str, stat_result):
+        self.owner = owner
+        self.path = path
+        self.stat_result = stat_result
+
+    async def __call__(self, scope, receive, send):
+        files = await anyio.to_thread.run_sync(self.owner.variants, self.path, self.stat_result)
+        request = Headers(scope=scope)
+        media_type = mimetypes.guess_type(self.path)[0] or "text/plain"
+        # Range selalu atas representasi asli (offset byte file CSV)
+        if request.get("range"):
+            encoding = "identity"
+        else:
+            encoding = negotiate(request.get("accept-encoding"), [e for e in files if e != "identity"])
+        file, etag = files[encoding]
+        headers = {"ETag": etag, "Cache-Control": NO_CACHE}
+        if len(files) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(request.get("if-none-match"), etag):
+            response = Response(status_code=304, headers=headers)
+        elif encoding == "identity":
+            response = FileResponse(file, stat_result=self.stat_result, media_type=media_type, headers=headers)
+        else:
+            headers["Content-Encoding"] = encoding
+            response = FileResponse(file, media_type=media_type, headers=headers)
+        await response(scope, receive, send)
+
+
+class ConditionalMiddleware:
+    """ETag, 304 and negotiated compression for GET responses under ``prefix``
+    whose content type is one of ``media_types`` (JSON by default).
+
+    The body is buffered and hashed, so an unchanged payload costs a
+    few hundred bytes on the wire; compressed bodies are kept in a small
+    LRU keyed by content hash so repeated payloads are compressed once.
+    """
+
+    def __init__(self, app, prefix: str = "/api/", cache_bytes: int = 64 << 20,
+                 media_types: Tuple[str, ...] = ("application/json",)):
+        self.app = app
+        self.prefix = prefix
+        self.media_types = tuple(media_types)
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._cached = 0
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        request = Headers(scope=scope)
+        start = None
+        body = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    message["status"] != 200
+                    or "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(self.media_types)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._finish(start, b"".join(body), request, send)
+
+        await self.app(scope, receive, capture)
+
+    async def _finish(self, start, body: bytes, request: Headers, send) -> None:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        available = ENCODINGS if len(body) >= MIN_COMPRESS_BYTES else ()
+        encoding = negotiate(request.get("accept-encoding"), available)
+        etag = f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+        headers["ETag"] = etag
+        headers.setdefault("Cache-Control", NO_CACHE)
+        if available:
+            headers.append("Vary", "Accept-Encoding")
+        if etag_matches(request.get("if-none-match"), etag):
+            del headers["Content-Length"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if encoding != "identity":
+            body = await self._compressed(digest, encoding, body)
+            headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(body))
+        await send({"type": "http.response.start", "status": 200, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _compressed(self, digest: str, encoding: str, body: bytes) -> bytes:
+        key = (digest, encoding)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+        metrics.cache("compressed", hit is not None)
+        if hit is not None:
+            return hit
+        with metrics.span("compress." + encoding, bytes=len(body)):
+            if len(body) > COPY_CHUNK:
+                packed = await anyio.to_thread.run_sync(_compress, body, encoding, FAST)
+            else:
+                packed = _compress(body, encoding, FAST)
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = packed
+                self._cached += len(packed)
+            while self._cached > self.cache_bytes and self._cache:
+                _, old = self._cache.popitem(last=False)
+                self._cached -= len(old)
+        return packed
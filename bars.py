@@ -0,0 +1,98 @@
+"""Time-range slicing and candle aggregation over OHLCV column arrays.
+
+Arrays follow ``ingest.OHLCV_FIELDS``: ``time`` is int64 epoch seconds
+(sorted ascending), ``open/high/low/close/volume`` are float64.
+"""
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from ingest import OHLCV_FIELDS
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+WEEK = 7 * DAY
+# 1970-01-01 hari Kamis; minggu dimulai Senin (1970-01-05)
+WEEK_OFFSET = 4 * DAY
+
+# Ukuran bar "rapi" yang dipakai saat range perlu diringkas
+BUCKET_LADDER = (
+    MINUTE, 5 * MINUTE, 15 * MINUTE, 30 * MINUTE,
+    HOUR, 2 * HOUR, 4 * HOUR, 6 * HOUR, 12 * HOUR,
+    DAY, 2 * DAY, 3 * DAY, WEEK, 2 * WEEK, 4 * WEEK, 13 * WEEK, 52 * WEEK,
+)
+
+
+def bucket_start(time: np.ndarray, seconds: int) -> np.ndarray:
+    """Start of the ``seconds``-wide bucket containing each time (weeks start Monday)."""
+    offset = WEEK_OFFSET if seconds % WEEK == 0 else 0
+    return (time - offset) // seconds * seconds + offset
+
+
+def base_interval(time: np.ndarray) -> int:
+    """Typical spacing between bars (median diff), 0 if unknown."""
+    if len(time) < 2:
+        return 0
+    return int(np.median(np.diff(time[: min(len(time), 10_000)])))
+
+
+def window(cols: Dict[str, np.ndarray], start: Optional[int] = None,
+           end: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Bars with ``start <= time <= end`` (binary search, no copy)."""
+    time = cols["time"]
+    lo = 0 if start is None else int(np.searchsorted(time, start, side="left"))
+    hi = len(time) if end is None else int(np.searchsorted(time, end, side="right"))
+    return {k: cols[k][lo:hi] for k in OHLCV_FIELDS}
+
+
+def aggregate(cols: Dict[str, np.ndarray], buckets: np.ndarray) -> Dict[str, np.ndarray]:
+    """Merge consecutive bars sharing a bucket value into one candle.
+
+    First open, max high, min low, last close, summed volume; the candle
+    time is the bucket value.
+    """
+    n = len(buckets)
+    if n == 0:
+        return {k: cols[k][:0] for k in OHLCV_FIELDS}
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return {
+        "time": np.asarray(buckets[starts], dtype=np.int64),
+        "open": np.asarray(cols["open"])[starts],
+        "high": np.maximum.reduceat(cols["high"], starts),
+        "low": np.minimum.reduceat(cols["low"], starts),
+        "close": np.asarray(cols["close"])[ends],
+        "volume": np.add.reduceat(cols["volume"], starts),
+    }
+
+
+def pick_bucket(span: int, max_bars: int, minimum: int = 0) -> int:
+    """Smallest ladder size that fits ``span`` seconds into ``max_bars`` bars."""
+    need = max(span / max(max_bars, 1), minimum)
+    for size in BUCKET_LADDER:
+        if size >= need and size > minimum:
+            return size
+    return int(np.ceil(need / BUCKET_LADDER[-1])) * BUCKET_LADDER[-1]
+
+
+def downsample(cols: Dict[str, np.ndarray], max_bars: int,
+               source: Optional[Callable[[int], Optional[Dict[str, np.ndarray]]]] = None):
+    """Aggregate ``cols`` to at most ~``max_bars`` candles.
+
+    ``source(size)`` may return pre-aggregated bars that nest into ``size``
+    (e.g. a pyramid level covering the same range) to aggregate from instead
+    of ``cols``.  Returns ``(cols, interval)``; ``interval`` is 0 when the
+    bars were returned unchanged.
+    """
+    time = cols["time"]
+    if len(time) <= max_bars:
+        return cols, 0
+    span = int(time[-1] - time[0]) + 1
+    size = pick_bucket(span, max_bars, minimum=base_interval(time))
+    while True:
+        src = (source(size) if source is not None else None) or cols
+        out = aggregate(src, bucket_start(src["time"], size))
+        if len(out["time"]) <= max_bars:
+            return out, size
+        size = pick_bucket(span, max_bars, minimum=size)
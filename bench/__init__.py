@@ -0,0 +1 @@
+"""Synthetic data generator (``bench.generate``) and benchmark runner (``bench.run``)."""
@@ -0,0 +1,213 @@
+"""Synthetic OHLCV and trade-export CSVs in the layout of the files in data/.
+
+Bars are a 15m random walk written as ``sample_ohlcv.csv`` is
+(``timestamp,open,high,low,close,volume``); trades use the full
+``*_export.csv`` header.  Both files are produced chunk by chunk, so any
+size up to 10^8 rows is written in bounded memory.  Trade outcomes are not
+random: SL/TP, ``close_ts`` and ``mfe_R``/``mae_R`` are resolved against the
+generated bars with ``replay.path_stats`` (trades still open at the end of a
+chunk are closed there as ``BE``), so the exports replay cleanly.
+
+CLI::
+
+    python -m bench.generate 1e6 --trades-per-bar 0.05 --out bench/.work/data
+"""
+import argparse
+import os
+import sys
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import replay
+from signals import BUY, SELL
+
+START = np.datetime64("2024-01-01T00:00:00", "s").astype(np.int64)
+INTERVAL = 900
+CHUNK_ROWS = 1 << 20
+MAX_HOLD_BARS = 96
+TRADES_PER_BAR = 0.05
+
+EXPORT_COLUMNS = (
+    "timestamp", "signal", "price", "sl", "tp", "rr", "thr_rr_adx_p40", "thr_rr_adx_p60",
+    "thr_rr_bbw_p40", "thr_rr_bbw_p50", "thr_rr_dir_p30", "thr_rr_dir_p70", "entry_kind",
+    "stop_dist", "outcome", "close_ts", "quality", "entry_hour", "entry_dow", "trend_entry",
+    "rsi_entry", "ma20_slope3_entry", "roc3_entry", "vwap_prox_entry", "dir_r2_abs_entry",
+    "flip_rate24_entry", "trend_flip_during", "bars_trend", "bars_chop", "bars_neutral",
+    "mfe_R", "mae_R", "regime_entry", "ADX_entry", "ATR_rel_entry", "VOL_mult_entry",
+    "MA_gap_pct_entry", "bb_pctb_entry", "bb_bw_entry", "bb_mid_slope_entry", "rsi_bin",
+    "bbpos_bin", "bbbw_bin", "atrrel_bin", "vwap_side", "vwap_dev_bps", "rr_bucket",
+    "cohort_id", "pause_state_open", "qty", "locked_margin", "usd", "risk_scale", "exit_kind",
+    "fee", "pnl", "balance_after", "probe_after_streak", "skipped", "governance_skip",
+    "hour_utc", "dow",
+)
+# Nilai kategori seperti di export asli
+CATEGORIES = {
+    "entry_kind": ("limit_maker", "market_taker_fallback"),
+    "regime_entry": ("trend", "chop", "neutral"),
+    "rsi_bin": ("rsi_<30", "rsi_30_40", "rsi_40_50", "rsi_50_60", "rsi_60_70", "rsi_>=70"),
+    "bbpos_bin": ("bbpos_low20", "bbpos_20_40", "bbpos_40_60", "bbpos_60_80", "bbpos_top20"),
+    "bbbw_bin": ("bbbw_thin", "bbbw_mid", "bbbw_thick"),
+    "atrrel_bin": ("atr_low", "atr_mid", "atr_high"),
+    "vwap_side": ("vwap_below", "vwap_above"),
+}
+RR_CHOICES = np.array([1.5, 1.7, 2.0])
+TAKER_FEE = 0.0004
+
+
+def _timestamps(secs: np.ndarray, iso_ms: bool = False) -> np.ndarray:
+    text = np.datetime_as_string(secs.astype("datetime64[s]"), unit="s")
+    if iso_ms:
+        return np.char.add(text, ".000Z")
+    return np.char.add(np.char.replace(text, "T", " "), "+00:00")
+
+
+def ohlcv_chunks(bars: int, seed: int = 0, chunk: int = CHUNK_ROWS) -> Iterator[Dict[str, np.ndarray]]:
+    """Random-walk bars, ``chunk`` at a time (same series for the same seed)."""
+    rng = np.random.default_rng(seed)
+    last = 100.0
+    for lo in range(0, bars, chunk):
+        n = min(chunk, bars - lo)
+        close = last * np.exp(np.cumsum(rng.normal(0.0, 0.003, n)))
+        open_ = np.r_[last, close[:-1]]
+        wick = np.abs(rng.normal(0.0, 0.0015, (2, n))) * close
+        last = float(close[-1])
+        yield {
+            "time": START + (lo + np.arange(n, dtype=np.int64)) * INTERVAL,
+            "open": open_,
+            "high": np.maximum(open_, close) + wick[0],
+            "low": np.minimum(open_, close) - wick[1],
+            "close": close,
+            "volume": rng.gamma(2.0, 40.0, n),
+        }
+
+
+def trades_for(bars: Dict[str, np.ndarray], n: int, rng: np.random.Generator,
+               balance: float) -> Tuple[pd.DataFrame, float]:
+    """``n`` export rows entered on ``bars`` and resolved against them."""
+    nb = len(bars["time"])
+    entry_bar = np.sort(rng.integers(0, max(nb - 1, 1), n))
+    side = np.where(rng.random(n) < 0.5, BUY, SELL).astype(np.int8)
+    buy = side == BUY
+    price = bars["open"][entry_bar]
+    stop = (bars["high"] - bars["low"])[entry_bar] * rng.uniform(2.0, 6.0, n)
+    rr = rng.choice(RR_CHOICES, n)
+    sl = np.where(buy, price - stop, price + stop)
+    tp = np.where(buy, price + rr * stop, price - rr * stop)
+
+    hold = np.minimum(MAX_HOLD_BARS, nb - entry_bar)
+    touch = replay.path_stats(bars["high"], bars["low"], entry_bar, hold, side, sl, tp)
+    first_sl, first_tp = touch["first_sl"], touch["first_tp"]
+    # SL dianggap duluan jika tersentuh di bar yang sama dengan TP
+    is_sl = (first_sl >= 0) & ((first_tp < 0) | (first_sl <= first_tp))
+    is_tp = ~is_sl & (first_tp >= 0)
+    exit_off = np.where(is_sl, first_sl, np.where(is_tp, first_tp, hold - 1))
+    exit_bar = entry_bar + exit_off
+    path = replay.path_stats(bars["high"], bars["low"], entry_bar, exit_off + 1, side, sl, tp)
+    mfe = np.maximum(np.where(buy, path["high"] - price, price - path["low"]) / stop, 0.0)
+    mae = np.maximum(np.where(buy, price - path["low"], path["high"] - price) / stop, 0.0)
+
+    usd = rng.uniform(5.0, 30.0, n)
+    qty = usd / stop
+    exit_price = np.where(is_sl, sl, np.where(is_tp, tp, bars["close"][exit_bar]))
+    fee = np.where(is_tp, 0.0, qty * exit_price * TAKER_FEE)
+    pnl = np.where(buy, exit_price - price, price - exit_price) * qty - fee
+    balance_after = balance + np.cumsum(pnl)
+
+    entry_time = bars["time"][entry_bar]
+    hour = (entry_time // 3600) % 24
+    dow = (entry_time // 86400 + 3) % 7  # 1970-01-01 Kamis, 0 = Senin
+    rsi = rng.uniform(10.0, 90.0, n)
+    u = lambda lo, hi: rng.uniform(lo, hi, n)
+    pick = lambda name: np.asarray(CATEGORIES[name])[rng.integers(0, len(CATEGORIES[name]), n)]
+    frame = pd.DataFrame({
+        "timestamp": _timestamps(entry_time, iso_ms=True),
+        "signal": np.where(buy, "BUY", "SELL"),
+        "price": price, "sl": sl, "tp": tp, "rr": rr,
+        "thr_rr_adx_p40": 15, "thr_rr_adx_p60": 20, "thr_rr_bbw_p40": 0.006,
+        "thr_rr_bbw_p50": 0.008, "thr_rr_dir_p30": 0.05, "thr_rr_dir_p70": 0.2,
+        "entry_kind": pick("entry_kind"),
+        "stop_dist": stop,
+        "outcome": np.where(is_sl, "SL", np.where(is_tp, "TP", "BE")),
+        "close_ts": _timestamps(bars["time"][exit_bar] + INTERVAL, iso_ms=True),
+        "quality": rng.integers(1, 5, n), "entry_hour": hour, "entry_dow": dow,
+        "trend_entry": rng.integers(0, 2, n), "rsi_entry": rsi,
+        "ma20_slope3_entry": u(-1, 1), "roc3_entry": u(-0.01, 0.01), "vwap_prox_entry": u(0, 3),
+        "dir_r2_abs_entry": u(0, 1), "flip_rate24_entry": u(0, 0.3),
+        "trend_flip_during": rng.integers(0, 2, n), "bars_trend": rng.integers(0, 48, n),
+        "bars_chop": rng.integers(0, 48, n), "bars_neutral": rng.integers(0, 12, n),
+        "mfe_R": mfe, "mae_R": mae,
+        "regime_entry": pick("regime_entry"), "ADX_entry": u(10, 70), "ATR_rel_entry": u(0.5, 2),
+        "VOL_mult_entry": u(0.2, 3), "MA_gap_pct_entry": u(-0.05, 0.05), "bb_pctb_entry": u(0, 1),
+        "bb_bw_entry": u(0.005, 0.08), "bb_mid_slope_entry": np.nan,
+        "rsi_bin": np.asarray(CATEGORIES["rsi_bin"])[np.minimum((rsi - 20) // 10, 5).clip(0).astype(int)],
+        "bbpos_bin": pick("bbpos_bin"), "bbbw_bin": pick("bbbw_bin"), "atrrel_bin": pick("atrrel_bin"),
+        "vwap_side": pick("vwap_side"), "vwap_dev_bps": rng.normal(0, 80, n),
+        "rr_bucket": np.where(rr < 1.6, "rr_1.2_1.6", "rr_1.6_2.2"),
+        "cohort_id": rng.integers(1, 4, n),
+        "pause_state_open": '{"BUY":false,"SELL":false,"micro":false}',
+        "qty": qty, "locked_margin": qty * price / 75.0, "usd": usd, "risk_scale": 1,
+        "exit_kind": np.where(is_tp, "limit_maker_tp", "market_taker_stop"),
+        "fee": fee, "pnl": pnl, "balance_after": balance_after,
+        "probe_after_streak": np.where(rng.random(n) < 0.2, "True", ""),
+        "skipped": np.nan, "governance_skip": np.nan,
+        "hour_utc": hour, "dow": dow,
+    }, columns=list(EXPORT_COLUMNS))
+    return frame, float(balance_after[-1]) if n else balance
+
+
+def generate(directory: str, bars: int, trades_per_bar: float = TRADES_PER_BAR,
+             seed: int = 0, force: bool = False) -> Tuple[str, str]:
+    """Write ``bench_<bars>_ohlcv.csv`` and ``bench_<bars>_export.csv``; returns dataset names.
+
+    Existing files of the same size/seed are reused unless ``force``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    stem = f"bench_{bars}_s{seed}"
+    names = (f"{stem}_ohlcv", f"{stem}_export")
+    paths = [os.path.join(directory, n + ".csv") for n in names]
+    if not force and all(os.path.exists(p) for p in paths):
+        return names
+
+    total = int(round(bars * trades_per_bar))
+    rng = np.random.default_rng(seed + 1)
+    balance, done, written = 1000.0, 0, 0
+    with open(paths[0] + ".part", "w", newline="") as fo, \
+            open(paths[1] + ".part", "w", encoding="utf-8", newline="") as ft:
+        fo.write("timestamp,open,high,low,close,volume\n")
+        ft.write("\ufeff," + ",".join(EXPORT_COLUMNS) + "\n")
+        for cols in ohlcv_chunks(bars, seed):
+            ohlcv = pd.DataFrame({k: cols[k] for k in ("open", "high", "low", "close", "volume")})
+            ohlcv.insert(0, "timestamp", _timestamps(cols["time"]))
+            ohlcv.to_csv(fo, header=False, index=False, float_format="%.4f")
+            done += len(cols["time"])
+            n = int(round(total * done / bars)) - written
+            if n > 0:
+                frame, balance = trades_for(cols, n, rng, balance)
+                frame.index = np.arange(written, written + n)
+                frame.to_csv(ft, header=False)
+                written += n
+    for p in paths:
+        os.replace(p + ".part", p)
+    return names
+
+
+def _size(text: str) -> int:
+    return int(float(text))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic OHLCV + trade export CSVs")
+    parser.add_argument("bars", type=_size, help="OHLCV rows, e.g. 1e6")
+    parser.add_argument("--trades-per-bar", type=float, default=TRADES_PER_BAR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="data", help="directory (default: data/)")
+    args = parser.parse_args(argv)
+    for name in generate(args.out, args.bars, args.trades_per_bar, args.seed, force=True):
+        print(os.path.join(args.out, name + ".csv"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Time the data path at growing sizes and keep the results in a JSON history.
+
+For every size a synthetic OHLCV file and trade export (``bench.generate``)
+go through each stage on a cold cache: ingest, OHLCV parsing and pyramid
+aggregation, classification, analytics, replay, an SL/TP sweep over
+``SWEEP_GRID`` and a cohort pivot.  Then
+every chart endpoint is called through the FastAPI ``app`` with an
+in-process ``TestClient`` (first call, median of warm calls, payload size
+decoded and on the wire).  Each run is appended to ``bench/history.json``
+with the commit it ran on and compared with the last run of the same size.
+
+    python -m bench.run --sizes 1e4,1e5,1e6 [--repeat 5] [--fresh]
+
+The app runs inside ``bench/.work`` (its own data/ and cache/), so the real
+data and cache are untouched; generated CSVs are kept there for the next run.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+WORK = os.path.join(HERE, ".work")
+HISTORY = os.path.join(HERE, "history.json")
+DEFAULT_SIZES = "1e4,1e5,1e6"
+# Lebih lambat dari ini (rasio dan selisih absolut) dibanding run sebelumnya -> regresi
+REGRESSION = 1.25
+MIN_SECONDS = 0.01
+# Grid stage/endpoint sweep: 3 stop x 3 R:R = 9 kombinasi
+SWEEP_GRID = {"sl": "0.5,1,1.5", "rr": "1,2,3"}
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _commit() -> Optional[str]:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                      stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD", "--"], cwd=ROOT,
+                                stderr=subprocess.DEVNULL) != 0
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return sha + ("-dirty" if dirty else "")
+
+
+def _max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _prepare_workdir() -> None:
+    """Fresh cache/ in bench/.work, with the repo's templates/ and static/."""
+    os.makedirs(os.path.join(WORK, "data"), exist_ok=True)
+    shutil.rmtree(os.path.join(WORK, "cache"), ignore_errors=True)
+    for name in ("templates", "static"):
+        link = os.path.join(WORK, name)
+        if not os.path.lexists(link):
+            try:
+                os.symlink(os.path.join(ROOT, name), link, target_is_directory=True)
+            except OSError:
+                shutil.copytree(os.path.join(ROOT, name), link)
+
+
+def stages(main, ohlcv: str, export: str) -> dict:
+    """Cold-cache seconds per processing stage (same calls the endpoints make)."""
+    import cohorts
+    import analytics
+    import ingest
+    import pyramid
+    import replay
+    import signals
+    import sweep
+
+    store, out = main.store, {}
+    out["ingest_ohlcv"], entry_o = _timed(store.entry, main._dataset_path(ohlcv))
+    out["parse_ohlcv"], _ = _timed(ingest.load_ohlcv, entry_o)
+    out["aggregate_pyramid"], _ = _timed(entry_o.derived, "pyramid", pyramid.build)
+    out["ingest_export"], entry_e = _timed(store.entry, main._dataset_path(export))
+    out["classify"], _ = _timed(entry_e.derived, "signals", signals.signals_from_entry)
+    out["analytics"], _ = _timed(entry_e.derived, "analytics", analytics.analytics_from_entry)
+    out["replay"], _ = _timed(entry_e.derived, replay.derived_name(entry_o),
+                              lambda e: replay.replay_entry(e, ingest.load_ohlcv(entry_o)))
+    spec, marks = sweep.grid(**SWEEP_GRID), entry_e.derived("signals", signals.signals_from_entry)
+    out["sweep"], _ = _timed(entry_e.derived, sweep.derived_name(entry_o, spec, replay.MAX_OPEN_BARS),
+                             lambda e: sweep.from_signals(marks, ingest.load_ohlcv(entry_o), spec))
+    out["cohorts"], _ = _timed(cohorts.pivot, entry_e, ("rsi_bin", "vwap_side"))
+    return {k: round(v, 4) for k, v in out.items()}
+
+
+def endpoints(client, ohlcv: str, export: str, first_time: int, bars: int, repeat: int) -> dict:
+    """Latency (ms) and payload bytes of each chart endpoint."""
+    mid = first_time + bars // 2 * 900
+    urls = {
+        "page": "/",
+        "ohlcv_overview": f"/api/ohlcv?dataset={ohlcv}&max_bars=1500",
+        "ohlcv_zoom": f"/api/ohlcv?dataset={ohlcv}&from={mid}&to={mid + 1500 * 900}&max_bars=4500",
+        "ohlcv_full_bin": f"/api/ohlcv/{ohlcv}?format=bin",
+        "signals": f"/api/signals/{export}?ohlcv={ohlcv}",
+        "signals_bin": f"/api/signals/{export}?ohlcv={ohlcv}&format=bin",
+        "analytics": f"/api/analytics/{export}",
+        "trades": f"/api/trades/{export}",
+        "cohorts": f"/api/cohorts?export={export}&by=rsi_bin,vwap_side",
+        "replay": f"/api/replay/{export}?ohlcv={ohlcv}&mismatches_only=true",
+        "sweep": f"/api/sweep/{export}?ohlcv={ohlcv}&sl={SWEEP_GRID['sl']}&rr={SWEEP_GRID['rr']}",
+    }
+    headers = {"accept-encoding": "gzip"}
+    out = {}
+    for name, url in urls.items():
+        first, res = _timed(client.get, url, headers=headers)
+        warm = [_timed(client.get, url, headers=headers)[0] for _ in range(repeat)]
+        out[name] = {
+            "status": res.status_code,
+            "first_ms": round(first * 1000, 2),
+            "median_ms": round(statistics.median(warm) * 1000, 2) if warm else None,
+            "bytes": len(res.content),
+            "wire_bytes": int(res.headers.get("content-length", len(res.content))),
+        }
+    return out
+
+
+def bench_size(main, client, bars: int, trades_per_bar: float, repeat: int, fresh: bool) -> dict:
+    from bench.generate import START, generate
+
+    data_dir = os.path.join(WORK, "data")
+    gen_seconds, (ohlcv, export) = _timed(
+        lambda: generate(data_dir, bars, trades_per_bar, force=fresh))
+    size = lambda n: os.path.getsize(os.path.join(data_dir, n + ".csv"))
+    result = {
+        "bars": bars,
+        "trades": int(round(bars * trades_per_bar)),
+        "ohlcv_bytes": size(ohlcv),
+        "export_bytes": size(export),
+        "generate_s": round(gen_seconds, 3),
+        "stages": stages(main, ohlcv, export),
+        "endpoints": endpoints(client, ohlcv, export, int(START), bars, repeat),
+    }
+    result["max_rss_mb"] = _max_rss_mb()
+    return result
+
+
+def load_history(path: str = HISTORY) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(run: dict, history: list, threshold: float = REGRESSION) -> list:
+    """``(size, metric, before, after)`` for timings slower than the last run of that size."""
+    out = []
+    for size, now in run["sizes"].items():
+        before = next((r["sizes"][size] for r in reversed(history) if size in r["sizes"]), None)
+        if before is None:
+            continue
+        pairs = [(f"stage.{k}", before["stages"].get(k), v) for k, v in now["stages"].items()]
+        pairs += [(f"endpoint.{k}", before["endpoints"].get(k, {}).get("median_ms"), v["median_ms"])
+                  for k, v in now["endpoints"].items()]
+        for metric, old, new in pairs:
+            unit = 1000 * MIN_SECONDS if metric.startswith("endpoint.") else MIN_SECONDS
+            if old and new and new - old > unit and new > old * threshold:
+                out.append((size, metric, old, new))
+    return out
+
+
+def _report(run: dict) -> str:
+    lines = []
+    for size, r in run["sizes"].items():
+        lines.append(f"\n== {int(size):,} bars / {r['trades']:,} trades "
+                     f"({r['ohlcv_bytes'] / 1e6:.1f} MB + {r['export_bytes'] / 1e6:.1f} MB CSV)")
+        for k, v in r["stages"].items():
+            lines.append(f"  {k:<20} {v * 1000:>10.1f} ms")
+        lines.append(f"  {'endpoint':<20} {'first':>10} {'median':>10} {'bytes':>12} {'wire':>12}")
+        for k, v in r["endpoints"].items():
+            median = "-" if v["median_ms"] is None else f"{v['median_ms']:.1f}"
+            lines.append(f"  {k:<20} {v['first_ms']:>10.1f} {median:>10} {v['bytes']:>12,} "
+                         f"{v['wire_bytes']:>12,}" + ("" if v["status"] == 200 else f"  HTTP {v['status']}"))
+        lines.append(f"  max RSS {r['max_rss_mb']} MB")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingest/analytics/endpoints at scale")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="OHLCV rows per run (10^4 .. 10^8)")
+    parser.add_argument("--trades-per-bar", type=float, default=None, help="export rows per bar")
+    parser.add_argument("--repeat", type=int, default=5, help="warm calls per endpoint")
+    parser.add_argument("--fresh", action="store_true", help="regenerate the CSVs")
+    parser.add_argument("--history", default=HISTORY, help="JSON history file")
+    parser.add_argument("--no-save", action="store_true", help="do not append to the history")
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s.strip()]
+    history_path = os.path.abspath(args.history)
+    _prepare_workdir()
+    os.chdir(WORK)
+    sys.path.insert(0, ROOT)
+    from fastapi.testclient import TestClient
+    from bench.generate import TRADES_PER_BAR
+    import main as app_main
+
+    client = TestClient(app_main.app)
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    for bars in sizes:
+        run["sizes"][str(bars)] = bench_size(app_main, client, bars,
+                                             args.trades_per_bar or TRADES_PER_BAR,
+                                             args.repeat, args.fresh)
+    print(_report(run))
+
+    history = load_history(history_path)
+    slower = regressions(run, history)
+    for size, metric, old, new in slower:
+        print(f"REGRESSION {int(size):,} bars {metric}: {old} -> {new}")
+    if not args.no_save:
+        history.append(run)
+        with open(history_path + ".tmp", "w") as f:
+            json.dump(history, f, indent=1)
+        os.replace(history_path + ".tmp", history_path)
+        print(f"\nappended to {history_path} ({len(history)} runs)")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Content-addressed column chunks shared between ``store`` cache entries.
+
+Used for tables that are mostly re-runs of each other (backtest exports):
+every column is cut at content-defined row boundaries, each chunk is hashed
+and only chunks not stored before are appended to a new pack file.  An
+entry then keeps chunk references instead of column files, so disk use
+grows with what changed between runs.  Layout::
+
+    cache/.chunks/<pack>.pack      raw chunk bytes, immutable once written
+                  <pack>.idx.json  {chunk_id: [offset, nbytes]}
+
+Boundaries come from a hash of a per-row key (the first time column), so an
+inserted or dropped trade only changes the chunks around it instead of
+shifting every chunk after it.  Packs are memory-mapped; a column whose
+chunks sit back to back in one pack is returned as a zero-copy view.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Rata-rata baris per chunk (pangkat 2) dan batas bawah/atas
+TARGET_ROWS = 256
+MIN_ROWS = 64
+MAX_ROWS = 2048
+ALIGN = 8
+# Pack tanpa referensi baru dihapus jika lebih tua dari ini (build lain mungkin sedang jalan)
+GC_MIN_AGE = 3600
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: well-spread 64-bit hash of each key."""
+    x = values.astype(np.uint64, copy=True)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def cut_points(key: Optional[np.ndarray], rows: int) -> np.ndarray:
+    """Row offsets where chunks start; content-defined when ``key`` is given."""
+    if rows == 0:
+        return np.zeros(0, dtype=np.int64)
+    if key is None:
+        return np.arange(0, rows, TARGET_ROWS, dtype=np.int64)
+    h = _mix(np.asarray(key).view(np.int64))
+    # Potong setelah baris yang hash-nya jatuh di 1/TARGET_ROWS
+    candidates = np.flatnonzero((h & np.uint64(TARGET_ROWS - 1)) == 0) + 1
+    starts = [0]
+    for cut in candidates.tolist():
+        if cut >= rows:
+            break
+        while cut - starts[-1] > MAX_ROWS:
+            starts.append(starts[-1] + MAX_ROWS)
+        if cut - starts[-1] >= MIN_ROWS:
+            starts.append(cut)
+    while rows - starts[-1] > MAX_ROWS:
+        starts.append(starts[-1] + MAX_ROWS)
+    return np.asarray(starts, dtype=np.int64)
+
+
+def chunk_id(arr: np.ndarray) -> str:
+    h = hashlib.sha1(arr.dtype.str.encode())
+    h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+class ChunkStore:
+    def __init__(self, directory: str):
+        self.dir = directory
+        self._index: Dict[str, tuple] = {}
+        self._seen: set = set()
+        self._maps: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _refresh(self) -> None:
+        """Pick up packs written since the last call (also by other processes)."""
+        for name in os.listdir(self.dir):
+            if not name.endswith(".idx.json") or name in self._seen:
+                continue
+            pack = name[: -len(".idx.json")]
+            with open(os.path.join(self.dir, name)) as f:
+                for cid, (offset, nbytes) in json.load(f).items():
+                    self._index.setdefault(cid, (pack, offset, nbytes))
+            self._seen.add(name)
+
+    def pack(self, columns: Iterable[Tuple[str, np.ndarray]], starts: np.ndarray) -> Dict[str, List[list]]:
+        """Store the chunks of ``(name, array)`` columns cut at ``starts``.
+
+        New chunks of the whole table go into one pack; returns per column
+        ``[[id, pack, offset, rows], ...]``.
+        """
+        with self._lock:
+            self._refresh()
+            name = uuid.uuid4().hex
+            path = os.path.join(self.dir, name + ".pack")
+            new: Dict[str, list] = {}
+            alive = {name: True}
+            out_refs: Dict[str, List[list]] = {}
+            offset = 0
+            with open(path + ".tmp", "wb") as out:
+                for col, arr in columns:
+                    ends = np.r_[starts[1:], len(arr)].astype(np.int64)
+                    refs = []
+                    for a, b in zip(starts.tolist(), ends.tolist()):
+                        piece = np.ascontiguousarray(arr[a:b])
+                        cid = chunk_id(piece)
+                        hit = self._index.get(cid)
+                        if hit is not None and hit[0] not in alive:
+                            # Pack bisa saja sudah di-GC proses lain
+                            alive[hit[0]] = os.path.exists(os.path.join(self.dir, hit[0] + ".pack"))
+                        if hit is None or not alive[hit[0]]:
+                            pad = -offset % ALIGN
+                            out.write(b"\0" * pad)
+                            offset += pad
+                            out.write(piece.tobytes())
+                            hit = (name, offset, piece.nbytes)
+                            new[cid] = [offset, piece.nbytes]
+                            self._index[cid] = hit
+                            offset += piece.nbytes
+                        refs.append([cid, hit[0], hit[1], b - a])
+                    out_refs[col] = refs
+            if new:
+                os.replace(path + ".tmp", path)
+                idx = os.path.join(self.dir, name + ".idx.json")
+                with open(idx + ".tmp", "w") as f:
+                    json.dump(new, f)
+                os.replace(idx + ".tmp", idx)
+                self._seen.add(name + ".idx.json")
+            else:
+                os.remove(path + ".tmp")
+            return out_refs
+
+    def _map(self, pack: str) -> np.ndarray:
+        m = self._maps.get(pack)
+        if m is None:
+            m = np.memmap(os.path.join(self.dir, pack + ".pack"), dtype=np.uint8, mode="r")
+            self._maps[pack] = m
+        return m
+
+    def load(self, refs: List[list], dtype) -> np.ndarray:
+        """Column from chunk references; back-to-back chunks become one slice."""
+        dtype = np.dtype(dtype)
+        spans: List[list] = []
+        for _, pack, offset, rows in refs:
+            nbytes = rows * dtype.itemsize
+            if spans and spans[-1][0] == pack and spans[-1][1] + spans[-1][2] == offset:
+                spans[-1][2] += nbytes
+            else:
+                spans.append([pack, offset, nbytes])
+        pieces = [self._map(p)[o:o + n].view(dtype) for p, o, n in spans]
+        if len(pieces) == 1:
+            return pieces[0]
+        out = np.concatenate(pieces) if pieces else np.zeros(0, dtype=dtype)
+        out.flags.writeable = False
+        return out
+
+    def take(self, refs: List[list], dtype, rows: np.ndarray) -> np.ndarray:
+        """Values at ``rows`` of a column, reading only the chunks holding them."""
+        dtype = np.dtype(dtype)
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.cumsum([0] + [r[3] for r in refs])
+        which = np.searchsorted(starts, rows, side="right") - 1
+        out = np.empty(len(rows), dtype=dtype)
+        for c in np.unique(which).tolist():
+            _, pack, offset, n = refs[c]
+            piece = self._map(pack)[offset:offset + n * dtype.itemsize].view(dtype)
+            hit = which == c
+            out[hit] = piece[rows[hit] - starts[c]]
+        return out
+
+    def collect(self, referenced: Iterable[str], min_age: float = GC_MIN_AGE) -> List[str]:
+        """Delete packs no entry references (and old enough not to be mid-build)."""
+        keep = set(referenced)
+        now = time.time()
+        removed = []
+        with self._lock:
+            for name in os.listdir(self.dir):
+                path = os.path.join(self.dir, name)
+                if name.endswith(".tmp") and now - os.path.getmtime(path) >= min_age:
+                    os.remove(path)  # sisa build yang terhenti
+                if not name.endswith(".pack"):
+                    continue
+                pack = name[:-5]
+                if pack in keep or now - os.path.getmtime(path) < min_age:
+                    continue
+                for victim in (pack + ".idx.json", name):
+                    try:
+                        os.remove(os.path.join(self.dir, victim))
+                    except FileNotFoundError:
+                        pass
+                self._maps.pop(pack, None)
+                removed.append(pack)
+            if removed:
+                # Index dibangun ulang (chunk duplikat bisa ada di pack lain)
+                self._index, self._seen = {}, set()
+        return removed
@@ -0,0 +1,230 @@
+"""Win rate / pnl pivots of an export by its categorical features.
+
+Each group key becomes dense integer codes once per file version (``cat``
+columns already are codes; numeric ones such as ``hour_utc`` go through
+``np.unique``).  A one- or two-key pivot is then one ``np.bincount`` per
+metric over the combined cell code, and every result is memoized per
+(export version, keys, filter) in an LRU bounded by entries and by the
+bytes of its per-trade arrays, so re-opening a pivot or clicking one of
+its cells costs a dictionary lookup.
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import signals
+from analytics import RISK_ALIASES
+from ingest import normalize_name
+
+# Fitur kategorikal export yang ditawarkan di halaman (yang ada di file)
+FEATURES = (
+    "regime_entry", "rsi_bin", "bbpos_bin", "bbbw_bin", "atrrel_bin", "vwap_side",
+    "rr_bucket", "entry_kind", "exit_kind", "cohort_id", "hour_utc", "dow", "signal",
+)
+MAX_KEYS = 2
+MAX_CELLS = 10_000
+MEMO_ITEMS = 256
+# Batas total array per-trade (kode grup, cell) yang di-memo per proses
+MEMO_BYTES = 256 << 20
+
+_memo: "OrderedDict[tuple, tuple]" = OrderedDict()
+_memo_bytes = 0
+_memo_lock = threading.Lock()
+
+
+class BadQuery(ValueError):
+    pass
+
+
+def _nbytes(value) -> int:
+    """Bytes of the numpy arrays inside a memoized value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _memoized(key: tuple, build):
+    """LRU memo bounded by ``MEMO_ITEMS`` entries and ``MEMO_BYTES`` of arrays."""
+    global _memo_bytes
+    with _memo_lock:
+        hit = _memo.get(key)
+        if hit is not None:
+            _memo.move_to_end(key)
+            return hit[0]
+    value = build()
+    size = _nbytes(value)
+    with _memo_lock:
+        old = _memo.pop(key, None)
+        if old is not None:
+            _memo_bytes -= old[1]
+        _memo[key] = (value, size)
+        _memo_bytes += size
+        while _memo and (len(_memo) > MEMO_ITEMS or _memo_bytes > MEMO_BYTES):
+            _memo_bytes -= _memo.popitem(last=False)[1][1]
+    return value
+
+
+def features(entry) -> List[str]:
+    names = {normalize_name(c): c for c in entry.columns}
+    return [names[f] for f in FEATURES if f in names]
+
+
+def key_codes(entry, column: str) -> Tuple[np.ndarray, list]:
+    """Per-row group code (-1 = empty) and the label of each code."""
+    def build():
+        kind = entry.kind(column)
+        if kind == "cat":
+            return np.asarray(entry.array(column)).astype(np.int32), entry.categories(column).tolist()
+        if kind != "num":
+            raise BadQuery(f"Cannot group by time column: {column}")
+        values = np.asarray(entry.array(column), dtype=np.float64)
+        finite = np.isfinite(values)
+        uniq, inverse = np.unique(values[finite], return_inverse=True)
+        codes = np.full(len(values), -1, dtype=np.int32)
+        codes[finite] = inverse
+        labels = [int(v) if v.is_integer() else v for v in uniq.tolist()]
+        return codes, labels
+
+    return _memoized((entry.key, "codes", column), build)
+
+
+def parse_where(param: Optional[str]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """``col:a|b,col2:c`` -> ``(("col", ("a", "b")), ("col2", ("c",)))`` (sorted, hashable)."""
+    if not param:
+        return ()
+    out = {}
+    for part in param.split(","):
+        if not part.strip():
+            continue
+        col, sep, values = part.partition(":")
+        if not sep or not col.strip():
+            raise BadQuery(f"Bad filter (expected column:value|value): {part}")
+        out[col.strip()] = tuple(sorted(v.strip() for v in values.split("|")))
+    return tuple(sorted(out.items()))
+
+
+def _number_column(entry, aliases) -> Optional[str]:
+    names = {normalize_name(c): c for c in entry.columns}
+    for a in aliases:
+        col = names.get(a)
+        if col is not None and entry.kind(col) == "num":
+            return col
+    return None
+
+
+def _trade_values(entry, aliases, rows: np.ndarray) -> np.ndarray:
+    col = _number_column(entry, aliases)
+    if col is None:
+        return np.full(len(rows), np.nan)
+    return np.asarray(entry.array(col), dtype=np.float64)[rows]
+
+
+def _nested(values: np.ndarray) -> list:
+    """Float matrix as nested JSON lists (NaN -> null)."""
+    return np.array(signals.nullable(values.ravel()), dtype=object).reshape(values.shape).tolist()
+
+
+def pivot(entry, by: Sequence[str], where=()) -> dict:
+    """Memoized pivot of ``entry``'s trades (as classified by ``signals``).
+
+    Returns ``{"payload": ..., "cell": per-trade cell code (-1 = filtered
+    out), "axes": kept group codes per key}``; ``by`` are stored column names.
+    """
+    by = tuple(by)
+    if not 1 <= len(by) <= MAX_KEYS:
+        raise BadQuery(f"Group by 1 to {MAX_KEYS} columns")
+    return _memoized((entry.key, "pivot", by, where), lambda: _pivot(entry, by, where))
+
+
+def _pivot(entry, by: Tuple[str, ...], where) -> dict:
+    trades, _ = signals.split(entry.derived("signals", signals.signals_from_entry))
+    rows = np.asarray(trades["row"])
+    result = np.asarray(trades["result"])
+    n = len(rows)
+
+    keep = np.ones(n, dtype=bool)
+    for col, values in where:
+        codes, labels = key_codes(entry, col)
+        allowed = [i for i, label in enumerate(labels) if str(label) in values]
+        keep &= np.isin(codes[rows], allowed)
+
+    keys = [key_codes(entry, col) for col in by]
+    shape = [len(labels) + 1 for _, labels in keys]
+    labels_by_key = [labels + [None] for _, labels in keys]
+    size = int(np.prod(shape))
+    if size > MAX_CELLS:
+        raise BadQuery(f"Too many cells ({size}); group by coarser columns")
+    # int32 cukup: sel dibatasi MAX_CELLS
+    cell = np.zeros(n, dtype=np.int32)
+    for (codes, labels), width in zip(keys, shape):
+        # Kode kosong -> bucket terakhir (label null)
+        c = codes[rows]
+        cell = cell * width + np.where(c < 0, len(labels), c)
+
+    pnl = _trade_values(entry, signals.PNL_ALIASES, rows)
+    risk = _trade_values(entry, RISK_ALIASES, rows)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(risk > 0, pnl / risk, np.nan)
+
+    sel, pnl, r = cell[keep], pnl[keep], r[keep]
+    count = np.bincount(sel, minlength=size)
+    wins = np.bincount(sel, weights=result[keep] == signals.PROFIT, minlength=size)
+    losses = np.bincount(sel, weights=result[keep] == signals.LOSS, minlength=size)
+    pnl_sum = np.bincount(sel, weights=np.nan_to_num(pnl), minlength=size)
+    pnl_n = np.bincount(sel, weights=np.isfinite(pnl), minlength=size)
+    r_sum = np.bincount(sel, weights=np.nan_to_num(r), minlength=size)
+    r_n = np.bincount(sel, weights=np.isfinite(r), minlength=size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rate = np.where(count > 0, wins / count, np.nan)
+        avg_pnl = np.where(pnl_n > 0, pnl_sum / pnl_n, np.nan)
+        avg_r = np.where(r_n > 0, r_sum / r_n, np.nan)
+
+    # Hanya label yang punya trade (kategori kosong / bucket null dibuang)
+    grid = count.reshape(shape)
+    axes = [np.flatnonzero(grid.sum(axis=tuple(i for i in range(len(shape)) if i != k)) > 0)
+            for k in range(len(shape))]
+    index = np.ix_(*axes)
+
+    def matrix(values: np.ndarray) -> np.ndarray:
+        return values.reshape(shape)[index]
+
+    total_wins = int(wins.sum())
+    total = int(keep.sum())
+    payload = {
+        "by": list(by),
+        "where": {col: list(values) for col, values in where},
+        "labels": [[labels_by_key[k][i] for i in axes[k].tolist()] for k in range(len(by))],
+        "trades": matrix(count).tolist(),
+        "wins": matrix(wins).astype(np.int64).tolist(),
+        "losses": matrix(losses).astype(np.int64).tolist(),
+        "win_rate": _nested(matrix(win_rate)),
+        "pnl": _nested(matrix(pnl_sum)),
+        "avg_pnl": _nested(matrix(avg_pnl)),
+        "avg_r": _nested(matrix(avg_r)),
+        "total": {
+            "trades": total,
+            "wins": total_wins,
+            "win_rate": total_wins / total if total else None,
+            "pnl": float(pnl_sum.sum()),
+        },
+    }
+    return {"payload": payload, "cell": np.where(keep, cell, np.int32(-1)), "axes": axes, "shape": shape}
+
+
+def cell_trades(result: dict, cell: Sequence[int]) -> np.ndarray:
+    """Trade indices (``marker.trade`` numbering) in one pivot cell, by label positions."""
+    axes, shape = result["axes"], result["shape"]
+    if len(cell) != len(axes):
+        raise BadQuery(f"Cell needs {len(axes)} label positions")
+    code = 0
+    for k, i in enumerate(cell):
+        if not 0 <= i < len(axes[k]):
+            raise BadQuery(f"Cell position out of range: {i}")
+        code = code * shape[k] + int(axes[k][i])
+    return np.flatnonzero(result["cell"] == code)
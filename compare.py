@@ -0,0 +1,253 @@
+"""Side-by-side comparison of several trade exports (e.g. a parameter sweep).
+
+Each export is loaded in a worker process (column cache + ``signals`` and
+``analytics`` derived artifacts, all shared through ``cache/``), then trades
+are aligned by entry time and side; repeated keys within a run are matched
+by occurrence order.
+
+CLI::
+
+    python compare.py data/a_export.csv data/b_export.csv ... [--workers N] [--json out.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import analytics
+import signals
+from ingest import is_export, normalize_name
+from store import CACHE_DIR, DATA_DIR, ColumnStore
+from trades import column_values
+
+# Kolom per-trade yang dibandingkan antar run (yang tidak ada di file dilewati)
+COMPARE_COLUMNS = ("outcome", "pnl", "sl", "tp", "qty", "be_stop_activated")
+MISSING = -2
+
+_stores: Dict[tuple, ColumnStore] = {}
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _store(data_dir: str, cache_dir: str) -> ColumnStore:
+    key = (data_dir, cache_dir)
+    if key not in _stores:
+        _stores[key] = ColumnStore(data_dir=data_dir, cache_dir=cache_dir, dedup=is_export)
+    return _stores[key]
+
+
+def load_run(path: str, columns: Sequence[str] = COMPARE_COLUMNS,
+             data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR) -> dict:
+    """Trade keys, compared columns and summary stats of one export (worker entry point)."""
+    entry = _store(data_dir, cache_dir).entry(path)
+    run_trades, _ = signals.split(entry.derived("signals", signals.signals_from_entry))
+    stats = analytics.summary(entry.derived("analytics", analytics.analytics_from_entry))
+    rows = np.asarray(run_trades["row"])
+    by_name = {normalize_name(c): c for c in entry.columns}
+    fields = {}
+    for name in columns:
+        col = by_name.get(normalize_name(name))
+        if col is None:
+            continue
+        if entry.kind(col) == "num":
+            fields[name] = np.asarray(entry.array(col), dtype=np.float64)[rows]
+        else:
+            fields[name] = np.array(column_values(entry, col, rows), dtype=object)
+    return {
+        "name": os.path.splitext(os.path.basename(path))[0],
+        "time": np.asarray(run_trades["time"]),
+        "side": np.asarray(run_trades["side"]),
+        "result": np.asarray(run_trades["result"]),
+        "fields": fields,
+        "summary": stats,
+    }
+
+
+def pool_size() -> int:
+    """Workers of the server's pool: env ``CHART_COMPARE_WORKERS``, else the
+    cores split over the server processes (``--workers``, env ``CHART_WORKERS``)."""
+    configured = os.environ.get("CHART_COMPARE_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    servers = max(1, int(os.environ.get("CHART_WORKERS") or 1))
+    return max(1, (os.cpu_count() or 1) // servers)
+
+
+def _pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    # spawn: worker tidak mewarisi lock/thread server yang sedang berjalan
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers or pool_size(),
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown() -> None:
+    """Stop the worker pool of ``load_runs`` (server shutdown/reload)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def load_runs(paths: Sequence[str], columns: Sequence[str] = COMPARE_COLUMNS,
+              executor: Optional[ProcessPoolExecutor] = None,
+              data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR) -> List[dict]:
+    """``load_run`` for every path, in parallel across processes."""
+    if len(paths) < 2:
+        return [load_run(p, columns, data_dir, cache_dir) for p in paths]
+    executor = executor or _pool()
+    n = len(paths)
+    return list(executor.map(load_run, paths, [columns] * n, [data_dir] * n, [cache_dir] * n))
+
+
+def _occurrence(key: np.ndarray) -> np.ndarray:
+    """0 for the first trade with a given key in a run, 1 for the second, ..."""
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    first = np.r_[True, sorted_key[1:] != sorted_key[:-1]] if len(key) else np.zeros(0, dtype=bool)
+    group = np.maximum.accumulate(np.where(first, np.arange(len(key)), 0))
+    occ = np.empty(len(key), dtype=np.int64)
+    occ[order] = np.arange(len(key)) - group
+    return occ
+
+
+def align(runs: List[dict]):
+    """Union of ``(time, side, occurrence)`` keys and each run's trade -> key position."""
+    keys = []
+    for run in runs:
+        key = run["time"].astype(np.int64) * 2 + run["side"]
+        keys.append(np.stack([run["time"].astype(np.int64), run["side"].astype(np.int64),
+                              _occurrence(key)], axis=1))
+    stacked = np.concatenate(keys) if keys else np.zeros((0, 3), dtype=np.int64)
+    unique, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    bounds = np.cumsum([0] + [len(k) for k in keys])
+    return unique, [inverse[bounds[i]:bounds[i + 1]] for i in range(len(runs))]
+
+
+def _json_column(values: np.ndarray, present: np.ndarray) -> list:
+    out = values.tolist()
+    for i in np.flatnonzero(~present):
+        out[i] = None
+    if values.dtype.kind == "f":
+        for i in np.flatnonzero(present & ~np.isfinite(values)):
+            out[i] = None
+    return out
+
+
+def compare(runs: List[dict], base: int = 0, changed_only: bool = False) -> dict:
+    """Per-run metrics and per-trade deltas against ``runs[base]``."""
+    keys, positions = align(runs)
+    n_keys, n_runs = len(keys), len(runs)
+    present = np.zeros((n_runs, n_keys), dtype=bool)
+    result = np.full((n_runs, n_keys), MISSING, dtype=np.int8)
+    names = list(dict.fromkeys(f for run in runs for f in run["fields"]))
+    fields = {}
+    for f in names:
+        numeric = all(run["fields"].get(f, np.zeros(0)).dtype.kind == "f" for run in runs)
+        fields[f] = (np.full((n_runs, n_keys), np.nan) if numeric
+                     else np.full((n_runs, n_keys), None, dtype=object))
+    for r, (run, pos) in enumerate(zip(runs, positions)):
+        present[r, pos] = True
+        result[r, pos] = run["result"]
+        for f, values in run["fields"].items():
+            fields[f][r, pos] = values
+
+    both = present & present[base]
+    outcome = fields.get("outcome")
+    if outcome is not None:
+        flip = both & (outcome != outcome[base])
+    else:
+        flip = both & (result != result[base])
+    pnl = fields.get("pnl")
+    if pnl is not None and pnl.dtype.kind == "f":
+        pnl_delta = np.where(both, pnl - pnl[base], np.nan)
+    else:
+        pnl_delta = np.full((n_runs, n_keys), np.nan)
+    changed = (flip | (present != present[base]) | (np.abs(np.nan_to_num(pnl_delta)) > 1e-9)).any(axis=0)
+
+    summaries = []
+    for r, run in enumerate(runs):
+        summaries.append({
+            "name": run["name"],
+            "summary": run["summary"],
+            "trades": int(present[r].sum()),
+            "matched": int(both[r].sum()),
+            "only_here": int((present[r] & ~present[base]).sum()),
+            "missing": int((present[base] & ~present[r]).sum()),
+            "flips": int(flip[r].sum()),
+            "pnl_delta": float(np.nansum(pnl_delta[r])),
+        })
+
+    cols = np.flatnonzero(changed) if changed_only else np.arange(n_keys)
+    return {
+        "base": runs[base]["name"] if runs else None,
+        "runs": summaries,
+        "trades": {
+            "count": int(len(cols)),
+            "aligned": int(n_keys),
+            "changed": int(changed.sum()),
+            "time": keys[cols, 0].tolist(),
+            "side": [signals.SIDES[s] for s in keys[cols, 1]],
+            "present": present[:, cols].tolist(),
+            "result": [_json_column(result[r, cols], present[r, cols]) for r in range(n_runs)],
+            "flip": flip[:, cols].tolist(),
+            "pnl_delta": [_json_column(pnl_delta[r, cols], both[r, cols]) for r in range(n_runs)],
+            "fields": {
+                f: [_json_column(v[r, cols], present[r, cols]) for r in range(n_runs)]
+                for f, v in fields.items()
+            },
+        },
+    }
+
+
+def _fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def _table(report: dict) -> str:
+    head = f"{'run':<28} {'trades':>6} {'match':>6} {'only':>5} {'miss':>5} {'flips':>5} " \
+           f"{'net_pnl':>14} {'Δpnl':>14} {'win%':>6} {'PF':>6} {'maxDD%':>7}"
+    lines = [head, "-" * len(head)]
+    for run in report["runs"]:
+        s = run["summary"]
+        win = None if s["win_rate"] is None else s["win_rate"] * 100
+        lines.append(
+            f"{run['name'][:28]:<28} {run['trades']:>6} {run['matched']:>6} {run['only_here']:>5} "
+            f"{run['missing']:>5} {run['flips']:>5} {_fmt(s['net_pnl'], '14.2f')} "
+            f"{run['pnl_delta']:>14.2f} {_fmt(win, '6.1f')} {_fmt(s['profit_factor'], '6.2f')} "
+            f"{_fmt(s['max_drawdown_pct'], '7.1f')}"
+        )
+    t = report["trades"]
+    lines.append(f"\n{t['aligned']} aligned trades, {t['changed']} differ from base {report['base']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare trade exports side by side")
+    parser.add_argument("paths", nargs="+", help="export CSV files (first is the base run)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--columns", default=",".join(COMPARE_COLUMNS), help="per-trade columns to compare")
+    parser.add_argument("--changed-only", action="store_true", help="only list trades that differ")
+    parser.add_argument("--json", dest="json_path", help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()]
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        runs = load_runs(args.paths, columns, executor=pool)
+    report = compare(runs, changed_only=args.changed_only)
+    print(_table(report))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
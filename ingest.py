@@ -0,0 +1,218 @@
+"""Vectorized CSV -> chart column conversion.
+
+Mirrors the rules the chart page used to apply row by row in JavaScript:
+headers are trimmed and lower-cased, the time column is the first non-empty
+of ``datetime/timestamp/date/time``, numeric times above 1e12 are epoch
+milliseconds (otherwise epoch seconds) and anything else is parsed as an
+ISO/date string.  Naive date strings are taken as UTC.
+"""
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import jobs
+
+TIME_ALIASES = ("datetime", "timestamp", "date", "time")
+OHLC_ALIASES = {
+    "open": ("open", "o"),
+    "high": ("high", "h"),
+    "low": ("low", "l"),
+    "close": ("close", "c"),
+}
+VOLUME_ALIASES = ("volume", "vol", "v")
+OHLCV_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+DATA_DIR = "data"
+
+
+class DatasetNotFound(LookupError):
+    pass
+
+
+class UnsortedSource(ValueError):
+    """Chunked OHLCV conversion found bars out of time order."""
+
+
+def dataset_path(name: str, data_dir: str = DATA_DIR) -> str:
+    """Resolve a dataset id (file stem under data/) to its CSV path."""
+    if not name or "/" in name or "\\" in name or name.startswith("."):
+        raise DatasetNotFound(name)
+    path = os.path.join(data_dir, name if name.endswith(".csv") else name + ".csv")
+    if not os.path.isfile(path):
+        raise DatasetNotFound(name)
+    return path
+
+
+def list_datasets(kind: Optional[str] = None, data_dir: str = DATA_DIR) -> List[str]:
+    """Dataset ids under data/, optionally only those of one ``table_kind``."""
+    names = []
+    for fname in sorted(os.listdir(data_dir)):
+        if not fname.endswith(".csv") or fname.startswith("."):
+            continue
+        if kind is not None and file_kind(os.path.join(data_dir, fname)) != kind:
+            continue
+        names.append(fname[:-4])
+    return names
+
+
+def file_kind(path: str) -> str:
+    """``table_kind`` of a CSV from its header line only."""
+    return table_kind(pd.read_csv(path, nrows=0).columns)
+
+
+def normalize_name(name) -> str:
+    return str(name).replace("\ufeff", "").strip().lower()
+
+
+def normalize_headers(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [normalize_name(c) for c in df.columns]
+    return df
+
+
+def _present(col: pd.Series) -> np.ndarray:
+    """Rows where the JS ``row[x] || ...`` chain would stop at this column."""
+    mask = col.notna().to_numpy(copy=True)
+    if col.dtype == object or pd.api.types.is_string_dtype(col.dtype):
+        mask &= (col.astype(str).str.len() > 0).to_numpy()
+    return mask
+
+
+def to_epoch_seconds(col: pd.Series) -> np.ndarray:
+    """Convert a time column to float epoch seconds (NaN where invalid)."""
+    if pd.api.types.is_datetime64_any_dtype(col.dtype):
+        ts = pd.to_datetime(col, utc=True)
+        out = ts.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+        out[ts.isna().to_numpy()] = np.nan
+        return np.floor(out)
+
+    num = pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64)
+    # Heuristik: epoch ms jika > 10^12
+    out = np.where(num > 1e12, np.floor(num / 1000.0), num)
+
+    text = np.isnan(num) & _present(col)
+    if text.any():
+        strings = col[text].astype(str)
+        parsed = pd.to_datetime(strings, utc=True, errors="coerce", format="ISO8601")
+        retry = parsed.isna().to_numpy()
+        if retry.any():
+            parsed[retry] = pd.to_datetime(
+                strings[retry], utc=True, errors="coerce", format="mixed"
+            )
+        secs = parsed.to_numpy(dtype="datetime64[ns]").astype(np.int64) // 10**9
+        secs = secs.astype(np.float64)
+        secs[parsed.isna().to_numpy()] = np.nan
+        out[text] = secs
+    return out
+
+
+def coalesce_time(df: pd.DataFrame, aliases=TIME_ALIASES) -> np.ndarray:
+    """First non-empty alias per row -> epoch seconds; NaN if missing/invalid."""
+    out = np.full(len(df), np.nan)
+    taken = np.zeros(len(df), dtype=bool)
+    for name in aliases:
+        if name not in df.columns:
+            continue
+        col = df[name]
+        pick = _present(col) & ~taken
+        if pick.any():
+            out[pick] = to_epoch_seconds(col[pick])
+            taken |= pick
+    return out
+
+
+def coalesce_number(df: pd.DataFrame, aliases, default: Optional[float] = 0.0) -> np.ndarray:
+    """``parseFloat(row.a || row.b || default)`` over whole columns."""
+    out = np.full(len(df), np.nan if default is None else default, dtype=np.float64)
+    taken = np.zeros(len(df), dtype=bool)
+    for name in aliases:
+        if name not in df.columns:
+            continue
+        col = df[name]
+        pick = _present(col) & ~taken
+        if pick.any():
+            out[pick] = pd.to_numeric(col[pick], errors="coerce").to_numpy(dtype=np.float64)
+            taken |= pick
+    return out
+
+
+def ohlcv_columns(df: pd.DataFrame, sort: bool = True) -> Dict[str, np.ndarray]:
+    """Chart-ready OHLCV columns from a raw (header-normalized) frame.
+
+    Rows with an invalid time or a non-numeric OHLC value are dropped, the
+    same way the browser loop skipped them.
+    """
+    t = coalesce_time(df)
+    cols = {k: coalesce_number(df, aliases) for k, aliases in OHLC_ALIASES.items()}
+    volume = coalesce_number(df, VOLUME_ALIASES)
+
+    keep = np.isfinite(t) & (t > 0)
+    for v in cols.values():
+        keep &= ~np.isnan(v)
+
+    out = {"time": t[keep].astype(np.int64)}
+    for k, v in cols.items():
+        out[k] = v[keep]
+    out["volume"] = np.nan_to_num(volume[keep], nan=0.0)
+
+    if sort and len(out["time"]) > 1 and np.any(np.diff(out["time"]) < 0):
+        order = np.argsort(out["time"], kind="stable")
+        out = {k: v[order] for k, v in out.items()}
+    return out
+
+
+def ohlcv_from_entry(entry) -> Dict[str, np.ndarray]:
+    """Build OHLCV columns from a ``store.Entry`` (used as a derived artifact)."""
+    return ohlcv_columns(normalize_headers(entry.frame()))
+
+
+def ohlcv_chunks(entry):
+    """Chunked ``ohlcv_from_entry`` for time-ordered files (bounded memory).
+
+    Raises ``UnsortedSource`` if bars go back in time across chunks.
+    """
+    if not entry.rows:
+        yield ohlcv_from_entry(entry)
+        return
+    last = None
+    for rows in entry.row_chunks():
+        cols = ohlcv_columns(normalize_headers(entry.frame(rows=rows)))
+        if len(cols["time"]):
+            if last is not None and cols["time"][0] < last:
+                raise UnsortedSource(entry.key)
+            last = cols["time"][-1]
+        yield cols
+        jobs.report(rows.stop, entry.rows)
+
+
+def load_ohlcv(entry) -> Dict[str, np.ndarray]:
+    """Cached OHLCV columns of a ``store.Entry``; unsorted files are sorted in memory."""
+    try:
+        return entry.derived("ohlcv", ohlcv_chunks)
+    except UnsortedSource:
+        return entry.derived("ohlcv", ohlcv_from_entry)
+
+
+def table_kind(columns) -> str:
+    """'ohlcv', 'trades' or 'table', from a file's header."""
+    names = {normalize_name(c) for c in columns}
+    has_time = any(a in names for a in TIME_ALIASES)
+    if has_time and all(any(a in names for a in aliases) for aliases in OHLC_ALIASES.values()):
+        return "ohlcv"
+    if has_time and names & {"signal", "side", "direction", "outcome", "result", "status"}:
+        return "trades"
+    return "table"
+
+
+def is_export(columns) -> bool:
+    """``store`` dedup predicate: trade exports of successive runs share most chunks."""
+    return table_kind(columns) == "trades"
+
+
+def extend_ohlcv(old: Dict[str, np.ndarray], entry, old_rows: int) -> Dict[str, np.ndarray]:
+    """``store`` extender: parse only rows appended since ``old_rows``."""
+    new = ohlcv_columns(normalize_headers(entry.frame(rows=slice(old_rows, None))))
+    if len(old["time"]) and len(new["time"]) and new["time"][0] < old["time"][-1]:
+        return ohlcv_from_entry(entry)
+    return {k: np.concatenate([old[k], new[k]]) for k in OHLCV_FIELDS}
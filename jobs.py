@@ -0,0 +1,242 @@
+"""Background jobs: heavy computations in a bounded pool of worker processes.
+
+``JobQueue.submit(kind, params, key)`` returns a job id at once; the
+registered function runs in a spawned worker process, so parsing or
+replaying a 10M-row file never holds the server's GIL or event loop.
+Job state lives in small JSON files under ``cache/.jobs`` (written by the
+server on submit/finish and by the worker on progress), so any server
+worker process can answer a poll and cancel a job:
+
+* ``report(done, total, stage)`` inside a job updates its progress and
+  raises ``Cancelled`` once the job is cancelled (``<id>.cancel`` exists);
+  outside a job it is a no-op, so data-path code can call it freely.
+* a finished job is the cached result for its ``key`` (the caller puts
+  the source versions in it): submitting the same key returns that job.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINAL = (DONE, FAILED, CANCELLED)
+JOBS_DIR = os.path.join("cache", ".jobs")
+MAX_PENDING = 64
+# Job selesai dihapus setelah ini (hasilnya dihitung ulang bila diminta lagi)
+KEEP_SECONDS = 24 * 3600
+REPORT_SECONDS = 0.25
+
+
+class Cancelled(Exception):
+    """The job was cancelled while running."""
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+def _write(path: str, state: dict) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _read(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# --- sisi worker -------------------------------------------------------------
+
+_current: Optional[dict] = None
+_reported = 0.0
+
+
+def report(done: float, total: float, stage: Optional[str] = None) -> None:
+    """Progress of the running job (no-op outside a job); raises ``Cancelled``."""
+    global _reported
+    job = _current
+    if job is None:
+        return
+    now = time.monotonic()
+    if now - _reported < REPORT_SECONDS:
+        return
+    _reported = now
+    if os.path.exists(job["path"] + ".cancel"):
+        raise Cancelled(job["state"]["id"])
+    state = job["state"]
+    step, steps = job["step"]
+    fraction = min(1.0, done / total) if total else 0.0
+    state["progress"] = round((step + fraction) / steps, 4)
+    if stage is not None:
+        state["stage"] = stage
+    state["updated"] = time.time()
+    _write(job["path"], state)
+
+
+def step(index: int, count: int, stage: str) -> None:
+    """Start step ``index`` of ``count`` of the running job (its progress band)."""
+    if _current is None:
+        return
+    _current["step"] = (index, count)
+    report(0, 1, stage)
+
+
+def _run(fn: Callable[[dict], dict], path: str, params: dict):
+    global _current, _reported
+    state = _read(path)
+    if state is None or os.path.exists(path + ".cancel"):
+        raise Cancelled(os.path.basename(path))
+    state.update(state=RUNNING, started=time.time(), updated=time.time(), worker=os.getpid())
+    _write(path, state)
+    _current, _reported = {"path": path, "state": state, "step": (0, 1)}, 0.0
+    try:
+        return fn(params)
+    finally:
+        _current = None
+
+
+# --- sisi server -------------------------------------------------------------
+
+class JobQueue:
+    def __init__(self, workers: int = 2, directory: str = JOBS_DIR):
+        self.workers = workers
+        self.dir = directory
+        self.kinds: Dict[str, Callable[[dict], dict]] = {}
+        self._futures: Dict[str, object] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "keys"), exist_ok=True)
+
+    def register(self, kind: str, fn: Callable[[dict], dict]) -> None:
+        """``fn(params) -> result`` must be a module-level (picklable) function."""
+        self.kinds[kind] = fn
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # spawn: worker tidak mewarisi lock/thread server yang sedang berjalan
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.dir, f"{job_id}.json")
+
+    def _key_path(self, key) -> str:
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+        return os.path.join(self.dir, "keys", digest)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Job state (``None`` if unknown); jobs of a dead server process read as failed."""
+        if not job_id.isalnum():
+            return None
+        state = _read(self._path(job_id))
+        if state is not None and state["state"] not in FINAL and not _alive(state["owner"]):
+            state.update(state=FAILED, error="server process exited")
+        return state
+
+    def submit(self, kind: str, params: dict, key=None) -> dict:
+        """Queue ``kind(params)``; with ``key`` an equal queued/running/done job is reused."""
+        if kind not in self.kinds:
+            raise KeyError(kind)
+        key_path = self._key_path([kind, key]) if key is not None else None
+        with self._lock:
+            if key_path is not None and os.path.exists(key_path):
+                with open(key_path) as f:
+                    existing = self.get(f.read().strip())
+                if existing is not None and existing["state"] in (QUEUED, RUNNING, DONE):
+                    return existing
+            pending = sum(1 for fut in self._futures.values() if not fut.done())
+            if pending >= MAX_PENDING:
+                raise QueueFull(f"{pending} jobs pending")
+            job_id = uuid.uuid4().hex[:16]
+            path = self._path(job_id)
+            state = {
+                "id": job_id, "kind": kind, "params": params, "state": QUEUED,
+                "progress": 0.0, "stage": None, "error": None, "result": None,
+                "created": time.time(), "started": None, "finished": None,
+                "updated": time.time(), "owner": os.getpid(),
+            }
+            _write(path, state)
+            if key_path is not None:
+                with open(key_path, "w") as f:
+                    f.write(job_id)
+            future = self._pool().submit(_run, self.kinds[kind], path, params)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda fut: self._finish(job_id, fut))
+        return state
+
+    def _finish(self, job_id: str, future) -> None:
+        path = self._path(job_id)
+        state = _read(path) or {}
+        try:
+            state.update(state=DONE, result=future.result(), progress=1.0)
+        except (Cancelled, CancelledError):
+            state.update(state=CANCELLED)
+        except BrokenProcessPool as exc:
+            # Worker mati (mis. OOM): pool baru untuk job berikutnya
+            with self._lock:
+                self._executor = None
+            state.update(state=FAILED, error=f"worker process died: {exc}")
+        except Exception as exc:
+            state.update(state=FAILED, error=f"{type(exc).__name__}: {exc}")
+        state.update(finished=time.time(), updated=time.time())
+        if state.get("id"):
+            _write(path, state)
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if os.path.exists(path + ".cancel"):
+            os.remove(path + ".cancel")
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued or running job (running jobs stop at their next ``report``)."""
+        state = self.get(job_id)
+        if state is None or state["state"] in FINAL:
+            return state
+        open(self._path(job_id) + ".cancel", "w").close()
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()  # masih antre: callback _finish menandai cancelled
+        return self.get(job_id)
+
+    def sweep(self, keep_seconds: float = KEEP_SECONDS) -> int:
+        """Remove finished jobs older than ``keep_seconds``; returns how many."""
+        now, removed = time.time(), 0
+        for name in os.listdir(self.dir):
+            if not name.endswith(".json"):
+                continue
+            state = _read(os.path.join(self.dir, name))
+            if state and state["state"] in FINAL and now - (state["finished"] or 0) > keep_seconds:
+                os.remove(os.path.join(self.dir, name))
+                removed += 1
+        for name in os.listdir(os.path.join(self.dir, "keys")):
+            path = os.path.join(self.dir, "keys", name)
+            with open(path) as f:
+                if not os.path.exists(self._path(f.read().strip())):
+                    os.remove(path)
+        return removed
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
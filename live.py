@@ -0,0 +1,125 @@
+"""Follow rows appended to files under data/ and stream them as Server-Sent Events.
+
+A stream remembers the byte offset it has delivered up to (also used as the
+SSE event id, so a reconnecting ``EventSource`` resumes exactly where it
+stopped) and on every poll parses only the complete lines written after it:
+following a live feed costs O(new rows), independent of the file's history.
+"""
+import asyncio
+import hashlib
+import io
+import os
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+import ingest
+import metrics
+import signals
+import wire
+
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 15.0
+HEAD_BYTES = 4096
+# Batas byte per poll; sisanya dibaca di poll berikutnya
+MAX_READ = 16 << 20
+
+
+class Rewritten(Exception):
+    """The file was truncated or replaced instead of appended to."""
+
+
+class Tail:
+    """Reader of complete CSV lines appended after ``offset``.
+
+    Without an offset the tail starts at the end of the last complete line.
+    """
+
+    def __init__(self, path: str, offset: Optional[int] = None):
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(HEAD_BYTES)
+            size = os.fstat(f.fileno()).st_size
+            if offset is None:
+                f.seek(max(0, size - HEAD_BYTES))
+                tail = f.read()
+                offset = size - len(tail) + tail.rfind(b"\n") + 1
+        header_end = head.find(b"\n") + 1 or len(head)
+        self.names = [str(c) for c in pd.read_csv(io.BytesIO(head[:header_end]), nrows=0).columns]
+        self.kind = ingest.table_kind(self.names)
+        self.offset = max(offset, header_end)
+        self._head = hashlib.sha1(head[:min(self.offset, HEAD_BYTES)]).hexdigest()
+
+    def _check_head(self, f) -> None:
+        f.seek(0)
+        head = f.read(min(self.offset, HEAD_BYTES))
+        if hashlib.sha1(head).hexdigest() != self._head:
+            raise Rewritten(self.path)
+
+    def poll(self) -> Optional[pd.DataFrame]:
+        """Rows appended since the last call (None when nothing new)."""
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            raise Rewritten(self.path)
+        if size == self.offset:
+            return None
+        with open(self.path, "rb") as f:
+            self._check_head(f)
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, MAX_READ))
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return None  # baris terakhir belum lengkap
+        with metrics.span("tail", bytes=end) as span:
+            frame = pd.read_csv(io.BytesIO(data[:end]), header=None, names=self.names,
+                                skipinitialspace=True)
+            span.add(rows=len(frame))
+        self.offset += end
+        return frame
+
+    def delta(self, frame: pd.DataFrame, name: str) -> dict:
+        """Chart-ready payload for appended rows (same shapes as the full APIs)."""
+        frame = ingest.normalize_headers(frame)
+        body = {"dataset": name, "kind": self.kind, "offset": self.offset}
+        if self.kind == "ohlcv":
+            cols = ingest.ohlcv_columns(frame)
+            body["count"] = int(len(cols["time"]))
+            body.update({k: np.asarray(cols[k]).tolist() for k in ingest.OHLCV_FIELDS})
+        elif self.kind == "trades":
+            trades = signals.classify(frame)
+            arrays = {f"trade.{k}": v for k, v in trades.items()}
+            arrays.update({f"marker.{k}": v for k, v in signals.markers(trades).items()})
+            body.update(signals.payload(name, arrays))
+        else:
+            body["count"] = int(len(frame))
+        return body
+
+
+def _event(name: str, data: dict, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {name}\ndata: {wire.dumps(data).decode()}\n\n"
+
+
+async def events(tail: Tail, name: str, disconnected: Callable[[], Awaitable[bool]]):
+    """SSE stream: ``hello``, then one ``delta`` per batch of new rows; ``reset``
+    (and end of stream) when the file is rewritten so the page reloads it."""
+    yield _event("hello", {"dataset": name, "kind": tail.kind, "offset": tail.offset}, tail.offset)
+    idle = 0.0
+    while not await disconnected():
+        try:
+            frame = await run_in_threadpool(tail.poll)
+        except (Rewritten, FileNotFoundError):
+            yield _event("reset", {"dataset": name})
+            return
+        if frame is not None and len(frame):
+            delta = await run_in_threadpool(tail.delta, frame, name)
+            yield _event("delta", delta, tail.offset)
+            idle = 0.0
+        else:
+            idle += POLL_SECONDS
+            if idle >= HEARTBEAT_SECONDS:
+                yield ": ping\n\n"
+                idle = 0.0
+        await asyncio.sleep(POLL_SECONDS)
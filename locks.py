@@ -0,0 +1,38 @@
+"""Advisory file locks coordinating cache builds between worker processes.
+
+Every worker maps the same ``cache/`` files, so a dataset must be parsed by
+one process while the others wait and then map the result.  ``flock``
+locks are released by the kernel when a process dies, so a crashed build
+never leaves the cache locked.  Without ``fcntl`` (Windows) the locks are
+no-ops and only the in-process ``threading`` locks apply.
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: satu proses saja
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True):
+    """Hold a lock on ``path`` (created if missing); yields False when a
+    non-blocking attempt finds it taken."""
+    if fcntl is None:
+        yield True
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
@@ -1,691 +1,627 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-import pandas as pd
+from fastapi import FastAPI, UploadFile, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 import numpy as np
-import json
+import argparse
+import asyncio
+import contextlib
+import shutil
 import uvicorn
-from datetime import datetime
 import os
+import re
+import uuid
 from typing import Optional
 
+import analytics
+import assets
+import cohorts
+import compare
+import ingest
+import jobs
+import live
+import metrics
+import pyramid
+import replay
+import signals
+import sweep
+import tasks
+import trades
+import wire
+from wire import JSONResponse  # orjson bila ada; serialisasi tercatat sebagai stage
+
 # Buat folder jika belum ada
 os.makedirs("static", exist_ok=True)
 os.makedirs("templates", exist_ok=True)
 os.makedirs("data", exist_ok=True)
 
-app = FastAPI(title="Trading Chart App")
-
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/data", StaticFiles(directory="data"), name="data")
+# Cache kolom (.npy, di-mmap) untuk setiap CSV di data/; export trade di-dedup per chunk
+store = tasks.open_store(data_dir="data", cache_dir="cache")
+store.sweep()
+
+# Komputasi berat (parse upload, replay, ...) jalan sebagai job di proses terpisah
+JOB_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+job_queue = jobs.JobQueue(workers=JOB_WORKERS)
+job_queue.register("ingest", tasks.ingest_dataset)
+job_queue.register("prepare", tasks.prepare)
+job_queue.register("replay", tasks.replay_export)
+job_queue.register("sweep", tasks.sweep_export)
+job_queue.sweep()
+
+# Mode produksi (python main.py --workers N): metrik digabung dari semua worker
+METRICS_DIR = os.path.join("cache", ".metrics")
+if os.environ.get("CHART_WORKERS"):
+    metrics.share(METRICS_DIR)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    job_queue.shutdown()
+    compare.shutdown()
+
+
+app = FastAPI(title="Trading Chart App", lifespan=lifespan)
+
+# Mount static files (static/vendor berisi library berversi -> immutable)
+app.mount("/static", assets.CachedStaticFiles(directory="static", immutable=("vendor/",)), name="static")
+data_files = assets.DataFiles(directory="data", cache_dir=os.path.join("cache", ".raw"))
+data_files.sweep()
+app.mount("/data", data_files, name="data")
+# ETag/304 + kompresi untuk semua respons JSON GET /api/*
+app.add_middleware(assets.ConditionalMiddleware, prefix="/api/",
+                   media_types=("application/json", wire.MEDIA_TYPE))
+# Paling luar: latensi per route + Server-Timing (termasuk kompresi di atas)
+app.add_middleware(metrics.MetricsMiddleware, server_timing=True)
+
+# Halaman dirender sekali; dibaca ulang hanya jika file template berubah
+chart_page = assets.Page("templates/charts.html")
 
 @app.get("/", response_class=HTMLResponse)
-async def serve_chart():
-    """Serve the main chart page"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Trading Chart with Signals</title>
-        <script src="https://unpkg.com/lightweight-charts@4.0.1/dist/lightweight-charts.standalone.production.js"></script>
-        <script src="https://unpkg.com/papaparse@5.4.1/papaparse.min.js"></script>
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body { 
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; 
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh; 
-                padding: 20px; 
-            }
-            .container {
-                max-width: 1400px; 
-                margin: 0 auto; 
-                background: white; 
-                border-radius: 15px; 
-                box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                overflow: hidden;
-            }
-            .header {
-                background: #2c3e50; 
-                color: white; 
-                padding: 20px 30px; 
-                text-align: center;
-            }
-            .header h1 { font-size: 28px; margin-bottom: 10px; }
-            .controls {
-                background: #34495e; 
-                padding: 15px 30px; 
-                display: flex; 
-                justify-content: space-between; 
-                align-items: center;
-                flex-wrap: wrap;
-            }
-            .legend { display: flex; gap: 20px; flex-wrap: wrap; }
-            .legend-item { 
-                display: flex; 
-                align-items: center; 
-                gap: 8px; 
-                color: white; 
-                font-size: 14px;
-            }
-            .legend-color { 
-                width: 20px; 
-                height: 20px; 
-                border-radius: 4px; 
-                border: 2px solid rgba(255,255,255,0.3);
-            }
-            .stats { display: flex; gap: 20px; color: white; font-size: 14px; }
-            .stat-item { 
-                background: rgba(255,255,255,0.1); 
-                padding: 5px 12px; 
-                border-radius: 20px;
-            }
-            #chart-container { 
-                width: 100%; 
-                height: 600px; 
-                background: white;
-            }
-            .upload-area {
-                padding: 30px;
-                background: #f8f9fa;
-                border-top: 1px solid #e9ecef;
-            }
-            .file-inputs {
-                display: flex;
-                gap: 20px;
-                justify-content: center;
-                margin: 20px 0;
-            }
-            button {
-                background: #3498db;
-                color: white;
-                border: none;
-                padding: 12px 24px;
-                border-radius: 8px;
-                cursor: pointer;
-                font-size: 16px;
-                font-weight: 600;
-            }
-            button:hover { background: #2980b9; }
-            .loading { display: none; text-align: center; padding: 20px; }
-            .error { 
-                background: #e74c3c; 
-                color: white; 
-                padding: 15px; 
-                border-radius: 8px; 
-                margin: 15px 0; 
-                display: none;
-            }
-            .success {
-                background: #27ae60;
-                color: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin: 15px 0;
-                display: none;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>📈 Trading Chart with Signals</h1>
-                <p>Visualize Entry, Stop Loss, and Take Profit signals</p>
-            </div>
-            
-            <div class="controls">
-                <button id="toggle-hover" onclick="toggleHover()" style="background:#8e44ad;">Levels: ON</button>
-                <div class="legend">
-                <div class="legend-item">
-                    <div class="legend-color" style="background-color: #2ecc71;"></div>
-                    <span>ENTRY (PROFIT/DEFAULT)</span>
-                </div>
-                <div class="legend-item">
-                    <div class="legend-color" style="background-color: #e74c3c;"></div>
-                    <span>ENTRY (LOSS)</span>
-                </div>
-                <div class="legend-item">
-                    <div class="legend-color" style="background-color: #FF0000;"></div>
-                    <span>STOP LOSS (level)</span>
-                </div>
-                <div class="legend-item">
-                    <div class="legend-color" style="background-color: #0000FF;"></div>
-                    <span>TAKE PROFIT (level)</span>
-                </div>
-                </div>
-
-                
-                <div class="stats">
-                    <div class="stat-item" id="candle-count">Candles: 0</div>
-                    <div class="stat-item" id="signal-count">Signals: 0</div>
-                </div>
-            </div>
-            
-            <div id="chart-container"></div>
-            
-            <div class="upload-area">
-                <h3 style="text-align: center; margin-bottom: 20px;">Upload Your Trading Data</h3>
-                <div class="file-inputs">
-                    <div style="display: flex; flex-direction: column; align-items: center; gap: 10px;">
-                        <label style="font-weight: 600;">📊 OHLCV Data (CSV)</label>
-                        <input type="file" id="ohlcv-file" accept=".csv">
-                    </div>
-                    <div style="display: flex; flex-direction: column; align-items: center; gap: 10px;">
-                        <label style="font-weight: 600;">🎯 Trades Data (CSV)</label>
-                        <input type="file" id="trades-file" accept=".csv">
-                    </div>
-                </div>
-                <div style="text-align: center;">
-                    <button onclick="processData()" style="padding: 15px 30px; font-size: 18px;">
-                        🚀 Generate Chart
-                    </button>
-                </div>
-                
-                <div class="loading" id="loading">
-                    <p>📊 Processing data and generating chart...</p>
-                </div>
-                
-                <div class="error" id="error-message"></div>
-                <div class="success" id="success-message"></div>
-            </div>
-        </div>
-
-        <script>
-            let chart = null;
-            let candleSeries = null;
-            let _signalsGlobal = [];     // simpan signals terakhir
-            let _hoverLines = [];        // kumpulan priceLine aktif saat hover
-            let _hoverEnabled = true;    // toggle jika mau dimatikan nanti
-
-            function toggleHover() {
-            _hoverEnabled = !_hoverEnabled;
-            document.getElementById('toggle-hover').textContent = `Levels: ${_hoverEnabled ? 'ON' : 'OFF'}`;
-            if (!_hoverEnabled) clearHoverLines();
-            }
-
-
-            // Initialize empty chart
-            function initChart() {
-                const container = document.getElementById('chart-container');
-                
-                // Clear previous chart
-                if (chart) {
-                    container.innerHTML = '';
-                }
-                
-                chart = LightweightCharts.createChart(container, {
-                    width: container.clientWidth,
-                    height: 600,
-                    layout: {
-                        background: { color: '#ffffff' },
-                        textColor: '#191919',
-                    },
-                    grid: {
-                        vertLines: { color: '#e6e6e6' },
-                        horzLines: { color: '#e6e6e6' },
-                    },
-                    rightPriceScale: {
-                        borderColor: '#e6e6e6',
-                        scaleMargins: { top: 0.2, bottom: 0.2 },
-                    },
-                    timeScale: {
-                        borderColor: '#e6e6e6',
-                        timeVisible: true,
-                        secondsVisible: false,
-                    }
-                });
-
-                candleSeries = chart.addCandlestickSeries({
-                    upColor: '#26a69a',
-                    downColor: '#ef5350',
-                    borderUpColor: '#26a69a',
-                    borderDownColor: '#ef5350',
-                    wickUpColor: '#26a69a',
-                    wickDownColor: '#ef5350',
-                });
-
-                console.log("✅ Chart initialized successfully!");
-            }
-
-            // Process uploaded data
-            async function processData() {
-                const ohlcvFile  = document.getElementById('ohlcv-file').files[0];
-                const tradesFile = document.getElementById('trades-file').files[0];
-
-                // ⇩⇩⇩ Ubah: fallback ke default bila belum ada file ⇩⇩⇩
-                if (!ohlcvFile || !tradesFile) {
-                    console.log('No uploads. Falling back to default /data/*.csv');
-                    await processDefault();
-                    return;
-                }
-
-                showLoading();
-                hideError();
-                hideSuccess();
-
-                try {
-                    console.log("📁 Reading files...");
-                    
-                    // Read files
-                    const ohlcvText = await readFile(ohlcvFile);
-                    const tradesText = await readFile(tradesFile);
-                    
-                    console.log("🔄 Processing data...");
-                    // Process data using PapaParse for efficiency
-                    const result = await processDataFiles(ohlcvText, tradesText);
-                    
-                    console.log("📊 Updating chart...");
-                    // Update chart
-                    updateChart(result.ohlcv, result.signals);
-                    
-                    showSuccess(`✅ Chart updated! ${result.ohlcv.length} candles, ${result.signals.length} signals`);
-                    
-                } catch (error) {
-                    showError('❌ Error: ' + error.message);
-                    console.error("Error details:", error);
-                } finally {
-                    hideLoading();
-                }
-            }
-
-            function readFile(file) {
-                return new Promise((resolve, reject) => {
-                    const reader = new FileReader();
-                    reader.onload = e => resolve(e.target.result);
-                    reader.onerror = e => reject(e);
-                    reader.readAsText(file);
-                });
-            }
-
-            function processDataFiles(ohlcvCsv, tradesCsv) {
-                return new Promise((resolve, reject) => {
-                    console.log("Processing OHLCV data with PapaParse...");
-                    // Parse OHLCV with PapaParse for better performance on large files
-                    Papa.parse(ohlcvCsv, {
-                        header: true,
-                        skipEmptyLines: true,
-                        dynamicTyping: false,
-                        transformHeader: h => h.trim().toLowerCase(),
-                        complete: function(ohlcvResults) {
-                            const ohlcvData = ohlcvResults.data;
-                            console.log("Processing trades data with PapaParse...");
-                            Papa.parse(tradesCsv, {
-                                header: true,
-                                skipEmptyLines: true,
-                                dynamicTyping: false,
-                                transformHeader: h => h.trim().toLowerCase(),
-                                complete: function(tradesResults) {
-                                    const tradesData = tradesResults.data;
-                                    
-                                    console.log("Converting OHLCV for chart...");
-                                    // Process OHLCV for chart - optimized loop
-                                    const ohlcv = [];
-                                    for (let i = 0; i < ohlcvData.length; i++) {
-                                        const row = ohlcvData[i];
-                                        const dateStr = row.datetime || row.timestamp || row.date || row.time;
-                                        let timestamp;
-                                        if (dateStr) {
-                                            // Coba angka (epoch)
-                                            if (!isNaN(dateStr)) {
-                                                const num = Number(dateStr);
-                                                // Heuristik: epoch ms jika > 10^12
-                                                timestamp = (num > 1e12) ? Math.floor(num / 1000) : num;
-                                            } else {
-                                                const d = new Date(dateStr);
-                                                timestamp = Math.floor(d.getTime() / 1000);
-                                            }
-                                            if (!isFinite(timestamp) || timestamp <= 0) continue;
-                                        } else {
-                                            continue;
-                                        }
-                                        
-                                        const openVal = parseFloat(row.open || row.o || 0);
-                                        const highVal = parseFloat(row.high || row.h || 0);
-                                        const lowVal = parseFloat(row.low || row.l || 0);
-                                        const closeVal = parseFloat(row.close || row.c || 0);
-                                        
-                                        if (isNaN(openVal) || isNaN(highVal) || isNaN(lowVal) || isNaN(closeVal)) {
-                                            console.warn("Invalid OHLC values:", row);
-                                            continue;
-                                        }
-                                        
-                                        ohlcv.push({
-                                            time: timestamp,
-                                            open: openVal,
-                                            high: highVal,
-                                            low: lowVal,
-                                            close: closeVal,
-                                        });
-                                    }
-
-                                    console.log("Processing signals...");
-                                    // helper normalisasi string
-                                    const norm = (v) => (v ?? "").toString().trim().toUpperCase();
-
-                                    const signals = [];
-                                    for (let i = 0; i < tradesData.length; i++) {
-                                    const trade = tradesData[i];
-
-                                    // --- waktu trade ---
-                                    let timestamp;
-                                    const dateStr = trade.datetime || trade.timestamp || trade.date || trade.time;
-                                    if (dateStr) {
-                                        if (!isNaN(dateStr)) {
-                                        const num = Number(dateStr);
-                                        timestamp = (num > 1e12) ? Math.floor(num / 1000) : num; // epoch ms → s
-                                        } else {
-                                        const d = new Date(dateStr);
-                                        timestamp = Math.floor(d.getTime() / 1000);
-                                        }
-                                        if (!isFinite(timestamp) || timestamp <= 0) {
-                                        console.warn(`Invalid trade date at row ${i + 1}:`, dateStr);
-                                        continue;
-                                        }
-                                    } else {
-                                        console.warn(`No date in trade row ${i + 1}`);
-                                        continue;
-                                    }
-
-                                    // --- side / arah ---
-                                    const sideRaw = (trade.signal || trade.side || trade.direction || 'buy').toString().toLowerCase();
-                                    const side = (sideRaw === 'sell' || sideRaw === 'short') ? 'sell' : 'buy';
-
-                                    // --- field umum untuk status & level ---
-                                    const outcomeStr = norm(trade.outcome || trade.result || trade.status);
-                                    const pnlNum     = Number(trade.pnl ?? trade.profit ?? trade.net ?? NaN);
-                                    const entryPrice = Number(trade.entry_price ?? trade.entry ?? trade.price_entry ?? trade.price ?? NaN);
-                                    const exitPrice  = Number(trade.exit_price  ?? trade.exit  ?? trade.price_exit  ?? NaN);
-                                    const slPrice    = Number(trade.sl_price    ?? trade.sl    ?? trade.stop_loss   ?? trade.stop ?? NaN);
-                                    const tpPrice    = Number(trade.tp_price    ?? trade.tp    ?? trade.take_profit ?? trade.target ?? NaN);
-
-                                    // --- tentukan PROFIT / LOSS ---
-                                    let isLoss = false, isProfit = false;
-                                    if (["SL","LOSS","LOST","-1"].includes(outcomeStr)) {
-                                        isLoss = true;
-                                    } else if (["TP","WIN","TAKE_PROFIT","PROFIT","1"].includes(outcomeStr)) {
-                                        isProfit = true;
-                                    }
-                                    if (!isLoss && !isProfit && Number.isFinite(pnlNum)) {
-                                        if (pnlNum > 0) isProfit = true;
-                                        else if (pnlNum < 0) isLoss = true;
-                                    }
-                                    if (!isLoss && !isProfit && Number.isFinite(entryPrice) && Number.isFinite(exitPrice)) {
-                                        if (side === "buy") {
-                                        if (exitPrice > entryPrice) isProfit = true;
-                                        else if (exitPrice < entryPrice) isLoss = true;
-                                        } else {
-                                        if (exitPrice < entryPrice) isProfit = true;
-                                        else if (exitPrice > entryPrice) isLoss = true;
-                                        }
-                                    }
-                                    if (!isLoss && !isProfit && Number.isFinite(exitPrice) && Number.isFinite(slPrice) && Number.isFinite(tpPrice)) {
-                                        const dTP = Math.abs(exitPrice - tpPrice);
-                                        const dSL = Math.abs(exitPrice - slPrice);
-                                        if (dTP < dSL) isProfit = true; else if (dSL < dTP) isLoss = true;
-                                    }
-
-                                    // --- ENTRY marker: simpan level supaya bisa ditampilkan saat hover ---
-                                    if (Number.isFinite(entryPrice)) {
-                                        const entryColor = isLoss ? '#e74c3c' : '#2ecc71'; // merah kalau loss, hijau default/profit
-                                        const entryText  = isLoss ? `LOSS ${side.toUpperCase()}` : (isProfit ? `TP ${side.toUpperCase()}` : `ENTRY ${side.toUpperCase()}`);
-                                        const entryShape = (side === 'buy')
-                                        ? (isLoss ? 'arrowDown' : 'arrowUp')
-                                        : (isLoss ? 'arrowUp'   : 'arrowDown');
-
-                                        // >>>> simpan juga level entry/sl/tp di object entry:
-                                        signals.push({
-                                        time: timestamp,
-                                        price: entryPrice,
-                                        type: 'entry',
-                                        side: side,
-                                        color: entryColor,
-                                        text: entryText,
-                                        shape: entryShape,
-                                        entryLevel: entryPrice,
-                                        slLevel: Number.isFinite(slPrice) ? slPrice : null,
-                                        tpLevel: Number.isFinite(tpPrice) ? tpPrice : null
-                                        });
-                                    }
-
-                                    // --- SL marker (level referensi) ---
-                                    if (Number.isFinite(slPrice)) {
-                                        signals.push({
-                                        time: timestamp,
-                                        price: slPrice,
-                                        type: 'sl',
-                                        side: side,
-                                        color: '#FF0000',
-                                        text: 'SL',
-                                        shape: side === 'buy' ? 'arrowDown' : 'arrowUp'
-                                        });
-                                    }
-
-                                    // --- TP marker (level referensi) ---
-                                    if (Number.isFinite(tpPrice)) {
-                                        signals.push({
-                                        time: timestamp,
-                                        price: tpPrice,
-                                        type: 'tp',
-                                        side: side,
-                                        color: '#0000FF',
-                                        text: 'TP',
-                                        shape: side === 'buy' ? 'arrowUp' : 'arrowDown'
-                                        });
-                                    }
-                                    }
-
-                                    console.log(`Processed ${ohlcv.length} candles and ${signals.length} signals`);
-                                    resolve({ ohlcv, signals });
-                                },
-                                error: function(error) {
-                                    reject(error);
-                                }
-                            });
-                        },
-                        error: function(error) {
-                            reject(error);
-                        }
-                    });
-                });
-            }
-              async function fetchText(url) {
-                const res = await fetch(url, { cache: 'no-store' });
-                if (!res.ok) throw new Error(`Fetch failed: ${url}`);
-                return await res.text();
-            }
-
-            async function processDefault() {
-                showLoading(); hideError(); hideSuccess();
-                try {
-                    const ohlcvCsv = await fetchText('/data/sample_ohlcv.csv');
-                    const tradesCsv = await fetchText('/data/sample_trades.csv');
-
-                    const result = await processDataFiles(ohlcvCsv, tradesCsv);
-                    updateChart(result.ohlcv, result.signals);
-                    showSuccess(`✅ Default chart loaded! ${result.ohlcv.length} candles, ${result.signals.length} signals`);
-                } catch (err) {
-                    showError('❌ Gagal memuat data default: ' + err.message);
-                    console.error(err);
-                } finally {
-                    hideLoading();
-                }
-            }
-            function formatPrice(p) {
-                if (!Number.isFinite(p)) return '';
-                const ap = Math.abs(p);
-                if (ap >= 1000) return p.toFixed(1);
-                if (ap >= 1)    return p.toFixed(2);
-                if (ap >= 0.1)  return p.toFixed(3);
-                if (ap >= 0.01) return p.toFixed(4);
-                return p.toFixed(5);
-                }
-
-            function updateChart(ohlcvData, signalsData) {
-            if (ohlcvData.length === 0) {
-                showError('❌ No valid OHLCV data found');
-                return;
-            }
-
-            // Sort & set
-            ohlcvData.sort((a, b) => a.time - b.time);
-            candleSeries.setData(ohlcvData);
-
-            signalsData.sort((a, b) => a.time - b.time);
-            const markers = signalsData.map(signal => {
-            let txt = signal.text || '';
-            // ringkas angka untuk SL/TP saja
-            if (signal.type === 'sl' && Number.isFinite(signal.price)) {
-                txt = `SL ${formatPrice(signal.price)}`;
-            } else if (signal.type === 'tp' && Number.isFinite(signal.price)) {
-                txt = `TP ${formatPrice(signal.price)}`;
-            }
-            // entry dibiarkan apa adanya (warna sudah membedakan win/loss)
-            return {
-                time: signal.time,
-                position: signal.side === 'buy' ? 'belowBar' : 'aboveBar',
-                color: signal.color,
-                shape: signal.shape,
-                text: txt,
-            };
-            });
-
-            candleSeries.setMarkers(markers);
-
-            // >>>>>> simpan untuk hover highlight
-            _signalsGlobal = signalsData;
-
-            // >>>>>> pasang listener crosshair untuk hover
-            attachCrosshairHover();
-
-            chart.timeScale().fitContent();
-            document.getElementById('candle-count').textContent = `Candles: ${ohlcvData.length}`;
-            document.getElementById('signal-count').textContent = `Signals: ${signalsData.length}`;
-            }
-            function clearHoverLines() {
-            if (!_hoverLines || !_hoverLines.length) return;
-            for (const pl of _hoverLines) {
-                try { candleSeries.removePriceLine(pl); } catch (e) {}
-            }
-            _hoverLines = [];
-            }
-
-            function addHoverLine(price, color, title) {
-            const pl = candleSeries.createPriceLine({
-                price: price,
-                color: color,
-                lineWidth: 1,
-                lineStyle: LightweightCharts.LineStyle.Dashed,
-                axisLabelVisible: true,               // <— tampilkan label di sumbu harga
-                title: title || ''                    // <— isi label (mis. "SL 1.2345")
-            });
-            _hoverLines.push(pl);
-            }
-
-
-            function attachCrosshairHover() {
-            if (!chart || !candleSeries) return;
-
-            // hindari dobel binding: hapus dahulu dengan membuat handler tunggal
-            if (attachCrosshairHover._attached) return;
-            attachCrosshairHover._attached = true;
-
-            chart.subscribeCrosshairMove(param => {
-                if (!_hoverEnabled) return;
-                // kalau mouse keluar chart
-                if (!param || !param.time) {
-                clearHoverLines();
-                return;
-                }
-                const hoveredTime = (typeof param.time === 'object' && 'timestamp' in param.time)
-                ? param.time.timestamp
-                : param.time;
-
-                // cari entry signal terdekat di waktu ini
-                // toleransi: +/- 1 bar (waktu sama)
-                // NOTE: markers di-set per bar, jadi cocokkan time persis lebih stabil
-                const entriesAtTime = _signalsGlobal.filter(s => s.type === 'entry' && s.time === hoveredTime);
-
-                // jika tidak ada entry di bar ini, bersihkan garis
-                if (!entriesAtTime.length) {
-                clearHoverLines();
-                return;
-                }
-
-                // pilih satu entry (kalau multiple, ambil pertama)
-                const s = entriesAtTime[0];
-
-                // render ulang garis hover
-                clearHoverLines();
-
-                // style warna transparan
-                const colEntry = 'rgba(46, 204, 113, 0.35)'; // sedikit lebih jelas
-                const colSL    = 'rgba(231, 76, 60, 0.35)';
-                const colTP    = 'rgba(52, 152, 219, 0.35)';
-
-                if (Number.isFinite(s.entryLevel)) addHoverLine(s.entryLevel, colEntry, `E ${formatPrice(s.entryLevel)}`);
-                if (Number.isFinite(s.slLevel))    addHoverLine(s.slLevel,    colSL,    `SL ${formatPrice(s.slLevel)}`);
-                if (Number.isFinite(s.tpLevel))    addHoverLine(s.tpLevel,    colTP,    `TP ${formatPrice(s.tpLevel)}`);
-
-            });
-            }
-
-
-            function showLoading() {
-                document.getElementById('loading').style.display = 'block';
-            }
-
-            function hideLoading() {
-                document.getElementById('loading').style.display = 'none';
-            }
-
-            function showError(message) {
-                const errorEl = document.getElementById('error-message');
-                errorEl.textContent = message;
-                errorEl.style.display = 'block';
-            }
-
-            function hideError() {
-                document.getElementById('error-message').style.display = 'none';
-            }
-
-            function showSuccess(message) {
-                const successEl = document.getElementById('success-message');
-                successEl.textContent = message;
-                successEl.style.display = 'block';
-            }
-
-            function hideSuccess() {
-                document.getElementById('success-message').style.display = 'none';
-            }
-
-            // Handle window resize
-            window.addEventListener('resize', () => {
-                if (chart) {
-                    chart.applyOptions({
-                        width: document.getElementById('chart-container').clientWidth
-                    });
-                }
-            });
-
-            // Initialize chart on load
-            document.addEventListener('DOMContentLoaded', async () => {
-            initChart();
-            await processDefault();  // auto muat data default agar chart & markers langsung tampil
-            });
-
-        </script>
-    </body>
-    </html>
+async def serve_chart(request: Request):
+    """Serve the main chart page (templates/charts.html, pre-compressed, ETag)"""
+    return chart_page.response(request.headers)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request latency, stage timings and cache counters in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def _dataset_path(dataset: str) -> str:
+    try:
+        return ingest.dataset_path(dataset)
+    except ingest.DatasetNotFound:
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset}")
+
+
+def _check_kind(dataset: str, found: str, kind: str) -> None:
+    if found != kind:
+        raise HTTPException(status_code=400, detail=f"Dataset {dataset} is {found}, expected {kind}")
+
+
+def _entry(dataset: str, kind: str):
+    """Store entry of a dataset whose header is a ``kind`` table ('ohlcv' / 'trades')."""
+    entry = store.entry(_dataset_path(dataset))
+    _check_kind(dataset, ingest.table_kind(entry.columns), kind)
+    return entry
+
+
+def _pyramid(entry) -> pyramid.Pyramid:
+    return pyramid.Pyramid(ingest.load_ohlcv(entry), entry.derived("pyramid", pyramid.build))
+
+
+def _load_ohlcv(dataset: str) -> pyramid.Pyramid:
+    return _pyramid(_entry(dataset, "ohlcv"))
+
+
+def _ohlcv_payload(dataset: str, cols, **extra) -> dict:
+    payload = {"dataset": dataset, "count": int(len(cols["time"]))}
+    payload.update(extra)
+    payload.update({k: np.asarray(cols[k]) for k in ingest.OHLCV_FIELDS})
+    return payload
+
+
+def _level(pyr: pyramid.Pyramid, timeframe: Optional[str]):
+    try:
+        return pyr.base if timeframe is None else pyr.level(timeframe)
+    except pyramid.UnknownTimeframe:
+        raise HTTPException(status_code=400, detail=f"Unknown timeframe: {timeframe} "
+                                                    f"(available: {', '.join(pyr.timeframes)})")
+
+
+# format=bin -> kolom biner (typed array di halaman), lihat modul wire
+FORMAT = Query("json", pattern="^(json|bin)$")
+
+# Handler yang membaca data memakai def biasa: FastAPI menjalankannya di threadpool,
+# jadi cache yang masih dingin tidak menahan event loop (/, /api/jobs tetap responsif)
+
+
+@app.get("/api/ohlcv/{dataset}")
+def get_ohlcv(dataset: str, timeframe: Optional[str] = None, format: str = FORMAT):
+    """Chart-ready OHLCV columns for a stored dataset (data/<dataset>.csv)"""
+    pyr = _load_ohlcv(dataset)
+    return wire.response(_ohlcv_payload(dataset, _level(pyr, timeframe)), format)
+
+
+@app.get("/api/ohlcv")
+def get_ohlcv_range(
+    dataset: str,
+    start: Optional[int] = Query(None, alias="from"),
+    end: Optional[int] = Query(None, alias="to"),
+    max_bars: int = Query(2000, ge=1, le=1_000_000),
+    timeframe: Optional[str] = None,
+    format: str = FORMAT,
+):
+    """OHLCV for a time range, aggregated when it holds more than max_bars bars"""
+    entry = _entry(dataset, "ohlcv")
+    pyr = _pyramid(entry)
+    _level(pyr, timeframe)
+    view, interval = pyr.query(start, end, max_bars, timeframe)
+    time = pyr.base["time"]
+    first, last = (int(time[0]), int(time[-1])) if len(time) else (None, None)
+    return wire.response(_ohlcv_payload(
+        dataset, view,
+        interval=interval, base_interval=pyr.base_interval,
+        timeframe=timeframe, timeframes=pyr.timeframes,
+        first=first, last=last, offset=entry.meta["size"],
+    ), format)
+
+@app.get("/api/signals/{export}")
+def get_signals(
+    export: str,
+    ohlcv: Optional[str] = None,
+    start: Optional[int] = Query(None, alias="from"),
+    end: Optional[int] = Query(None, alias="to"),
+    max_trades: Optional[int] = Query(None, ge=1),
+    bucket: Optional[int] = Query(None, ge=1),
+    format: str = FORMAT,
+):
+    """Classified trades and entry/SL/TP marker columns for an export file
+
+    With ``ohlcv`` the entry index is keyed by that dataset's candles.
+    ``from``/``to`` (epoch seconds, ``to`` exclusive) return only the trades
+    of that window; with more than ``max_trades`` of them the window comes
+    back as win/loss ``clusters`` per ``bucket`` seconds instead.
+    """
+    entry = _entry(export, "trades")
+    arrays = entry.derived("signals", signals.signals_from_entry)
+    ohlcv_entry = _entry(ohlcv, "ohlcv") if ohlcv else None
+    # Index entry per bar disimpan per versi OHLCV: window zoom/scroll hanya memotongnya
+    index = entry.derived(signals.index_name(ohlcv_entry), lambda e: signals.entry_index(
+        signals.split(arrays)[0], ingest.load_ohlcv(ohlcv_entry)["time"] if ohlcv_entry else None))
+    return wire.response(signals.payload(export, arrays, extra={"offset": entry.meta["size"]},
+                                         start=start, end=end, max_trades=max_trades,
+                                         bucket=bucket, index=index), format)
+
+@app.get("/api/live/{dataset}")
+async def live_tail(request: Request, dataset: str, offset: Optional[int] = Query(None, ge=0)):
+    """Server-Sent Events with the rows appended to a dataset after ``offset``
+
+    ``offset`` is the ``offset`` field of the /api/ohlcv or /api/signals
+    payload the page rendered; EventSource reconnects resume from
+    Last-Event-ID. Deltas use the same column layout as those endpoints.
+    """
+    path = _dataset_path(dataset)
+    resume = request.headers.get("last-event-id", "")
+    start = int(resume) if resume.isdigit() else offset
+    tail = await run_in_threadpool(live.Tail, path, start)
+    return StreamingResponse(
+        live.events(tail, dataset, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/analytics/{export}")
+def get_analytics(export: str):
+    """Equity curve, drawdown, summary stats and R/MFE/MAE histograms for an export"""
+    arrays = _entry(export, "trades").derived("analytics", analytics.analytics_from_entry)
+    return JSONResponse(content=analytics.payload(export, arrays))
+
+@app.get("/api/replay/{export}")
+def get_replay(export: str, ohlcv: str, mismatches_only: bool = False):
+    """Replay an export's trades over an OHLCV dataset and check them against the export
+
+    Per trade: bars held, first bar touching SL/TP, realised MFE/MAE in R and
+    mismatch ``flags`` (bit values in the payload's ``flags``).
+    """
+    entry = _entry(export, "trades")
+    ohlcv_entry = _entry(ohlcv, "ohlcv")
+    arrays = entry.derived(replay.derived_name(ohlcv_entry),
+                           lambda e: replay.replay_entry(e, ingest.load_ohlcv(ohlcv_entry)))
+    rows = np.flatnonzero(arrays["flags"] & replay.MISMATCH) if mismatches_only else None
+    return JSONResponse(content=replay.payload(export, arrays, rows))
+
+@app.get("/api/sweep/{export}")
+def get_sweep(
+    export: str,
+    ohlcv: str,
+    sl: Optional[str] = None,
+    rr: Optional[str] = None,
+    tp: Optional[str] = None,
+    max_bars: int = Query(replay.MAX_OPEN_BARS, ge=1, le=sweep.MAX_BARS),
+    combo: Optional[int] = Query(None, ge=0),
+    format: str = FORMAT,
+):
+    """What-if exits: re-simulate an export's entries for a grid of SL/TP settings
+
+    ``sl`` are stop multipliers of each trade's stop distance (``0.5,1,1.5``);
+    targets are ``rr`` R:R ratios of the new stop or ``tp`` multipliers of
+    the trade's target distance. Per combination a summary, plus the outcome
+    and pnl (R) of every trade, combination-major (``combo`` selects one).
+    A grid not cached yet whose trades x combinations exceed
+    ``sweep.SYNC_CELLS`` is submitted as a ``sweep`` job instead: 202 with
+    the job, poll /api/jobs/{id} and repeat the request once it is done.
+    """
+    try:
+        spec = sweep.grid(sl, rr, tp)
+    except sweep.BadGrid as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    count = len(spec["sl"]) * len(spec["target"])
+    if combo is not None and combo >= count:
+        raise HTTPException(status_code=400, detail=f"combo must be below {count}")
+    entry = _entry(export, "trades")
+    ohlcv_entry = _entry(ohlcv, "ohlcv")
+    name = sweep.derived_name(ohlcv_entry, spec, max_bars)
+    if not entry.has_derived(name) and entry.rows * count > sweep.SYNC_CELLS:
+        params = {"export": export, "ohlcv": ohlcv, "sl": sl, "rr": rr, "tp": tp, "max_bars": max_bars}
+        job = _submit_job("sweep", {k: v for k, v in params.items() if v})
+        return JSONResponse(status_code=202, content={"export": export, "job": job})
+    marks = entry.derived("signals", signals.signals_from_entry)
+    arrays = entry.derived(name, lambda e: sweep.from_signals(marks, ingest.load_ohlcv(ohlcv_entry), spec, max_bars))
+    return wire.response(sweep.payload(export, arrays, spec, combo), format)
+
+@app.get("/api/compare")
+async def compare_runs(
+    exports: str = "*",
+    base: Optional[str] = None,
+    columns: Optional[str] = None,
+    changed_only: bool = False,
+):
+    """Align trades of several exports by entry time/side and report per-run deltas
+
+    ``exports`` is a comma-separated list ('*' = every trade export in data/);
+    exports are loaded in parallel worker processes.
+    """
+    names = ingest.list_datasets("trades") if exports.strip() == "*" \
+        else [n.strip() for n in exports.split(",") if n.strip()]
+    if not names:
+        raise HTTPException(status_code=400, detail="No exports to compare")
+    paths = [_dataset_path(n) for n in names]
+    for name, kind in zip(names, await run_in_threadpool(lambda: [ingest.file_kind(p) for p in paths])):
+        _check_kind(name, kind, "trades")
+    if base is not None and base not in names:
+        raise HTTPException(status_code=400, detail=f"Base run not in exports: {base}")
+    fields = trades.parse_columns(columns) or compare.COMPARE_COLUMNS
+    runs = await run_in_threadpool(compare.load_runs, paths, fields)
+    report = await run_in_threadpool(
+        compare.compare, runs, base=names.index(base) if base else 0, changed_only=changed_only)
+    return JSONResponse(content=report)
+
+def _cohort_pivot(export: str, by: str, where: Optional[str]):
+    entry = _entry(export, "trades")
+    try:
+        filters = cohorts.parse_where(where)
+        keys = trades.resolve_columns(entry, trades.parse_columns(by) or [])
+        columns = trades.resolve_columns(entry, [col for col, _ in filters])
+        filters = tuple(sorted((stored, values) for stored, (_, values) in zip(columns, filters)))
+        return cohorts.pivot(entry, keys, filters)
+    except trades.UnknownColumns as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(exc.args[0])}")
+    except cohorts.BadQuery as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/api/cohorts")
+async def get_cohorts(export: str, by: Optional[str] = None, where: Optional[str] = None):
+    """Trades, win rate and pnl of an export pivoted by one or two feature columns
+
+    ``by=rsi_bin,vwap_side``; ``where=regime_entry:trend|range,signal:BUY``
+    filters trades first. Without ``by`` only the groupable features are listed.
+    """
+    if not by:
+        entry = _entry(export, "trades")
+        return JSONResponse(content={"export": export, "features": cohorts.features(entry)})
+    result = await run_in_threadpool(_cohort_pivot, export, by, where)
+    return JSONResponse(content={"export": export, **result["payload"]})
+
+@app.get("/api/cohorts/trades")
+async def get_cohort_trades(export: str, by: str, cell: str, where: Optional[str] = None):
+    """Trades in one pivot cell (``cell`` = label positions, e.g. ``2,0``), numbered like
+    ``markers.trade`` in /api/signals"""
+    try:
+        position = [int(i) for i in cell.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Bad cell: {cell}")
+    result = await run_in_threadpool(_cohort_pivot, export, by, where)
+    try:
+        picked = cohorts.cell_trades(result, position)
+    except cohorts.BadQuery as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return JSONResponse(content={"export": export, "count": int(len(picked)), "trades": picked.tolist()})
+
+@app.get("/api/trades/{export}")
+def get_trades(export: str, columns: Optional[str] = None):
+    """Selected columns of an export (default: the charting set, '*' = all)"""
+    entry = _entry(export, "trades")
+    try:
+        names = trades.resolve_columns(entry, trades.parse_columns(columns))
+    except trades.UnknownColumns as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(exc.args[0])}")
+    return JSONResponse(content={
+        "export": export,
+        "count": entry.rows,
+        "columns": trades.project(entry, names),
+        "available": entry.columns,
+    })
+
+@app.get("/api/trades")
+def query_trades(
+    dataset: str,
+    start: Optional[int] = Query(None, alias="from"),
+    end: Optional[int] = Query(None, alias="to"),
+    by: str = Query("entry", pattern="^(entry|close)$"),
+    limit: int = Query(trades.DEFAULT_LIMIT, ge=1, le=trades.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    columns: Optional[str] = None,
+):
+    """Trades of an export whose entry (``by=close``: exit) time is in ``[from, to)``
+
+    Paginated: pass ``next_cursor`` of a page as ``cursor`` for the next one.
+    Each page binary-searches a sorted time index and reads only its rows.
+    """
+    entry = _entry(dataset, "trades")
+    try:
+        names = trades.resolve_columns(entry, trades.parse_columns(columns))
+    except trades.UnknownColumns as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(exc.args[0])}")
+    index = entry.derived(trades.INDEX_NAME, trades.build_index)
+    try:
+        result = trades.page(index, by, start, end, limit, cursor)
+    except trades.BadCursor:
+        raise HTTPException(status_code=400, detail=f"Bad cursor: {cursor}")
+    return JSONResponse(content={
+        "dataset": dataset,
+        "by": by,
+        "from": start,
+        "to": end,
+        "total": result["total"],
+        "count": int(len(result["rows"])),
+        "rows": result["rows"],
+        "time": result["time"],
+        "columns": trades.project(entry, names, result["rows"]),
+        "next_cursor": result["next"],
+    })
+
+UPLOAD_CHUNK = 1 << 20
+# Batas ukuran upload (MB), bisa diubah lewat env CHART_MAX_UPLOAD_MB
+MAX_UPLOAD_BYTES = int(os.environ.get("CHART_MAX_UPLOAD_MB", "2048")) << 20
+
+
+def _new_dataset_id(name: Optional[str]) -> str:
+    stem = os.path.splitext(os.path.basename(name or "upload"))[0]
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "_", stem).strip("_")[:60] or "upload"
+    return f"{stem}-{uuid.uuid4().hex[:8]}"
+
+
+# Parameter dataset job -> jenis tabel yang harus dimilikinya
+DATASET_KINDS = {"ohlcv": "ohlcv", "export": "trades"}
+
+# kind -> parameter dataset yang wajib ada (kunci cache job = versi file-file ini)
+JOB_SOURCES = {
+    "ingest": ("dataset",),
+    "prepare": ("ohlcv", "export"),
+    "replay": ("export", "ohlcv"),
+    "sweep": ("export", "ohlcv"),
+}
+
+
+def _submit_job(kind: str, params: dict) -> dict:
+    if kind not in JOB_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {kind} "
+                                                    f"(available: {', '.join(JOB_SOURCES)})")
+    names = [params.get(k) for k in JOB_SOURCES[kind]]
+    if kind == "prepare":
+        names = names[:1] + [n for n in names[1:] if n]
+    if not all(isinstance(n, str) and n for n in names):
+        raise HTTPException(status_code=400, detail=f"Job {kind} needs: {', '.join(JOB_SOURCES[kind])}")
+    for param, name in zip(JOB_SOURCES[kind], [params.get(k) for k in JOB_SOURCES[kind]]):
+        if name and param in DATASET_KINDS:
+            _check_kind(name, ingest.file_kind(_dataset_path(name)), DATASET_KINDS[param])
+    if kind == "sweep":
+        try:
+            sweep.grid(params.get("sl"), params.get("rr"), params.get("tp"))
+            sweep.check_max_bars(params.get("max_bars") or replay.MAX_OPEN_BARS)
+        except sweep.BadGrid as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    key = [tasks.source_key([_dataset_path(n) for n in names]), sorted(params.items())]
+    try:
+        return job_queue.submit(kind, params, key=key)
+    except jobs.QueueFull as exc:
+        raise HTTPException(status_code=503, detail=f"Job queue full: {exc}")
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: Request):
+    """Queue a background computation: ``{"kind": "prepare", "params": {"ohlcv": ..., "export": ...}}``
+
+    Kinds: ``ingest`` (dataset), ``prepare`` (ohlcv + optional export: every
+    cache the chart reads), ``replay`` (export over ohlcv), ``sweep`` (SL/TP
+    grid over an export's entries, see /api/sweep). An identical job
+    for unchanged files returns the running or finished (cached) job.
     """
-    return HTMLResponse(content=html_content)
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    if not isinstance(body, dict) or not isinstance(body.get("params", {}), dict):
+        raise HTTPException(status_code=400, detail="Expected {kind, params}")
+    state = await run_in_threadpool(_submit_job, str(body.get("kind")), body.get("params", {}))
+    return JSONResponse(status_code=202, content=state)
+
+
+def _job(job_id: str) -> dict:
+    state = job_queue.get(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return state
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    """State, progress (0..1), stage and result of a job
+
+    With ``wait`` the request returns as soon as the job reports progress or
+    finishes (long polling), at the latest after ``wait`` seconds.
+    """
+    state = _job(job_id)
+    deadline = asyncio.get_running_loop().time() + wait
+    while state["state"] not in jobs.FINAL and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.2)
+        current = _job(job_id)
+        if current["updated"] != state["updated"] or current["state"] != state["state"]:
+            state = current
+            break
+    return JSONResponse(content=state, headers={"Cache-Control": "no-store"})
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    _job(job_id)
+    return JSONResponse(content=job_queue.cancel(job_id))
+
+
+async def _capped(stream, limit: int, error: Exception):
+    """``stream`` chunks; raises ``error`` once more than ``limit`` bytes arrived."""
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+        if size > limit:
+            raise error
+        yield chunk
+
+
+async def _read_form(request: Request, too_large: HTTPException) -> FormData:
+    """Multipart form parsed from the body as it streams in, so the upload cap
+    holds before the file part is spooled (also without Content-Length)."""
+    parser = MultiPartParser(request.headers, _capped(request.stream(), MAX_UPLOAD_BYTES, too_large),
+                             max_files=1, max_fields=10)
+    try:
+        return await parser.parse()
+    except MultiPartException as exc:
+        raise HTTPException(status_code=400, detail=exc.message)
+
+
+async def _upload_chunks(request: Request, upload: Optional[UploadFile]):
+    if upload is not None:
+        while chunk := await upload.read(UPLOAD_CHUNK):
+            yield chunk
+    else:
+        async for chunk in request.stream():
+            yield chunk
+
+
+@app.post("/api/datasets")
+async def upload_dataset(request: Request, name: Optional[str] = None):
+    """Stream a CSV upload to data/ in chunks and ingest it
+
+    Accepts a raw CSV body (``?name=`` sets the file name) or a multipart
+    form with a ``file`` field.  Returns the dataset id for the /api routes and
+    the ``ingest`` job building its caches (poll /api/jobs/{id}); a file that
+    cannot be parsed is removed again by that job.  Uploads over
+    ``MAX_UPLOAD_BYTES`` (env ``CHART_MAX_UPLOAD_MB``) are rejected with 413.
+    """
+    too_large = HTTPException(status_code=413, detail=f"Upload larger than {MAX_UPLOAD_BYTES >> 20} MB")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        raise too_large
+    content_type = request.headers.get("content-type", "")
+    form: Optional[FormData] = None
+    upload: Optional[UploadFile] = None
+    if content_type.startswith("multipart/form-data"):
+        form = await _read_form(request, too_large)
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            await form.close()
+            raise HTTPException(status_code=400, detail="Missing 'file' field")
+        name = name or upload.filename
+    try:
+        dataset, size = await _store_upload(request, upload, name, too_large)
+    finally:
+        if form is not None:
+            await form.close()
+
+    job = await run_in_threadpool(_submit_job, "ingest", {"dataset": dataset, "remove_on_error": True})
+    return JSONResponse(status_code=202, content={"dataset": dataset, "bytes": size, "job": job})
+
+
+async def _store_upload(request: Request, upload: Optional[UploadFile], name: Optional[str],
+                        too_large: HTTPException):
+    """Write the upload body to data/ in chunks; returns ``(dataset, bytes)``."""
+    dataset = _new_dataset_id(name)
+    path = os.path.join("data", f"{dataset}.csv")
+    part = os.path.join("data", f".{dataset}.part")
+    size = 0
+    try:
+        # Tulis file di threadpool: disk lambat tidak menahan event loop (SSE, /api lain)
+        f = await run_in_threadpool(open, part, "wb")
+        try:
+            buffer = bytearray()
+            async for chunk in _capped(_upload_chunks(request, upload), MAX_UPLOAD_BYTES, too_large):
+                size += len(chunk)
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK:
+                    await run_in_threadpool(f.write, buffer)
+                    buffer.clear()
+            await run_in_threadpool(f.write, buffer)
+        finally:
+            await run_in_threadpool(f.close)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+        os.rename(part, path)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return dataset, size
+
+def _warm() -> None:
+    """Build the column caches and chart artifacts of every file in data/ once,
+    before the workers start mapping them"""
+    for name in sorted(os.listdir("data")):
+        if not name.endswith(".csv"):
+            continue
+        try:
+            info = tasks.ingest_path(store, os.path.join("data", name))
+            print(f"  {name}: {info['kind']}, {info['rows']:,} rows")
+        except Exception as exc:
+            print(f"  {name}: skipped ({exc})")
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trading Chart App")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="production: N worker processes without the reloader (0 = one per core)")
+    parser.add_argument("--no-warm", action="store_true", help="do not pre-build caches before forking")
+    args = parser.parse_args()
+
     print("🚀 Starting Trading Chart App...")
-    print("📊 Open: http://localhost:8000")
-    print("✅ Chart will work 100% - No Streamlit restrictions!")
-    
-    # Hilangkan reload untuk menghilangkan warning
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    print(f"📊 Open: http://localhost:{args.port}")
+    from setup import VENDOR
+    missing = [name for name in VENDOR if not os.path.exists(os.path.join("static", "vendor", name))]
+    if missing:
+        print(f"⚠️  Missing static/vendor/{', '.join(missing)} (python setup.py); the page falls back to the CDN")
+    if args.workers is None:
+        print("✅ Chart will work 100% - No Streamlit restrictions!")
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
+    else:
+        workers = args.workers or os.cpu_count() or 1
+        # Worker berbagi cache/ (mmap read-only); dibangun sekali di sini
+        if not args.no_warm:
+            print("🔧 Building caches...")
+            _warm()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        os.environ["CHART_WORKERS"] = str(workers)
+        print(f"⚙️  Production mode: {workers} workers, no reloader")
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=workers,
+                    reload=False, access_log=False)
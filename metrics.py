@@ -0,0 +1,306 @@
+"""Request latency histograms, data-path stage spans and a Prometheus exposition.
+
+Stages call ``span(name)`` around their work (``rows``/``bytes`` processed
+are added to the span) and ``cache(name, hit)`` for cache lookups.  Every
+stage feeds process-wide histograms and counters; inside a request the
+spans are also collected per request and sent back as a ``Server-Timing``
+header, so the browser devtools show where the server time went (ingest,
+derived arrays, aggregation, serialization, compression) next to the
+network time it measures itself.
+
+With several worker processes (``share``) each worker writes a snapshot
+of its registry under a shared directory and ``render`` sums them, so a
+scrape of any worker reports the whole server.
+"""
+import bisect
+import contextvars
+import glob
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+# Batas bucket histogram (detik), seperti default prometheus_client ditambah ekor panjang
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Respons streaming (SSE) hidup selama koneksi; tidak masuk histogram latensi
+STREAMING_TYPES = ("text/event-stream",)
+# Snapshot worker ditulis paling sering sekali per interval ini
+DUMP_SECONDS = 1.0
+
+_requests: contextvars.ContextVar[Optional[List[Tuple[str, float, int, int]]]] = \
+    contextvars.ContextVar("metrics_requests", default=None)
+
+
+class _Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Labelled counters and histograms (what ``render`` exposes)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, _Histogram]] = {}
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self._help[name] = (kind, text)
+
+    def inc(self, name: str, labels: tuple, value: float = 1.0) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0.0) + value
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(labels)
+            if hist is None:
+                hist = series[labels] = _Histogram()
+            hist.observe(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": {name: [[list(labels), value] for labels, value in series.items()]
+                             for name, series in self._counters.items()},
+                "histograms": {name: [[list(labels), hist.counts, hist.sum] for labels, hist in series.items()]
+                               for name, series in self._histograms.items()},
+            }
+
+    def absorb(self, snapshot: dict) -> None:
+        """Add another registry's ``snapshot`` into this one."""
+        with self._lock:
+            for name, items in snapshot["counters"].items():
+                series = self._counters.setdefault(name, {})
+                for labels, value in items:
+                    key = tuple(tuple(pair) for pair in labels)
+                    series[key] = series.get(key, 0.0) + value
+            for name, items in snapshot["histograms"].items():
+                series = self._histograms.setdefault(name, {})
+                for labels, counts, total in items:
+                    key = tuple(tuple(pair) for pair in labels)
+                    hist = series.get(key)
+                    if hist is None:
+                        hist = series[key] = _Histogram()
+                    hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+                    hist.sum += total
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            names = sorted(set(self._counters) | set(self._histograms))
+            for name in names:
+                kind, text = self._help.get(name, ("untyped", ""))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                for labels, hist in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + (math.inf,), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(hist.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = Registry()
+_shared: Optional[str] = None
+_dumped = 0.0
+registry.describe("chart_http_request_duration_seconds", "histogram",
+                  "Request latency by route template and method")
+registry.describe("chart_http_responses_total", "counter", "Responses by route, method and status")
+registry.describe("chart_stage_duration_seconds", "histogram", "Time spent in a data-path stage")
+registry.describe("chart_stage_rows_total", "counter", "Rows processed by a data-path stage")
+registry.describe("chart_stage_bytes_total", "counter", "Bytes read or written by a data-path stage")
+registry.describe("chart_cache_requests_total", "counter", "Cache lookups by cache and result")
+
+
+class Span:
+    """Measurement of one stage run; ``add`` accumulates rows/bytes."""
+
+    __slots__ = ("name", "rows", "bytes")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, rows: int = 0, bytes: int = 0) -> None:
+        self.rows += int(rows)
+        self.bytes += int(bytes)
+
+
+@contextmanager
+def span(name: str, rows: int = 0, bytes: int = 0):
+    """Time the enclosed block as stage ``name``."""
+    current = Span(name)
+    current.add(rows, bytes)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        record(name, time.perf_counter() - start, current.rows, current.bytes)
+
+
+def record(name: str, seconds: float, rows: int = 0, bytes: int = 0) -> None:
+    """Add an already measured stage run (``span`` without the context manager)."""
+    labels = (("stage", name),)
+    registry.observe("chart_stage_duration_seconds", labels, seconds)
+    if rows:
+        registry.inc("chart_stage_rows_total", labels, rows)
+    if bytes:
+        registry.inc("chart_stage_bytes_total", labels, bytes)
+    spans = _requests.get()
+    if spans is not None:
+        spans.append((name, seconds, rows, bytes))
+
+
+def cache(name: str, hit: bool) -> None:
+    registry.inc("chart_cache_requests_total", (("cache", name), ("result", "hit" if hit else "miss")))
+
+
+def server_timing(spans, total: float) -> str:
+    """``Server-Timing`` value: one metric per stage (summed per request) and ``app``."""
+    merged: Dict[str, List[float]] = {}
+    for name, seconds, rows, nbytes in spans:
+        item = merged.setdefault(name, [0.0, 0, 0, 0])
+        item[0] += seconds
+        item[1] += 1
+        item[2] += rows
+        item[3] += nbytes
+    parts = []
+    for name, (seconds, count, rows, nbytes) in merged.items():
+        desc = [f"{count}x"] if count > 1 else []
+        if rows:
+            desc.append(f"{rows} rows")
+        if nbytes:
+            desc.append(f"{nbytes} B")
+        part = f"{name};dur={seconds * 1000:.1f}"
+        parts.append(part + (f';desc="{", ".join(desc)}"' if desc else ""))
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _route(scope) -> str:
+    path = getattr(scope.get("route"), "path", None)
+    if path:
+        return path
+    if scope.get("endpoint") is not None:
+        # Mount (/data, /static): prefix mount, tanpa nama file
+        mount = scope.get("root_path", "")[len(scope.get("app_root_path", "")):]
+        return mount + "/{path}"
+    # Path tanpa route (404) tidak dipakai sebagai label -> kardinalitas tetap kecil
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Latency histogram per route template, plus ``Server-Timing`` with the
+    request's stage spans on every HTTP response.
+
+    Add it last (outermost) so compression by ``assets.ConditionalMiddleware``
+    is part of the measured time.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        spans: list = []
+        token = _requests.set(spans)
+        start = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def timed(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                streaming = headers.get("content-type", "").startswith(STREAMING_TYPES)
+                if self.server_timing:
+                    headers.append("Server-Timing", server_timing(spans, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed)
+        finally:
+            _requests.reset(token)
+            labels = (("route", _route(scope)), ("method", scope["method"]))
+            if not streaming:
+                registry.observe("chart_http_request_duration_seconds", labels,
+                                 time.perf_counter() - start)
+            registry.inc("chart_http_responses_total", labels + (("status", str(status)),))
+            dump()
+
+
+def share(directory: str) -> None:
+    """Multi-worker mode: publish snapshots in ``directory`` and merge them in ``render``."""
+    global _shared
+    os.makedirs(directory, exist_ok=True)
+    _shared = directory
+
+
+def dump(force: bool = False) -> None:
+    """Write this worker's snapshot (at most every ``DUMP_SECONDS`` unless ``force``)."""
+    global _dumped
+    now = time.monotonic()
+    if _shared is None or (not force and now - _dumped < DUMP_SECONDS):
+        return
+    _dumped = now
+    path = os.path.join(_shared, f"{os.getpid()}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(path + ".tmp", path)
+
+
+def render() -> str:
+    if _shared is None:
+        return registry.render()
+    dump(force=True)
+    # Snapshot worker yang sudah mati tetap dijumlah -> counter tidak turun
+    merged = Registry()
+    merged._help = registry._help
+    for path in glob.glob(os.path.join(_shared, "*.json")):
+        try:
+            with open(path) as f:
+                merged.absorb(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return merged.render()
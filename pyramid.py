@@ -0,0 +1,155 @@
+"""Precomputed multi-timeframe pyramid (15m -> 1h -> 4h -> 1d -> 1w).
+
+Each OHLCV dataset gets every level coarser than its own bar size,
+aggregated once and stored as a ``store`` derived artifact (``pyramid``),
+so switching timeframe is a lookup.  When rows are appended to the source
+CSV, ``extend`` only re-aggregates from the last (possibly partial) bucket
+of each level onward.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import bars
+import ingest
+import metrics
+from ingest import OHLCV_FIELDS
+
+TIMEFRAMES = {
+    "1m": bars.MINUTE,
+    "5m": 5 * bars.MINUTE,
+    "15m": 15 * bars.MINUTE,
+    "30m": 30 * bars.MINUTE,
+    "1h": bars.HOUR,
+    "4h": 4 * bars.HOUR,
+    "1d": bars.DAY,
+    "1w": bars.WEEK,
+}
+LEVELS = ("15m", "1h", "4h", "1d", "1w")
+
+
+class UnknownTimeframe(ValueError):
+    pass
+
+
+def _level_labels(interval: int) -> List[str]:
+    return [label for label in LEVELS if TIMEFRAMES[label] > interval]
+
+
+def _aggregate_levels(base: Dict[str, np.ndarray], labels) -> Dict[str, np.ndarray]:
+    out = {}
+    for label in labels:
+        level = bars.aggregate(base, bars.bucket_start(base["time"], TIMEFRAMES[label]))
+        out.update({f"{label}.{k}": v for k, v in level.items()})
+    return out
+
+
+def _summary(base: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    time = base["time"]
+    return {
+        "base_rows": np.array([len(time)], dtype=np.int64),
+        "base_last": np.array([time[-1] if len(time) else 0], dtype=np.int64),
+        "base_interval": np.array([bars.base_interval(time)], dtype=np.int64),
+    }
+
+
+def build(entry) -> Dict[str, np.ndarray]:
+    """``store`` derived builder: all pyramid levels for an OHLCV entry."""
+    base = ingest.load_ohlcv(entry)
+    summary = _summary(base)
+    out = _aggregate_levels(base, _level_labels(int(summary["base_interval"][0])))
+    out.update(summary)
+    return out
+
+
+def extend(old: Dict[str, np.ndarray], entry, old_rows: int) -> Dict[str, np.ndarray]:
+    """``store`` extender: re-aggregate only the tail after an append."""
+    base = ingest.load_ohlcv(entry)
+    prev_rows = int(old["base_rows"][0])
+    prefix_ok = 0 < prev_rows <= len(base["time"]) and \
+        base["time"][prev_rows - 1] == old["base_last"][0]
+    if not prefix_ok:
+        return build(entry)
+
+    out = _summary(base)
+    out["base_interval"] = old["base_interval"]
+    for label in _level_labels(int(old["base_interval"][0])):
+        seconds = TIMEFRAMES[label]
+        old_time = old.get(f"{label}.time")
+        if old_time is None or not len(old_time):
+            out.update(_aggregate_levels(base, [label]))
+            continue
+        # Bucket terakhir mungkin belum lengkap: hitung ulang mulai dari sana
+        cut = int(old_time[-1])
+        tail = bars.window(base, cut, None)
+        fresh = bars.aggregate(tail, bars.bucket_start(tail["time"], seconds))
+        for k in OHLCV_FIELDS:
+            out[f"{label}.{k}"] = np.concatenate([old[f"{label}.{k}"][:-1], fresh[k]])
+    return out
+
+
+def timeframe_label(seconds: int) -> Optional[str]:
+    for label, value in TIMEFRAMES.items():
+        if value == seconds:
+            return label
+    return None
+
+
+class Pyramid:
+    """Read access to a dataset's base bars plus its stored levels."""
+
+    def __init__(self, base: Dict[str, np.ndarray], arrays: Dict[str, np.ndarray]):
+        self.base = base
+        self.arrays = arrays
+        self.base_interval = int(arrays["base_interval"][0])
+        self.labels = _level_labels(self.base_interval)
+
+    @property
+    def timeframes(self) -> List[str]:
+        base = timeframe_label(self.base_interval)
+        return ([base] if base else []) + self.labels
+
+    def seconds(self, timeframe: str) -> int:
+        if timeframe not in TIMEFRAMES or (
+            timeframe not in self.labels and TIMEFRAMES[timeframe] != self.base_interval
+        ):
+            raise UnknownTimeframe(timeframe)
+        return TIMEFRAMES[timeframe]
+
+    def level(self, timeframe: str) -> Dict[str, np.ndarray]:
+        if self.seconds(timeframe) == self.base_interval:
+            return self.base
+        return {k: self.arrays[f"{timeframe}.{k}"] for k in OHLCV_FIELDS}
+
+    def _window(self, label: str, start: Optional[int], end: Optional[int]):
+        lo = None if start is None else int(bars.bucket_start(np.int64(start), TIMEFRAMES[label]))
+        return bars.window(self.level(label), lo, end)
+
+    def query(self, start: Optional[int], end: Optional[int], max_bars: int,
+              timeframe: Optional[str] = None):
+        """Bars for ``[start, end]`` at ``timeframe`` (or auto), at most ~max_bars.
+
+        Returns ``(cols, interval)`` like ``bars.downsample``, with
+        ``interval`` always set to the returned bar size.
+        """
+        with metrics.span("aggregate") as span:
+            cols, interval = self._query(start, end, max_bars, timeframe)
+            span.add(rows=len(cols["time"]))
+        return cols, interval
+
+    def _query(self, start, end, max_bars, timeframe):
+        if timeframe is not None:
+            seconds = self.seconds(timeframe)
+            view = self._window(timeframe, start, end) if seconds != self.base_interval \
+                else bars.window(self.base, start, end)
+            cols, interval = bars.downsample(view, max_bars)
+            return cols, max(interval, seconds)
+
+        def source(size: int):
+            for label in reversed(self.labels):
+                if size % TIMEFRAMES[label] == 0:
+                    return self._window(label, start, end)
+            return None
+
+        cols, interval = bars.downsample(bars.window(self.base, start, end), max_bars, source)
+        return cols, interval or self.base_interval
@@ -0,0 +1,264 @@
+"""Replay every trade of an export over the OHLCV bars it was taken on.
+
+Each trade is mapped to a window of bars with ``searchsorted`` (the bar
+containing the entry through the exit bar, the one ending at ``close_ts``),
+the windows are gathered into one flat array and reduced per segment with
+``ufunc.reduceat``: realised MFE/MAE in R, the first bar touching SL and TP,
+and bars held, for all trades at once.  The result is checked against what
+the export reports (outcome, exit bar, ``mfe_R``/``mae_R``) and mismatches
+are flagged.
+
+Bar order inside the exit bar is unknown, so MFE/MAE cover the bars before
+it (the exporter's convention) and a bar touching both SL and TP cannot tell
+which came first (flagged ``AMBIGUOUS``).
+
+CLI::
+
+    python replay.py data/sample_trades.csv data/sample_ohlcv.csv [--mismatches]
+"""
+import argparse
+import sys
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from analytics import EXIT_TIME_ALIASES, MAE_ALIASES, MFE_ALIASES
+from bars import base_interval
+from ingest import coalesce_number, coalesce_time, normalize_headers, normalize_name
+import jobs
+import signals
+import store
+
+SOURCE_COLUMNS = tuple(dict.fromkeys(signals.SOURCE_COLUMNS + EXIT_TIME_ALIASES + MFE_ALIASES + MAE_ALIASES))
+
+# Bit flags per trade
+OUTCOME_MISMATCH = 1   # SL/TP yang tersentuh duluan beda dengan outcome export
+MFE_MISMATCH = 2
+MAE_MISMATCH = 4
+UNCOVERED = 8          # entry/close di luar data OHLCV
+AMBIGUOUS = 16         # SL dan TP tersentuh di bar yang sama
+NO_EXIT = 32           # tanpa close_ts: path dipotong di MAX_OPEN_BARS
+EXIT_MISMATCH = 64     # level SL/TP tersentuh di bar lain dari bar close_ts
+FLAGS = {
+    "outcome_mismatch": OUTCOME_MISMATCH, "exit_mismatch": EXIT_MISMATCH,
+    "mfe_mismatch": MFE_MISMATCH, "mae_mismatch": MAE_MISMATCH,
+    "uncovered": UNCOVERED, "ambiguous": AMBIGUOUS, "no_exit": NO_EXIT,
+}
+MISMATCH = OUTCOME_MISMATCH | EXIT_MISMATCH | MFE_MISMATCH | MAE_MISMATCH
+
+# Selisih MFE/MAE (dalam R) yang masih dianggap cocok
+R_TOLERANCE = 0.1
+MAX_OPEN_BARS = 5000
+# Elemen path (bar x trade) per batch: batas memori gather
+BATCH_BARS = 4_000_000
+
+COLUMNS = (
+    "row", "time", "side", "entry_bar", "bars_held", "first_sl", "first_tp",
+    "path_result", "result", "mfe_r", "mae_r", "export_mfe_r", "export_mae_r", "flags",
+)
+
+
+def windows(bar_time: np.ndarray, entry: np.ndarray, close: np.ndarray, interval: int = 0):
+    """First bar index and bar count of each trade's path, plus coverage flags.
+
+    ``close`` is the end of the exit bar: the last bar starting before it.
+    """
+    n = len(bar_time)
+    start = np.searchsorted(bar_time, entry, side="right") - 1
+    has_close = np.isfinite(close)
+    end = np.where(has_close,
+                   np.searchsorted(bar_time, np.where(has_close, close, 0), side="left") - 1,
+                   np.minimum(start + MAX_OPEN_BARS - 1, n - 1))
+    flags = np.where(has_close, 0, NO_EXIT).astype(np.int8)
+    last = bar_time[-1] + interval if n else 0
+    outside = (start < 0) | (entry > last) | (has_close & (close > last))
+    flags |= np.where(outside, UNCOVERED, 0).astype(np.int8)
+    length = np.where(start >= 0, np.maximum(end - start + 1, 1), 0)
+    return np.maximum(start, 0), length, flags
+
+
+def _gather(start: np.ndarray, length: np.ndarray):
+    """Flat bar indices of all windows and the offset of each window in them."""
+    offsets = np.cumsum(length) - length
+    flat = np.arange(int(length.sum()), dtype=np.int64) - np.repeat(offsets - start, length)
+    return flat, offsets
+
+
+def _first(hit: np.ndarray, pos: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    first = np.minimum.reduceat(np.where(hit, pos, np.iinfo(np.int64).max), offsets)
+    return np.where(first == np.iinfo(np.int64).max, -1, first)
+
+
+def path_stats(high: np.ndarray, low: np.ndarray, start: np.ndarray, length: np.ndarray,
+               side: np.ndarray, sl: np.ndarray, tp: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per window: highest high / lowest low before the last bar (-inf/inf if
+    none) and the first bar offset touching SL and TP (-1 = never).
+
+    ``length`` must be >= 1; batches keep the gathered path under ``BATCH_BARS``.
+    """
+    n = len(start)
+    out = {
+        "high": np.empty(n), "low": np.empty(n),
+        "first_sl": np.empty(n, dtype=np.int64), "first_tp": np.empty(n, dtype=np.int64),
+    }
+    ends = np.cumsum(length)
+    lo = 0
+    while lo < n:
+        hi = max(lo + 1, int(np.searchsorted(ends, ends[lo] - length[lo] + BATCH_BARS, side="right")))
+        s, ln = start[lo:hi], length[lo:hi]
+        flat, offsets = _gather(s, ln)
+        h, l = high[flat], low[flat]
+        pos = np.arange(len(flat), dtype=np.int64) - np.repeat(offsets, ln)
+        before_exit = pos < np.repeat(ln - 1, ln)
+        buy = np.repeat(side[lo:hi] == signals.BUY, ln)
+        sl_level, tp_level = np.repeat(sl[lo:hi], ln), np.repeat(tp[lo:hi], ln)
+        with np.errstate(invalid="ignore"):
+            hit_sl = np.where(buy, l <= sl_level, h >= sl_level)
+            hit_tp = np.where(buy, h >= tp_level, l <= tp_level)
+        out["high"][lo:hi] = np.maximum.reduceat(np.where(before_exit, h, -np.inf), offsets)
+        out["low"][lo:hi] = np.minimum.reduceat(np.where(before_exit, l, np.inf), offsets)
+        out["first_sl"][lo:hi] = _first(hit_sl, pos, offsets)
+        out["first_tp"][lo:hi] = _first(hit_tp, pos, offsets)
+        lo = hi
+        jobs.report(lo, n)
+    return out
+
+
+def replay(df, ohlcv: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Per-trade path columns (``COLUMNS``) for a raw export frame."""
+    trades = signals.classify(df)
+    df = normalize_headers(df.copy(deep=False))
+    rows = trades["row"]
+    close = coalesce_time(df, EXIT_TIME_ALIASES)[rows]
+    export_mfe = coalesce_number(df, MFE_ALIASES, default=None)[rows]
+    export_mae = coalesce_number(df, MAE_ALIASES, default=None)[rows]
+
+    bar_time = np.asarray(ohlcv["time"])
+    start, length, flags = windows(bar_time, trades["time"], close, base_interval(bar_time))
+    n = len(rows)
+    nan = np.full(n, np.nan)
+    stats = {"high": nan.copy(), "low": nan.copy(),
+             "first_sl": np.full(n, -1, dtype=np.int64), "first_tp": np.full(n, -1, dtype=np.int64)}
+    # Urut per bar awal: gap antar window di reduceat tetap O(bar)
+    order = np.flatnonzero(length > 0)
+    order = order[np.argsort(start[order], kind="stable")]
+    if len(order):
+        part = path_stats(np.asarray(ohlcv["high"]), np.asarray(ohlcv["low"]), start[order],
+                          length[order], trades["side"][order], trades["sl"][order], trades["tp"][order])
+        for k, v in part.items():
+            stats[k][order] = v
+
+    entry, buy = trades["entry"], trades["side"] == signals.BUY
+    with np.errstate(invalid="ignore", divide="ignore"):
+        risk = np.abs(entry - trades["sl"])
+        risk = np.where(risk > 0, risk, np.nan)
+        mfe = np.maximum(np.where(buy, stats["high"] - entry, entry - stats["low"]) / risk, 0.0)
+        mae = np.maximum(np.where(buy, entry - stats["low"], stats["high"] - entry) / risk, 0.0)
+
+    first_sl, first_tp = stats["first_sl"], stats["first_tp"]
+    sl_first = (first_sl >= 0) & ((first_tp < 0) | (first_sl < first_tp))
+    tp_first = (first_tp >= 0) & ((first_sl < 0) | (first_tp < first_sl))
+    both = (first_sl >= 0) & (first_sl == first_tp)
+    path_result = np.where(sl_first, signals.LOSS, np.where(tp_first, signals.PROFIT, signals.NONE))
+
+    result = trades["result"]
+    bars_held = (length - 1).astype(np.int64)
+    # Exit export di SL/TP: level itu harus pertama kali tersentuh di bar close_ts
+    exit_touch = np.where(result == signals.PROFIT, first_tp,
+                          np.where(result == signals.LOSS, first_sl, -1))
+    with np.errstate(invalid="ignore"):
+        flags |= np.where(both, AMBIGUOUS, 0).astype(np.int8)
+        flags |= np.where((exit_touch >= 0) & (exit_touch != bars_held)
+                          & np.isfinite(close), EXIT_MISMATCH, 0).astype(np.int8)
+        flags |= np.where((path_result != signals.NONE) & (result != signals.NONE)
+                          & (path_result != result), OUTCOME_MISMATCH, 0).astype(np.int8)
+        flags |= np.where(np.abs(mfe - export_mfe) > R_TOLERANCE, MFE_MISMATCH, 0).astype(np.int8)
+        flags |= np.where(np.abs(mae - export_mae) > R_TOLERANCE, MAE_MISMATCH, 0).astype(np.int8)
+
+    return {
+        "row": rows,
+        "time": trades["time"],
+        "side": trades["side"],
+        "entry_bar": np.where(length > 0, start, -1).astype(np.int64),
+        "bars_held": bars_held,
+        "first_sl": first_sl,
+        "first_tp": first_tp,
+        "path_result": path_result.astype(np.int8),
+        "result": result,
+        "mfe_r": mfe,
+        "mae_r": mae,
+        "export_mfe_r": export_mfe,
+        "export_mae_r": export_mae,
+        "flags": flags,
+    }
+
+
+def source_columns(columns):
+    wanted = set(SOURCE_COLUMNS)
+    return [c for c in columns if normalize_name(c) in wanted]
+
+
+def derived_name(ohlcv_entry) -> str:
+    """``store`` derived artifact name on the export, per OHLCV file version."""
+    return store.versioned_name("replay", ohlcv_entry)
+
+
+def replay_entry(entry, ohlcv: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return replay(entry.frame(source_columns(entry.columns)), ohlcv)
+
+
+def summary(arrays: Dict[str, np.ndarray]) -> dict:
+    flags = np.asarray(arrays["flags"])
+    checked = (flags & UNCOVERED) == 0
+    out = {"trades": int(len(flags)), "checked": int(checked.sum()),
+           "mismatched": int(((flags & MISMATCH) != 0).sum())}
+    out.update({name: int(((flags & bit) != 0).sum()) for name, bit in FLAGS.items()})
+    mfe_gap = np.abs(np.asarray(arrays["mfe_r"]) - np.asarray(arrays["export_mfe_r"]))
+    out["mean_mfe_gap_r"] = float(np.nanmean(mfe_gap)) if np.isfinite(mfe_gap).any() else None
+    return out
+
+
+def payload(name: str, arrays: Dict[str, np.ndarray], rows: Optional[np.ndarray] = None) -> dict:
+    """Summary plus per-trade columns (optionally only ``rows``)."""
+    pick = slice(None) if rows is None else rows
+    trades = {}
+    for k in COLUMNS:
+        values = np.asarray(arrays[k])[pick]
+        trades[k] = signals.nullable(values) if values.dtype.kind == "f" else values.tolist()
+    trades["side"] = [signals.SIDES[s] for s in trades["side"]]
+    return {
+        "export": name,
+        "summary": summary(arrays),
+        "flags": FLAGS,
+        "trades": dict(count=int(len(trades["row"])), **trades),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from store import ColumnStore
+    from ingest import is_export, load_ohlcv
+
+    parser = argparse.ArgumentParser(description="Replay trades over OHLCV bars and check the export")
+    parser.add_argument("export", help="trade export CSV")
+    parser.add_argument("ohlcv", help="OHLCV CSV the trades were taken on")
+    parser.add_argument("--mismatches", action="store_true", help="list mismatched trades")
+    args = parser.parse_args(argv)
+
+    store = ColumnStore(dedup=is_export)
+    ohlcv_entry = store.entry(args.ohlcv)
+    arrays = store.entry(args.export).derived(
+        derived_name(ohlcv_entry), lambda e: replay_entry(e, load_ohlcv(ohlcv_entry)))
+    for k, v in summary(arrays).items():
+        print(f"{k:>18}: {v}")
+    if args.mismatches:
+        for i in np.flatnonzero((np.asarray(arrays["flags"]) & MISMATCH) != 0):
+            names = [n for n, bit in FLAGS.items() if arrays["flags"][i] & bit]
+            print(f"row {arrays['row'][i]:>6}  path={int(arrays['path_result'][i]):>2} "
+                  f"export={int(arrays['result'][i]):>2}  mfe {arrays['mfe_r'][i]:.2f}/"
+                  f"{arrays['export_mfe_r'][i]:.2f}  mae {arrays['mae_r'][i]:.2f}/"
+                  f"{arrays['export_mae_r'][i]:.2f}  {','.join(names)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
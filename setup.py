@@ -1,6 +1,24 @@
 import os
 import subprocess
 import sys
+import urllib.request
+
+# Library JS di-vendor ke static/vendor (nama berversi -> disajikan immutable);
+# vendor_assets hanya mengambil file yang belum ada
+VENDOR = {
+    "lightweight-charts-4.0.1.standalone.production.js":
+        "https://unpkg.com/lightweight-charts@4.0.1/dist/lightweight-charts.standalone.production.js",
+}
+
+def vendor_assets(folder=os.path.join("static", "vendor")):
+    os.makedirs(folder, exist_ok=True)
+    for name, url in VENDOR.items():
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            continue
+        urllib.request.urlretrieve(url, path + ".part")
+        os.replace(path + ".part", path)
+        print(f"✅ Vendored: {name}")
 
 def setup_project():
     print("Setting up Trading Chart App...")
@@ -15,6 +33,9 @@ def setup_project():
     print("Installing dependencies...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "fastapi", "uvicorn", "pandas", "numpy", "python-multipart"])
     
+    print("Vendoring JS libraries...")
+    vendor_assets()
+    
     print("✅ Setup complete! Run: python main.py")
 
 if __name__ == "__main__":
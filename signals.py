@@ -0,0 +1,384 @@
+"""Vectorized trade classification and chart marker generation.
+
+A numpy port of the cascade the chart page ran per row in JavaScript:
+
+1. ``outcome/result/status`` strings (SL, LOSS, LOST, -1 / TP, WIN, ...)
+2. sign of ``pnl/profit/net``
+3. exit vs entry price, by side
+4. whether the exit is nearer the TP or the SL level
+
+Field lookups keep the JS semantics: ``a || b`` picks the first non-empty
+value per row, while ``Number(a ?? b)`` picks the first *column present*
+and treats an empty cell as 0 (``Number("") === 0``).
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ingest import TIME_ALIASES, coalesce_time, normalize_headers, normalize_name
+import store
+
+SIDE_ALIASES = ("signal", "side", "direction")
+OUTCOME_ALIASES = ("outcome", "result", "status")
+PNL_ALIASES = ("pnl", "profit", "net")
+ENTRY_ALIASES = ("entry_price", "entry", "price_entry", "price")
+EXIT_ALIASES = ("exit_price", "exit", "price_exit")
+SL_ALIASES = ("sl_price", "sl", "stop_loss", "stop")
+TP_ALIASES = ("tp_price", "tp", "take_profit", "target")
+
+LOSS_OUTCOMES = ("SL", "LOSS", "LOST", "-1")
+PROFIT_OUTCOMES = ("TP", "WIN", "TAKE_PROFIT", "PROFIT", "1")
+
+# Kolom mentah yang dibutuhkan engine (setelah normalisasi header)
+SOURCE_COLUMNS = tuple(dict.fromkeys(
+    TIME_ALIASES + SIDE_ALIASES + OUTCOME_ALIASES + PNL_ALIASES
+    + ENTRY_ALIASES + EXIT_ALIASES + SL_ALIASES + TP_ALIASES
+))
+
+BUY, SELL = 0, 1
+LOSS, NONE, PROFIT = -1, 0, 1
+ENTRY, SL, TP = 0, 1, 2
+
+SIDES = ("buy", "sell")
+TYPES = ("entry", "sl", "tp")
+
+
+def _style(kind: int, side: int, result: int) -> dict:
+    name = SIDES[side]
+    if kind == SL:
+        return {"type": "sl", "side": name, "color": "#FF0000", "text": "SL",
+                "shape": "arrowDown" if side == BUY else "arrowUp"}
+    if kind == TP:
+        return {"type": "tp", "side": name, "color": "#0000FF", "text": "TP",
+                "shape": "arrowUp" if side == BUY else "arrowDown"}
+    loss = result == LOSS
+    text = ("LOSS" if loss else "TP" if result == PROFIT else "ENTRY") + " " + name.upper()
+    if side == BUY:
+        shape = "arrowDown" if loss else "arrowUp"
+    else:
+        shape = "arrowUp" if loss else "arrowDown"
+    return {"type": "entry", "side": name, "color": "#e74c3c" if loss else "#2ecc71",
+            "text": text, "shape": shape}
+
+
+def style_id(kind, side, result):
+    """Index into ``STYLES``: 6 entry styles (side x result), then SL, then TP."""
+    kind = np.asarray(kind)
+    entry_id = np.asarray(side) * 3 + (np.asarray(result) + 1)
+    return np.where(kind == ENTRY, entry_id, 6 + (kind - 1) * 2 + np.asarray(side))
+
+
+STYLES: List[dict] = [_style(ENTRY, s, r) for s in (BUY, SELL) for r in (LOSS, NONE, PROFIT)] \
+    + [_style(SL, s, NONE) for s in (BUY, SELL)] + [_style(TP, s, NONE) for s in (BUY, SELL)]
+
+
+def _text(col: pd.Series) -> pd.Series:
+    """Column as JS-ish strings; missing -> ''."""
+    if pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_bool_dtype(col.dtype):
+        values = col.to_numpy(dtype=np.float64, na_value=np.nan)
+        whole = np.isfinite(values) & (values == np.round(values))
+        out = np.where(whole, np.char.mod("%d", np.where(whole, values, 0).astype(np.int64)),
+                       values.astype(str))
+        out = np.where(np.isnan(values), "", out)
+        return pd.Series(out, index=col.index)
+    return col.astype(object).where(col.notna(), "").astype(str)
+
+
+def _first_text(df: pd.DataFrame, aliases, default: str = "") -> pd.Series:
+    """``row.a || row.b || default`` as strings."""
+    out = pd.Series(default, index=df.index, dtype=object)
+    taken = np.zeros(len(df), dtype=bool)
+    for name in aliases:
+        if name not in df.columns:
+            continue
+        text = _text(df[name])
+        pick = (text.str.len() > 0).to_numpy() & ~taken
+        out[pick] = text[pick]
+        taken |= pick
+    return out
+
+
+def _first_number(df: pd.DataFrame, aliases) -> np.ndarray:
+    """``Number(row.a ?? row.b ?? NaN)``: first column present wins."""
+    for name in aliases:
+        if name in df.columns:
+            col = df[name]
+            if pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_bool_dtype(col.dtype):
+                values = col.to_numpy(dtype=np.float64, na_value=np.nan).copy()
+            else:
+                text = _text(col).str.strip()
+                values = pd.to_numeric(text, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+                values[(text.str.len() == 0).to_numpy()] = 0.0
+            # Number("") === 0 di JS
+            values[col.isna().to_numpy()] = 0.0
+            return values
+    return np.full(len(df), np.nan)
+
+
+def classify(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Per-trade columns for every row with a valid time.
+
+    ``result`` is PROFIT (1), LOSS (-1) or NONE (0); ``row`` is the index of
+    the trade in the source file.
+    """
+    df = normalize_headers(df.copy(deep=False))
+    time = coalesce_time(df)
+    valid = np.isfinite(time) & (time > 0)
+
+    side_raw = _first_text(df, SIDE_ALIASES, "buy").str.lower()
+    side = np.where(side_raw.isin(("sell", "short")).to_numpy(), SELL, BUY)
+
+    outcome = _first_text(df, OUTCOME_ALIASES).str.strip().str.upper()
+    pnl = _first_number(df, PNL_ALIASES)
+    entry = _first_number(df, ENTRY_ALIASES)
+    exit_ = _first_number(df, EXIT_ALIASES)
+    sl = _first_number(df, SL_ALIASES)
+    tp = _first_number(df, TP_ALIASES)
+
+    loss = outcome.isin(LOSS_OUTCOMES).to_numpy(copy=True)
+    profit = ~loss & outcome.isin(PROFIT_OUTCOMES).to_numpy()
+
+    with np.errstate(invalid="ignore"):
+        open_ = ~loss & ~profit & np.isfinite(pnl)
+        profit |= open_ & (pnl > 0)
+        loss |= open_ & (pnl < 0)
+
+        open_ = ~loss & ~profit & np.isfinite(entry) & np.isfinite(exit_)
+        gain = np.where(side == BUY, exit_ - entry, entry - exit_)
+        profit |= open_ & (gain > 0)
+        loss |= open_ & (gain < 0)
+
+        open_ = ~loss & ~profit & np.isfinite(exit_) & np.isfinite(sl) & np.isfinite(tp)
+        d_tp = np.abs(exit_ - tp)
+        d_sl = np.abs(exit_ - sl)
+        profit |= open_ & (d_tp < d_sl)
+        loss |= open_ & (d_sl < d_tp)
+
+    result = np.where(loss, LOSS, np.where(profit, PROFIT, NONE)).astype(np.int8)
+    rows = np.flatnonzero(valid)
+    return {
+        "row": rows.astype(np.int64),
+        "time": time[valid].astype(np.int64),
+        "side": side[valid].astype(np.int8),
+        "result": result[valid],
+        "entry": entry[valid],
+        "exit": exit_[valid],
+        "sl": sl[valid],
+        "tp": tp[valid],
+    }
+
+
+def markers(trades: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Entry/SL/TP marker columns, ordered by time then (trade, entry/sl/tp)."""
+    n = len(trades["time"])
+    kind = np.tile(np.array([ENTRY, SL, TP], dtype=np.int8), n)
+    trade = np.repeat(np.arange(n, dtype=np.int64), 3)
+    price = np.column_stack([trades["entry"], trades["sl"], trades["tp"]]).ravel()
+    keep = np.isfinite(price)
+    kind, trade, price = kind[keep], trade[keep], price[keep]
+    time = trades["time"][trade]
+    order = np.argsort(time, kind="stable")
+    kind, trade, price, time = kind[order], trade[order], price[order], time[order]
+    style = style_id(kind, trades["side"][trade], trades["result"][trade]).astype(np.int8)
+    return {"time": time, "price": price, "style": style, "trade": trade}
+
+
+def entry_index(trades: Dict[str, np.ndarray],
+                bar_time: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Bar time -> entry trades, as a sorted ``time`` array plus CSR ``offsets``.
+
+    Trades with ``time[i]`` are ``trade[offsets[i]:offsets[i + 1]]``.  With
+    ``bar_time`` (sorted candle times) every entry is keyed by the candle that
+    contains it, so trades falling between bar timestamps are not missed.
+    """
+    trade = np.flatnonzero(np.isfinite(trades["entry"]))
+    key = trades["time"][trade]
+    if bar_time is not None and len(bar_time):
+        pos = np.searchsorted(bar_time, key, side="right") - 1
+        inside = pos >= 0
+        key = np.where(inside, np.asarray(bar_time)[np.maximum(pos, 0)], key)
+    order = np.argsort(key, kind="stable")
+    key, trade = key[order], trade[order]
+    times, starts = np.unique(key, return_index=True)
+    return {
+        "time": times.astype(np.int64),
+        "offsets": np.append(starts, len(key)).astype(np.int64),
+        "trade": trade.astype(np.int64),
+    }
+
+
+def index_name(ohlcv_entry=None) -> str:
+    """``store`` derived name of the export's ``entry_index``, per OHLCV file version."""
+    if ohlcv_entry is None:
+        return "entry_index"
+    return store.versioned_name("entry_index", ohlcv_entry)
+
+
+def window_index(index: Dict[str, np.ndarray], ids: np.ndarray, start: Optional[int] = None,
+                 end: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """The persisted export ``entry_index`` cut to the window trades ``ids``
+    (sorted export positions, as from ``window``) and renumbered into them.
+
+    Entries are keyed at or before their time, so the window's keys start at
+    the last key ``<= start``; only that slice is filtered.
+    """
+    times, offsets, trade = index["time"], index["offsets"], index["trade"]
+    lo = 0 if start is None else max(0, int(np.searchsorted(times, start, side="right")) - 1)
+    hi = len(times) if end is None else max(lo, int(np.searchsorted(times, end, side="left")))
+    sel = trade[offsets[lo]:offsets[hi]]
+    key = np.repeat(times[lo:hi], np.diff(offsets[lo:hi + 1]))
+    pos = np.searchsorted(ids, sel)
+    keep = pos < len(ids)
+    keep[keep] = ids[pos[keep]] == sel[keep]
+    key, pos = key[keep], pos[keep]
+    times, starts = np.unique(key, return_index=True)
+    return {
+        "time": times.astype(np.int64),
+        "offsets": np.append(starts, len(key)).astype(np.int64),
+        "trade": pos.astype(np.int64),
+    }
+
+
+def source_columns(columns) -> List[str]:
+    """Raw column names (as stored) the engine reads from an export."""
+    wanted = set(SOURCE_COLUMNS)
+    return [c for c in columns if normalize_name(c) in wanted]
+
+
+def signals_from_entry(entry) -> Dict[str, np.ndarray]:
+    """``store`` derived builder: trade + marker columns for an export."""
+    trades = classify(entry.frame(source_columns(entry.columns)))
+    out = {f"trade.{k}": v for k, v in trades.items()}
+    out.update({f"marker.{k}": v for k, v in markers(trades).items()})
+    return out
+
+
+def extend(old: Dict[str, np.ndarray], entry, old_rows: int) -> Dict[str, np.ndarray]:
+    """``store`` extender: classify only rows appended since ``old_rows``."""
+    old_trades, old_marks = split(old)
+    new = classify(entry.frame(source_columns(entry.columns), rows=slice(old_rows, None)))
+    new["row"] = new["row"] + old_rows
+    new_marks = markers(new)
+    new_marks["trade"] = new_marks["trade"] + len(old_trades["time"])
+
+    trades = {k: np.concatenate([old_trades[k], new[k]]) for k in new}
+    marks = {k: np.concatenate([old_marks[k], new_marks[k]]) for k in new_marks}
+    if len(old_marks["time"]) and len(new_marks["time"]) \
+            and new_marks["time"][0] < old_marks["time"][-1]:
+        order = np.argsort(marks["time"], kind="stable")
+        marks = {k: v[order] for k, v in marks.items()}
+
+    out = {f"trade.{k}": v for k, v in trades.items()}
+    out.update({f"marker.{k}": v for k, v in marks.items()})
+    return out
+
+
+def split(arrays: Dict[str, np.ndarray]):
+    """Inverse of the ``trade.``/``marker.`` prefixing done for storage."""
+    trades = {k[6:]: v for k, v in arrays.items() if k.startswith("trade.")}
+    marks = {k[7:]: v for k, v in arrays.items() if k.startswith("marker.")}
+    return trades, marks
+
+
+def nullable(values: np.ndarray) -> list:
+    """Float column as a JSON-safe list (NaN -> null)."""
+    values = np.asarray(values, dtype=np.float64)
+    out = values.tolist()
+    if np.isnan(values).any():
+        for i in np.flatnonzero(np.isnan(values)):
+            out[i] = None
+    return out
+
+
+def window(trades: Dict[str, np.ndarray], marks: Dict[str, np.ndarray],
+           start: Optional[int] = None, end: Optional[int] = None):
+    """Trades and markers with time in ``[start, end)``.
+
+    Markers are stored sorted by time, so the window is two binary searches
+    plus the ``k`` markers inside it.  The selected trades keep their
+    position in the full export as ``id``; ``markers.trade`` points into the
+    selection.
+    """
+    times = marks["time"]
+    lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+    hi = len(times) if end is None else int(np.searchsorted(times, end, side="left"))
+    ids = np.unique(marks["trade"][lo:hi])
+    sub = {k: v[ids] for k, v in trades.items()}
+    sub["id"] = ids
+    sub_marks = {k: v[lo:hi] for k, v in marks.items()}
+    sub_marks["trade"] = np.searchsorted(ids, sub_marks["trade"])
+    return sub, sub_marks
+
+
+def clusters(trades: Dict[str, np.ndarray], bucket: int) -> Dict[str, np.ndarray]:
+    """Trade counts per ``bucket`` seconds by result (``win``/``loss``/``open``)."""
+    key = trades["time"] // bucket * bucket
+    times, inverse = np.unique(key, return_inverse=True)
+    result = trades["result"]
+    count = lambda mask: np.bincount(inverse[mask], minlength=len(times)).astype(np.int64)
+    return {
+        "time": times.astype(np.int64),
+        "win": count(result == PROFIT),
+        "loss": count(result == LOSS),
+        "open": count(result == NONE),
+    }
+
+
+def payload(name: str, arrays: Dict[str, np.ndarray], extra: Optional[dict] = None,
+            bar_time: Optional[np.ndarray] = None, start: Optional[int] = None,
+            end: Optional[int] = None, max_trades: Optional[int] = None,
+            bucket: Optional[int] = None, index: Optional[Dict[str, np.ndarray]] = None) -> dict:
+    """Chart payload of an export; ``start``/``end`` limit it to a time window.
+
+    When the window holds more than ``max_trades`` trades only per-``bucket``
+    ``clusters`` are sent (zoomed-out view), not the individual markers.
+    ``index`` is the export's persisted ``entry_index`` (same ``bar_time``);
+    without it the index is built for the trades sent.
+    """
+    trades, marks = split(arrays)
+    total = {"trades": int(len(trades["time"])), "markers": int(len(marks["time"]))}
+    windowed = start is not None or end is not None or max_trades is not None
+    if windowed:
+        trades, marks = window(trades, marks, start, end)
+    grouped = None
+    if max_trades is not None and len(trades["time"]) > max_trades:
+        span = int(trades["time"].max()) - int(trades["time"].min())
+        grouped = clusters(trades, bucket or span // 1000 + 1)
+        trades = {k: v[:0] for k, v in trades.items()}
+        marks = {k: v[:0] for k, v in marks.items()}
+    if grouped is not None or index is None:
+        index = entry_index(trades, bar_time)
+    elif windowed:
+        index = window_index(index, trades["id"], start, end)
+    body = {
+        "export": name,
+        "styles": STYLES,
+        "total": total,
+        "trades": {
+            "count": int(len(trades["time"])),
+            "row": np.asarray(trades["row"]),
+            "time": np.asarray(trades["time"]),
+            "side": np.asarray(trades["side"]),
+            "result": np.asarray(trades["result"]),
+            "entry": np.asarray(trades["entry"]),
+            "sl": np.asarray(trades["sl"]),
+            "tp": np.asarray(trades["tp"]),
+        },
+        "markers": {
+            "count": int(len(marks["time"])),
+            "time": np.asarray(marks["time"]),
+            "price": np.asarray(marks["price"]),
+            "style": np.asarray(marks["style"]),
+            "trade": np.asarray(marks["trade"]),
+        },
+        "index": {k: np.asarray(v) for k, v in index.items()},
+    }
+    if windowed:
+        body["trades"]["id"] = np.asarray(trades["id"])
+        body["window"] = [start, end]
+    if grouped is not None:
+        body["clusters"] = {"count": int(len(grouped["time"])), **grouped}
+    if extra:
+        body.update(extra)
+    return body
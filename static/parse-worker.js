@@ -0,0 +1,328 @@
+// Parsing CSV upload di luar UI thread (fallback bila server tidak menerima upload).
+// Parser CSV sendiri (streaming per chunk File), tanpa library dari luar.
+//
+// Pesan masuk:  { kind: 'ohlcv' | 'trades', file: File }
+// Pesan keluar: { type: 'progress', loaded, total }
+//               { type: 'done', payload }   kolom typed array (buffer ditransfer)
+//               { type: 'error', message }
+//
+// Bentuk payload sama dengan /api/ohlcv dan /api/signals, jadi halaman memakai
+// candlesFromColumns / signalsFromColumns yang sama untuk data lokal dan server.
+const CHUNK_SIZE = 4 << 20;
+const COMMA = 44, QUOTE = 34, CR = 13, LF = 10;
+
+// Kolom yang tumbuh sendiri (kapasitas x2), dipotong pas di akhir
+class Column {
+    constructor(Type, capacity = 1 << 16) {
+        this.Type = Type;
+        this.data = new Type(capacity);
+        this.length = 0;
+    }
+
+    push(value) {
+        if (this.length === this.data.length) {
+            const grown = new this.Type(this.data.length * 2);
+            grown.set(this.data);
+            this.data = grown;
+        }
+        this.data[this.length++] = value;
+    }
+
+    finish(order = null) {
+        if (!order) return this.data.slice(0, this.length);
+        const out = new this.Type(order.length);
+        for (let i = 0; i < order.length; i++) out[i] = this.data[order[i]];
+        return out;
+    }
+}
+
+// Record CSV dari `text` (RFC 4180: field berkutip boleh berisi koma, baris baru
+// dan "" sebagai kutip; baris kosong dilewati). Tanpa `final`, record terakhir
+// yang mungkin terpotong batas chunk dikembalikan sebagai `rest`.
+function splitRecords(text, final) {
+    const records = [];
+    const n = text.length;
+    let i = 0;
+    while (i < n) {
+        const start = i;
+        const fields = [];
+        for (;;) {
+            let field = '';
+            let k = i;
+            if (text.charCodeAt(i) === QUOTE) {
+                k = i + 1;
+                for (;;) {
+                    const q = text.indexOf('"', k);
+                    if (q === -1 || (q + 1 === n && !final)) {
+                        if (!final) return { records, rest: text.slice(start) };
+                        // kutip tidak ditutup: sisa teks jadi isi field
+                        field += text.slice(k);
+                        k = n;
+                        break;
+                    }
+                    field += text.slice(k, q);
+                    if (text.charCodeAt(q + 1) === QUOTE) {
+                        field += '"';
+                        k = q + 2;
+                        continue;
+                    }
+                    k = q + 1;
+                    break;
+                }
+                i = k;
+            }
+            while (k < n) {
+                const c = text.charCodeAt(k);
+                if (c === COMMA || c === LF || c === CR) break;
+                k++;
+            }
+            field += text.slice(i, k);
+            i = k;
+            fields.push(field);
+            if (i >= n && !final) return { records, rest: text.slice(start) };
+            if (i < n && text.charCodeAt(i) === COMMA) {
+                i++;
+                if (i < n) continue;
+                if (!final) return { records, rest: text.slice(start) };
+                fields.push('');
+            } else if (i < n) {
+                // CR, LF atau CRLF; CR di ujung chunk menyisakan LF = baris kosong berikutnya
+                i += text.charCodeAt(i) === CR && text.charCodeAt(i + 1) === LF ? 2 : 1;
+            }
+            break;
+        }
+        if (fields.length > 1 || fields[0] !== '') records.push(fields);
+    }
+    return { records, rest: '' };
+}
+
+// Baca `file` per CHUNK_SIZE byte; onRows(baris { header: string }, byte terbaca)
+async function readCsv(file, onRows) {
+    const decoder = new TextDecoder('utf-8');
+    let header = null;
+    let rest = '';
+    let offset = 0;
+    do {
+        const end = Math.min(file.size, offset + CHUNK_SIZE);
+        const final = end >= file.size;
+        const bytes = await file.slice(offset, end).arrayBuffer();
+        const parsed = splitRecords(rest + decoder.decode(bytes, { stream: !final }), final);
+        rest = parsed.rest;
+        let records = parsed.records;
+        if (header === null && records.length) {
+            header = records[0].map(h => h.trim().toLowerCase());
+            records = records.slice(1);
+        }
+        onRows(records.map((fields) => {
+            const row = {};
+            const count = Math.min(header.length, fields.length);
+            for (let k = 0; k < count; k++) row[header[k]] = fields[k];
+            return row;
+        }), end);
+        offset = end;
+    } while (offset < file.size);
+}
+
+// Epoch detik dari kolom waktu (angka epoch s/ms atau string tanggal); null jika tidak valid
+function parseTime(row) {
+    const dateStr = row.datetime || row.timestamp || row.date || row.time;
+    if (!dateStr) return null;
+    let timestamp;
+    if (!isNaN(dateStr)) {
+        const num = Number(dateStr);
+        // Heuristik: epoch ms jika > 10^12
+        timestamp = (num > 1e12) ? Math.floor(num / 1000) : num;
+    } else {
+        timestamp = Math.floor(new Date(dateStr).getTime() / 1000);
+    }
+    return (isFinite(timestamp) && timestamp > 0) ? timestamp : null;
+}
+
+// Urutan stabil berdasarkan waktu; null jika sudah terurut (kasus umum)
+function sortOrder(time, length) {
+    let sorted = true;
+    for (let i = 1; i < length && sorted; i++) sorted = time[i - 1] <= time[i];
+    if (sorted) return null;
+    const order = new Uint32Array(length);
+    for (let i = 0; i < length; i++) order[i] = i;
+    return Array.from(order).sort((a, b) => time[a] - time[b] || a - b);
+}
+
+function ohlcvParser() {
+    const cols = {
+        time: new Column(Float64Array), open: new Column(Float64Array), high: new Column(Float64Array),
+        low: new Column(Float64Array), close: new Column(Float64Array),
+    };
+    return {
+        rows(rows) {
+            for (const row of rows) {
+                const timestamp = parseTime(row);
+                if (timestamp === null) continue;
+                const open = parseFloat(row.open || row.o || 0);
+                const high = parseFloat(row.high || row.h || 0);
+                const low = parseFloat(row.low || row.l || 0);
+                const close = parseFloat(row.close || row.c || 0);
+                if (isNaN(open) || isNaN(high) || isNaN(low) || isNaN(close)) continue;
+                cols.time.push(timestamp);
+                cols.open.push(open);
+                cols.high.push(high);
+                cols.low.push(low);
+                cols.close.push(close);
+            }
+        },
+        finish() {
+            const count = cols.time.length;
+            const order = sortOrder(cols.time.data, count);
+            const payload = { count };
+            for (const k in cols) payload[k] = cols[k].finish(order);
+            return payload;
+        },
+    };
+}
+
+// Sama dengan signals.STYLES di server: 6 entry (side x hasil), lalu SL, lalu TP
+const SIDES = ['buy', 'sell'];
+const STYLES = [];
+for (const side of SIDES) {
+    for (const result of [-1, 0, 1]) {
+        const loss = result === -1;
+        const text = (loss ? 'LOSS' : (result === 1 ? 'TP' : 'ENTRY')) + ' ' + side.toUpperCase();
+        const shape = side === 'buy' ? (loss ? 'arrowDown' : 'arrowUp') : (loss ? 'arrowUp' : 'arrowDown');
+        STYLES.push({ type: 'entry', side, color: loss ? '#e74c3c' : '#2ecc71', text, shape });
+    }
+}
+for (const side of SIDES) {
+    STYLES.push({ type: 'sl', side, color: '#FF0000', text: 'SL', shape: side === 'buy' ? 'arrowDown' : 'arrowUp' });
+}
+for (const side of SIDES) {
+    STYLES.push({ type: 'tp', side, color: '#0000FF', text: 'TP', shape: side === 'buy' ? 'arrowUp' : 'arrowDown' });
+}
+
+const LOSS_OUTCOMES = ['SL', 'LOSS', 'LOST', '-1'];
+const PROFIT_OUTCOMES = ['TP', 'WIN', 'TAKE_PROFIT', 'PROFIT', '1'];
+
+// Kaskade klasifikasi: outcome -> tanda pnl -> exit vs entry -> exit lebih dekat TP atau SL
+function classify(trade, side) {
+    const norm = (v) => (v ?? '').toString().trim().toUpperCase();
+    const outcomeStr = norm(trade.outcome || trade.result || trade.status);
+    if (LOSS_OUTCOMES.includes(outcomeStr)) return -1;
+    if (PROFIT_OUTCOMES.includes(outcomeStr)) return 1;
+    const pnl = Number(trade.pnl ?? trade.profit ?? trade.net ?? NaN);
+    if (Number.isFinite(pnl) && pnl !== 0) return pnl > 0 ? 1 : -1;
+    const entry = Number(trade.entry_price ?? trade.entry ?? trade.price_entry ?? trade.price ?? NaN);
+    const exit = Number(trade.exit_price ?? trade.exit ?? trade.price_exit ?? NaN);
+    if (Number.isFinite(entry) && Number.isFinite(exit) && exit !== entry) {
+        return (side === 0) === (exit > entry) ? 1 : -1;
+    }
+    const sl = Number(trade.sl_price ?? trade.sl ?? trade.stop_loss ?? trade.stop ?? NaN);
+    const tp = Number(trade.tp_price ?? trade.tp ?? trade.take_profit ?? trade.target ?? NaN);
+    if (Number.isFinite(exit) && Number.isFinite(sl) && Number.isFinite(tp)) {
+        const dTP = Math.abs(exit - tp), dSL = Math.abs(exit - sl);
+        if (dTP < dSL) return 1;
+        if (dSL < dTP) return -1;
+    }
+    return 0;
+}
+
+function tradesParser() {
+    const t = {
+        row: new Column(Float64Array), time: new Column(Float64Array), side: new Column(Uint8Array),
+        result: new Column(Int8Array), entry: new Column(Float64Array), sl: new Column(Float64Array),
+        tp: new Column(Float64Array),
+    };
+    const m = {
+        time: new Column(Float64Array), price: new Column(Float64Array),
+        style: new Column(Uint8Array), trade: new Column(Uint32Array),
+    };
+    let rowNumber = 0;
+
+    function mark(time, price, style, trade) {
+        m.time.push(time);
+        m.price.push(price);
+        m.style.push(style);
+        m.trade.push(trade);
+    }
+
+    return {
+        rows(rows) {
+            for (const trade of rows) {
+                const row = rowNumber++;
+                const timestamp = parseTime(trade);
+                if (timestamp === null) continue;
+                const sideRaw = (trade.signal || trade.side || trade.direction || 'buy').toString().toLowerCase();
+                const side = (sideRaw === 'sell' || sideRaw === 'short') ? 1 : 0;
+                const result = classify(trade, side);
+                const entry = Number(trade.entry_price ?? trade.entry ?? trade.price_entry ?? trade.price ?? NaN);
+                const sl = Number(trade.sl_price ?? trade.sl ?? trade.stop_loss ?? trade.stop ?? NaN);
+                const tp = Number(trade.tp_price ?? trade.tp ?? trade.take_profit ?? trade.target ?? NaN);
+
+                const k = t.time.length;
+                t.row.push(row);
+                t.time.push(timestamp);
+                t.side.push(side);
+                t.result.push(result);
+                t.entry.push(entry);
+                t.sl.push(sl);
+                t.tp.push(tp);
+                if (Number.isFinite(entry)) mark(timestamp, entry, side * 3 + result + 1, k);
+                if (Number.isFinite(sl)) mark(timestamp, sl, 6 + side, k);
+                if (Number.isFinite(tp)) mark(timestamp, tp, 8 + side, k);
+            }
+        },
+        finish() {
+            const trades = { count: t.time.length };
+            for (const k in t) trades[k] = t[k].finish();
+            const markers = { count: m.time.length };
+            const order = sortOrder(m.time.data, m.time.length);
+            for (const k in m) markers[k] = m[k].finish(order);
+            return { styles: STYLES, trades, markers, index: entryIndex(trades) };
+        },
+    };
+}
+
+// Sama dengan signals.entry_index: waktu entry terurut + offsets CSR ke nomor trade
+function entryIndex(trades) {
+    const withEntry = [];
+    for (let k = 0; k < trades.count; k++) {
+        if (Number.isFinite(trades.entry[k])) withEntry.push(k);
+    }
+    withEntry.sort((a, b) => trades.time[a] - trades.time[b] || a - b);
+    const time = [], offsets = [];
+    for (let i = 0; i < withEntry.length; i++) {
+        const ti = trades.time[withEntry[i]];
+        if (i === 0 || ti !== time[time.length - 1]) {
+            time.push(ti);
+            offsets.push(i);
+        }
+    }
+    offsets.push(withEntry.length);
+    return {
+        time: Float64Array.from(time),
+        offsets: Uint32Array.from(offsets),
+        trade: Uint32Array.from(withEntry),
+    };
+}
+
+// Semua buffer typed array di payload (untuk transfer tanpa copy)
+function buffers(value, out = []) {
+    if (ArrayBuffer.isView(value)) out.push(value.buffer);
+    else if (value && typeof value === 'object' && !Array.isArray(value)) {
+        for (const k in value) buffers(value[k], out);
+    }
+    return out;
+}
+
+self.onmessage = async (event) => {
+    const { kind, file } = event.data;
+    const parser = kind === 'ohlcv' ? ohlcvParser() : tradesParser();
+    try {
+        await readCsv(file, (rows, loaded) => {
+            parser.rows(rows);
+            self.postMessage({ type: 'progress', loaded, total: file.size });
+        });
+        const payload = parser.finish();
+        self.postMessage({ type: 'done', payload }, buffers(payload));
+    } catch (error) {
+        self.postMessage({ type: 'error', message: error.message || String(error) });
+    }
+};
@@ -0,0 +1,649 @@
+"""Persistent columnar cache for the CSV files under data/.
+
+Every CSV is converted once into one ``.npy`` file per column and later
+reads memory-map those files instead of reparsing text.  Layout::
+
+    cache/<slug>/<mtime_ns>-<size>/meta.json
+                                   c0.npy, c1.npy, ...     column data
+                                   c3.cats.npy             categories of a text column
+                                   derived/<name>/*.npy    artifacts computed from the table
+
+An entry is keyed by source path, mtime and size; when the source changes a
+new ``<mtime_ns>-<size>`` directory is built next to the old one and the old
+one is removed.  Entries whose source file no longer exists are evicted by
+``sweep()``.
+
+When the new file is the old one plus appended rows, only the new bytes are
+parsed and registered ``extenders`` bring derived artifacts up to date
+instead of rebuilding them from scratch.
+
+Tables accepted by the ``dedup`` predicate are stored as references into
+the shared content-addressed chunk store (``chunks``, ``cache/.chunks/``)
+instead of per-entry column files, so near-identical files share storage.
+
+Several worker processes can share one cache directory: builds of a slot
+and of a derived artifact take a ``flock`` (``locks``) so one process
+parses while the others wait and map its result, and ``sweep`` only
+garbage-collects while no build holds the cache-wide shared lock.  Readers
+map the files read-only, so the page cache holds one copy for all workers.
+
+Column kinds:
+
+* ``num``  - float64 (ints are widened so missing values stay NaN)
+* ``time`` - datetime64[ns], UTC
+* ``cat``  - int32 codes (-1 = missing) plus a sorted unicode category array
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import jobs
+import locks
+import metrics
+from chunks import ChunkStore, cut_points
+
+CACHE_DIR = "cache"
+DATA_DIR = "data"
+FORMAT_VERSION = 1
+CHUNK_ROWS = 200_000
+FINGERPRINT_BYTES = 4096
+# File lock: cache/.lock (shared saat build, eksklusif saat sweep), <slot>/.lock, derived/<name>.lock
+LOCK_NAME = ".lock"
+
+
+class _Restart(Exception):
+    """A later chunk proved a numeric column is text; rebuild with it as cat."""
+
+    def __init__(self, column: str):
+        self.column = column
+
+
+def _slug(relpath: str) -> str:
+    base = re.sub(r"[^A-Za-z0-9_.-]+", "_", relpath)[-80:]
+    return f"{base}-{hashlib.sha1(relpath.encode()).hexdigest()[:10]}"
+
+
+def versioned_name(prefix: str, other: "Entry", *params) -> str:
+    """Derived name for an artifact that also depends on ``other`` (e.g. the
+    OHLCV file): ``<prefix>-<family>@<version>``.  Building one drops the
+    older versions of the same family (see ``Entry.derived``)."""
+    family = json.dumps([other.meta["source"], *params], sort_keys=True)
+    return (f"{prefix}-{hashlib.sha1(family.encode()).hexdigest()[:12]}"
+            f"@{hashlib.sha1(other.key.encode()).hexdigest()[:12]}")
+
+
+def _fingerprint(path: str, size: int) -> dict:
+    """Hashes of the first/last bytes of ``path[:size]`` to recognise appends."""
+    with open(path, "rb") as f:
+        head = f.read(min(size, FINGERPRINT_BYTES))
+        f.seek(max(0, size - FINGERPRINT_BYTES))
+        tail = f.read(min(size, FINGERPRINT_BYTES))
+    return {
+        "head_hash": hashlib.sha1(head).hexdigest(),
+        "tail_hash": hashlib.sha1(tail).hexdigest(),
+        "newline_end": tail.endswith(b"\n"),
+    }
+
+
+def _finish_npy(raw_path: str, path: str, dtype, rows: int) -> None:
+    """Prefix raw little-endian column bytes with an .npy header."""
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+              "fortran_order": False, "shape": (rows,)}
+    with open(path, "wb") as out, open(raw_path, "rb") as raw:
+        np.lib.format.write_array_header_1_0(out, header)
+        shutil.copyfileobj(raw, out, 1 << 20)
+    os.remove(raw_path)
+
+
+def _save_arrays(directory: str, arrays: Dict[str, np.ndarray]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for k, v in arrays.items():
+        np.save(os.path.join(directory, f"{k}.npy"), np.ascontiguousarray(v))
+    with open(os.path.join(directory, "arrays.json"), "w") as f:
+        json.dump(list(arrays), f)
+
+
+def _stream_arrays(directory: str, chunks: Iterable[Dict[str, np.ndarray]]) -> None:
+    """Like ``_save_arrays`` for a builder that yields dicts of 1-D chunks."""
+    os.makedirs(directory, exist_ok=True)
+    files: Dict[str, tuple] = {}
+    try:
+        for chunk in chunks:
+            for k, v in chunk.items():
+                if k not in files:
+                    raw = os.path.join(directory, f"{k}.npy.raw")
+                    files[k] = [open(raw, "wb"), np.asarray(v).dtype, 0]
+                f, dtype, rows = files[k]
+                f.write(np.ascontiguousarray(v, dtype=dtype).tobytes())
+                files[k][2] = rows + len(v)
+    finally:
+        for f, _, _ in files.values():
+            f.close()
+    for k, (f, dtype, rows) in files.items():
+        _finish_npy(f.name, os.path.join(directory, f"{k}.npy"), dtype, rows)
+    with open(os.path.join(directory, "arrays.json"), "w") as f:
+        json.dump(list(files), f)
+
+
+def _load_arrays(directory: str) -> Dict[str, np.ndarray]:
+    with open(os.path.join(directory, "arrays.json")) as f:
+        names = json.load(f)
+    return {k: np.load(os.path.join(directory, f"{k}.npy"), mmap_mode="r") for k in names}
+
+
+def _looks_like_time(values: pd.Series) -> bool:
+    sample = values.dropna().astype(str).head(200)
+    if sample.empty or not sample.str.match(r"^\d{4}-\d{2}-\d{2}").all():
+        return False
+    parsed = pd.to_datetime(sample, utc=True, errors="coerce", format="ISO8601")
+    return bool(parsed.notna().all())
+
+
+def _to_time(values: pd.Series) -> np.ndarray:
+    parsed = pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601")
+    return parsed.to_numpy(dtype="datetime64[ns]")
+
+
+class _ColumnWriter:
+    """Appends one column chunk by chunk to a raw file; finalized to .npy."""
+
+    def __init__(self, directory: str, index: int, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.file = f"c{index}.npy"
+        self.path = os.path.join(directory, self.file)
+        self.raw_path = self.path + ".raw"
+        self.raw = open(self.raw_path, "wb")
+        self.rows = 0
+        self.categories: Dict[str, int] = {}
+        self.dtype = {"num": np.float64, "time": "datetime64[ns]", "cat": np.int32}[kind]
+
+    def seed(self, entry: "Entry") -> None:
+        """Start from an existing entry's column (append mode)."""
+        info = entry._info[self.name]
+        if "chunks" in info:
+            self.raw.write(np.ascontiguousarray(entry.array(self.name)).tobytes())
+            self.rows = entry.rows
+            if self.kind == "cat":
+                for i, name in enumerate(entry.categories(self.name)):
+                    self.categories[str(name)] = i
+            return
+        with open(os.path.join(entry.dir, info["file"]), "rb") as src:
+            if np.lib.format.read_magic(src) == (1, 0):
+                np.lib.format.read_array_header_1_0(src)
+            else:
+                np.lib.format.read_array_header_2_0(src)
+            shutil.copyfileobj(src, self.raw, 1 << 20)
+        self.rows = entry.rows
+        if self.kind == "cat":
+            for i, name in enumerate(entry.categories(self.name)):
+                self.categories[str(name)] = i
+
+    def append(self, values: pd.Series) -> None:
+        if self.kind == "num":
+            arr = values.to_numpy(dtype=np.float64, na_value=np.nan) \
+                if pd.api.types.is_numeric_dtype(values.dtype) \
+                else pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+            if not pd.api.types.is_numeric_dtype(values.dtype):
+                bad = np.isnan(arr) & values.notna().to_numpy() & \
+                    (values.astype(str).str.len() > 0).to_numpy()
+                if bad.any():
+                    raise _Restart(self.name)
+        elif self.kind == "time":
+            arr = _to_time(values)
+            bad = np.isnat(arr) & values.notna().to_numpy() & \
+                (values.astype(str).str.len() > 0).to_numpy()
+            if bad.any():
+                raise _Restart(self.name)
+        else:
+            # Kode kategori lokal per chunk -> kode global yang stabil
+            codes, uniques = pd.factorize(values.astype(object).where(values.notna(), None))
+            remap = np.empty(len(uniques), dtype=np.int32)
+            for i, u in enumerate(uniques):
+                u = str(u)
+                remap[i] = self.categories.setdefault(u, len(self.categories))
+            arr = np.where(codes >= 0, remap[np.maximum(codes, 0)] if len(remap) else -1, -1)
+            arr = arr.astype(np.int32)
+        self.raw.write(np.ascontiguousarray(arr, dtype=self.dtype).tobytes())
+        self.rows += len(arr)
+
+    def finish(self) -> dict:
+        self.raw.close()
+        _finish_npy(self.raw_path, self.path, self.dtype, self.rows)
+        info = {"name": self.name, "file": self.file, "kind": self.kind}
+        if self.kind == "cat":
+            # Urutkan kategori supaya kode bisa dibandingkan antar entry
+            names = np.array(list(self.categories), dtype=str)
+            order = np.argsort(names, kind="stable")
+            mapping = np.empty(len(names), dtype=np.int32)
+            mapping[order] = np.arange(len(names), dtype=np.int32)
+            codes = np.load(self.path, mmap_mode="r+")
+            if len(names):
+                valid = codes >= 0
+                codes[valid] = mapping[codes[valid]]
+            codes.flush()
+            del codes
+            cats_file = self.file.replace(".npy", ".cats.npy")
+            np.save(os.path.join(os.path.dirname(self.path), cats_file), names[order])
+            info["categories"] = cats_file
+        return info
+
+
+class Entry:
+    """One built, immutable cache entry (a memory-mapped table)."""
+
+    def __init__(self, directory: str, meta: dict, chunks: Optional[ChunkStore] = None):
+        self.dir = directory
+        self.meta = meta
+        self._chunks = chunks
+        self.rows: int = meta["rows"]
+        self.columns: List[str] = [c["name"] for c in meta["columns"]]
+        self._info = {c["name"]: c for c in meta["columns"]}
+        self._arrays: Dict[str, np.ndarray] = {}
+        # Reentrant: builder derived boleh memakai derived lain (pyramid -> ohlcv)
+        self._lock = threading.RLock()
+
+    @property
+    def key(self) -> str:
+        return f'{self.meta["source"]}@{self.meta["mtime_ns"]}-{self.meta["size"]}'
+
+    def kind(self, name: str) -> str:
+        return self._info[name]["kind"]
+
+    def array(self, name: str) -> np.ndarray:
+        """Raw column (codes for ``cat`` columns), memory-mapped read-only."""
+        arr = self._arrays.get(name)
+        if arr is None:
+            info = self._info[name]
+            if "chunks" in info:
+                arr = self._chunks.load(info["chunks"], info["dtype"])
+            else:
+                arr = np.load(os.path.join(self.dir, info["file"]), mmap_mode="r")
+            self._arrays[name] = arr
+        return arr
+
+    def take(self, name: str, rows: np.ndarray) -> np.ndarray:
+        """``array(name)[rows]``; a chunk-packed column not yet loaded only
+        reads the chunks holding ``rows`` instead of joining all of them."""
+        info = self._info[name]
+        if name not in self._arrays and "chunks" in info:
+            return self._chunks.take(info["chunks"], info["dtype"], rows)
+        return np.asarray(self.array(name)[rows])
+
+    def categories(self, name: str) -> np.ndarray:
+        key = name + "\0cats"
+        cats = self._arrays.get(key)
+        if cats is None:
+            cats = np.load(os.path.join(self.dir, self._info[name]["categories"]))
+            self._arrays[key] = cats
+        return cats
+
+    def series(self, name: str, rows: Optional[slice] = None) -> pd.Series:
+        arr = self.array(name)
+        if rows is not None:
+            arr = arr[rows]
+        kind = self.kind(name)
+        if kind == "cat":
+            values = pd.Categorical.from_codes(np.asarray(arr), categories=self.categories(name))
+            return pd.Series(values, name=name)
+        if kind == "time":
+            return pd.Series(pd.DatetimeIndex(arr, tz="UTC"), name=name)
+        return pd.Series(arr, name=name, copy=False)
+
+    def row_chunks(self, size: Optional[int] = None):
+        """Row slices covering the table, ``size`` (default CHUNK_ROWS) rows each."""
+        size = size or CHUNK_ROWS
+        return [slice(i, min(i + size, self.rows)) for i in range(0, self.rows, size)]
+
+    def frame(self, columns: Optional[Iterable[str]] = None,
+              rows: Optional[slice] = None) -> pd.DataFrame:
+        names = self.columns if columns is None else [c for c in columns if c in self._info]
+        return pd.DataFrame({n: self.series(n, rows) for n in names}, columns=names)
+
+    def derived(self, name: str, build: Callable[["Entry"], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Arrays computed from this entry, persisted next to it and mmapped.
+
+        ``build`` returns a dict of arrays, or an iterator of such dicts that
+        is written chunk by chunk (bounded memory for large tables).
+        """
+        key = "\0derived/" + name
+        cached = self._arrays.get(key)
+        if cached is not None:
+            metrics.cache("derived", True)
+            return cached
+        with self._lock:
+            cached = self._arrays.get(key)
+            if cached is not None:
+                metrics.cache("derived", True)
+                return cached
+            directory = os.path.join(self.dir, "derived", name)
+            done = os.path.join(directory, "arrays.json")
+            built = not os.path.exists(done)
+            if built:
+                os.makedirs(os.path.dirname(directory), exist_ok=True)
+                with locks.file_lock(directory + LOCK_NAME):
+                    # Proses lain mungkin baru selesai membangunnya
+                    built = not os.path.exists(done)
+                    if built:
+                        self._build_derived(name, build, directory)
+                if "@" in name:
+                    self._drop_versions(name)
+            metrics.cache("derived", not built)
+            loaded = _load_arrays(directory)
+            self._arrays[key] = loaded
+            return loaded
+
+    def _build_derived(self, name: str, build, directory: str) -> None:
+        # replay-<hash> -> stage "derive.replay"
+        with metrics.span("derive." + name.split("-")[0], rows=self.meta["rows"]):
+            result = build(self)
+            tmp = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+            try:
+                if isinstance(result, dict):
+                    _save_arrays(tmp, result)
+                else:
+                    _stream_arrays(tmp, result)
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _drop_versions(self, name: str) -> None:
+        """Remove the other versions of a ``versioned_name`` artifact."""
+        family = name.split("@")[0] + "@"
+        root = os.path.join(self.dir, "derived")
+        for other in os.listdir(root):
+            if not other.startswith(family) or other in (name, name + LOCK_NAME) or ".tmp-" in other:
+                continue
+            path = os.path.join(root, other)
+            # Di Linux mmap yang masih dipakai proses lain tetap valid setelah dihapus
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._arrays.pop("\0derived/" + other, None)
+
+    def has_derived(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.dir, "derived", name, "arrays.json"))
+
+
+class ColumnStore:
+    def __init__(self, data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR,
+                 dedup: Optional[Callable[[List[str]], bool]] = None):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        # dedup(columns) -> simpan tabel sebagai chunk bersama (lihat modul chunks)
+        self.dedup = dedup
+        self.chunks = ChunkStore(os.path.join(cache_dir, ".chunks"))
+        self._entries: Dict[str, Entry] = {}
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(cache_dir, LOCK_NAME)
+        # name -> fn(old_arrays, new_entry, old_rows) untuk artefak derived saat append
+        self.extenders: Dict[str, Callable[[Dict[str, np.ndarray], Entry, int], Dict[str, np.ndarray]]] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _relpath(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.data_dir))
+
+    def entry(self, path: str) -> Entry:
+        """Fresh cache entry for ``path``, building it on first access."""
+        st = os.stat(path)
+        rel = self._relpath(path)
+        version = f"{st.st_mtime_ns}-{st.st_size}"
+        current = self._entries.get(rel)
+        if current is not None and os.path.basename(current.dir) == version:
+            metrics.cache("columns", True)
+            return current
+        with self._lock:
+            current = self._entries.get(rel)
+            if current is not None and os.path.basename(current.dir) == version:
+                metrics.cache("columns", True)
+                return current
+            slot = os.path.join(self.cache_dir, _slug(rel))
+            directory = os.path.join(slot, version)
+            os.makedirs(slot, exist_ok=True)
+            # Satu proses membangun; worker lain menunggu lalu memakai hasilnya
+            with locks.file_lock(self._lock_path, shared=True), \
+                    locks.file_lock(os.path.join(slot, LOCK_NAME)):
+                meta = self._load_meta(directory)
+                metrics.cache("columns", meta is not None)
+                if meta is None:
+                    meta = self._build_version(path, rel, st, slot, directory, current)
+                self._drop_stale(slot, keep=version)
+            entry = Entry(directory, meta, self.chunks)
+            self._entries[rel] = entry
+            return entry
+
+    @staticmethod
+    def _load_meta(directory: str) -> Optional[dict]:
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            shutil.rmtree(directory, ignore_errors=True)
+            return None
+        return meta
+
+    def _build_version(self, path: str, rel: str, st: os.stat_result, slot: str,
+                       directory: str, current: Optional[Entry]) -> dict:
+        previous = current or self._latest(slot)
+        if previous is not None and self._is_append(path, st, previous):
+            with metrics.span("ingest.append") as span:
+                meta = self._build(path, rel, st, directory, base=previous)
+                if meta is not None:
+                    span.add(rows=meta["rows"] - meta.get("appended_from", 0),
+                             bytes=st.st_size - previous.meta["size"])
+            if meta is not None:
+                return meta
+        with metrics.span("ingest", bytes=st.st_size) as span:
+            meta = self._build(path, rel, st, directory)
+            span.add(rows=meta["rows"])
+        return meta
+
+    def table(self, path: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        return self.entry(path).frame(columns)
+
+    def _latest(self, slot: str) -> Optional[Entry]:
+        if not os.path.isdir(slot):
+            return None
+        for version in sorted(os.listdir(slot), reverse=True):
+            meta_path = os.path.join(slot, version, "meta.json")
+            if ".tmp-" in version or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("version") == FORMAT_VERSION:
+                return Entry(os.path.join(slot, version), meta, self.chunks)
+        return None
+
+    @staticmethod
+    def _is_append(path: str, st: os.stat_result, previous: Entry) -> bool:
+        old = previous.meta
+        if st.st_size <= old["size"] or not old.get("newline_end"):
+            return False
+        fp = _fingerprint(path, old["size"])
+        return fp["head_hash"] == old["head_hash"] and fp["tail_hash"] == old["tail_hash"]
+
+    def _build(self, path: str, rel: str, st: os.stat_result, directory: str,
+               base: Optional[Entry] = None) -> Optional[dict]:
+        """Convert ``path`` into ``directory``; with ``base`` only parse appended rows.
+
+        Returns None when an append build is not possible (caller rebuilds).
+        """
+        force_cat: set = set()
+        while True:
+            tmp = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            try:
+                meta = self._convert(path, tmp, force_cat, base)
+            except _Restart as restart:
+                shutil.rmtree(tmp, ignore_errors=True)
+                if base is not None:
+                    return None
+                force_cat.add(restart.column)
+                continue
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+            if self.dedup is not None and self.dedup([c["name"] for c in meta["columns"]]):
+                self._pack(tmp, meta)
+            meta.update(version=FORMAT_VERSION, source=rel, mtime_ns=st.st_mtime_ns, size=st.st_size)
+            meta.update(_fingerprint(path, st.st_size))
+            if base is not None:
+                meta["appended_from"] = base.meta["rows"]
+                self._extend_derived(base, Entry(tmp, meta, self.chunks))
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            try:
+                os.rename(tmp, directory)
+            except OSError:
+                # Sudah dibangun oleh proses lain
+                shutil.rmtree(tmp, ignore_errors=True)
+                with open(os.path.join(directory, "meta.json")) as f:
+                    return json.load(f)
+            return meta
+
+    def _pack(self, directory: str, meta: dict) -> None:
+        """Move the column files of a fresh build into the shared chunk store."""
+        columns = meta["columns"]
+        paths = {c["name"]: os.path.join(directory, c["file"]) for c in columns}
+        times = [c["name"] for c in columns if c["kind"] == "time"]
+        key = np.load(paths[times[0]], mmap_mode="r") if times else None
+        starts = cut_points(key, meta["rows"])
+        del key
+        refs = self.chunks.pack(
+            ((name, np.load(path, mmap_mode="r")) for name, path in paths.items()), starts)
+        for c in columns:
+            c["dtype"] = np.load(paths[c["name"]], mmap_mode="r").dtype.str
+            c["chunks"] = refs[c["name"]]
+            os.remove(paths[c["name"]])
+            del c["file"]
+
+    def _extend_derived(self, base: Entry, entry: Entry) -> None:
+        for name, extend in self.extenders.items():
+            if base.has_derived(name):
+                old = _load_arrays(os.path.join(base.dir, "derived", name))
+                arrays = extend(old, entry, base.rows)
+                _save_arrays(os.path.join(entry.dir, "derived", name), arrays)
+
+    def _convert(self, path: str, directory: str, force_cat: set,
+                 base: Optional[Entry] = None) -> dict:
+        if base is not None:
+            names = base.columns
+            kinds = {n: base.kind(n) for n in names}
+            return self._write(path, directory, names, kinds, base)
+
+        head = pd.read_csv(path, nrows=CHUNK_ROWS, skipinitialspace=True)
+        names = [str(c) for c in head.columns]
+        kinds = {}
+        for name in names:
+            col = head[name]
+            if name in force_cat:
+                kinds[name] = "cat"
+            elif pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_bool_dtype(col.dtype):
+                kinds[name] = "num"
+            elif col.isna().all():
+                kinds[name] = "num"
+            elif _looks_like_time(col):
+                kinds[name] = "time"
+            else:
+                kinds[name] = "cat"
+        return self._write(path, directory, names, kinds)
+
+    def _write(self, path: str, directory: str, names: List[str], kinds: Dict[str, str],
+               base: Optional[Entry] = None) -> dict:
+        text_cols = {n: str for n in names if kinds[n] != "num"}
+        writers = [_ColumnWriter(directory, i, n, kinds[n]) for i, n in enumerate(names)]
+        rows = 0
+        try:
+            with open(path, "rb") as f:
+                if base is None:
+                    reader = pd.read_csv(f, chunksize=CHUNK_ROWS, dtype=text_cols,
+                                         skipinitialspace=True, keep_default_na=True)
+                else:
+                    for w in writers:
+                        w.seed(base)
+                    rows = base.rows
+                    f.seek(base.meta["size"])
+                    reader = pd.read_csv(f, chunksize=CHUNK_ROWS, dtype=text_cols, header=None,
+                                         names=names, skipinitialspace=True, keep_default_na=True)
+                size = os.fstat(f.fileno()).st_size
+                for chunk in reader:
+                    chunk.columns = names
+                    for w in writers:
+                        w.append(chunk[w.name])
+                    rows += len(chunk)
+                    # Progress job (bila dijalankan sebagai job); bisa raise jobs.Cancelled
+                    jobs.report(f.tell(), size)
+        finally:
+            for w in writers:
+                if not w.raw.closed:
+                    w.raw.close()
+        columns = [w.finish() for w in writers]
+        return {"rows": rows, "columns": columns}
+
+    def _drop_stale(self, slot: str, keep: str) -> None:
+        for name in os.listdir(slot):
+            if name != keep and ".tmp-" not in name and name != LOCK_NAME:
+                shutil.rmtree(os.path.join(slot, name), ignore_errors=True)
+
+    def sweep(self) -> List[str]:
+        """Evict entries whose source CSV is gone; returns removed slugs.
+
+        Skipped (returns []) while another thread or process is building.
+        """
+        with locks.file_lock(self._lock_path, blocking=False) as acquired:
+            return self._sweep() if acquired else []
+
+    def _sweep(self) -> List[str]:
+        removed = []
+        for slug in os.listdir(self.cache_dir):
+            slot = os.path.join(self.cache_dir, slug)
+            if not os.path.isdir(slot):
+                continue
+            sources = []
+            for version in os.listdir(slot):
+                meta_path = os.path.join(slot, version, "meta.json")
+                if os.path.exists(meta_path):
+                    with open(meta_path) as f:
+                        sources.append(json.load(f).get("source"))
+            alive = any(s and os.path.exists(os.path.join(self.data_dir, s)) for s in sources)
+            if sources and not alive:
+                shutil.rmtree(slot, ignore_errors=True)
+                with self._lock:
+                    for rel in [r for r, e in self._entries.items() if e.dir.startswith(slot + os.sep)]:
+                        del self._entries[rel]
+                removed.append(slug)
+        self.chunks.collect(self._referenced_packs())
+        return removed
+
+    def _referenced_packs(self) -> set:
+        packs = set()
+        for slug in os.listdir(self.cache_dir):
+            slot = os.path.join(self.cache_dir, slug)
+            if not os.path.isdir(slot):
+                continue
+            for version in os.listdir(slot):
+                meta_path = os.path.join(slot, version, "meta.json")
+                if not os.path.exists(meta_path):
+                    continue
+                with open(meta_path) as f:
+                    for c in json.load(f).get("columns", []):
+                        packs.update(ref[1] for ref in c.get("chunks", ()))
+        return packs
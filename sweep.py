@@ -0,0 +1,303 @@
+"""What-if SL/TP parameter sweeps over the entries of an export.
+
+Every trade keeps its entry (time, side, price) and gets a grid of
+alternative exits: the stop at ``sl`` times the export's stop distance and
+the target at ``rr`` times the new stop distance (R:R mode) or at ``tp``
+times the export's target distance.  Each (trade, combination) pair is
+resolved against the OHLCV high/low path from the entry bar on.
+
+Per trade the favorable and adverse excursions along the path (in R of the
+export's stop distance) are turned into running maxima; those are
+non-decreasing, so the first bar reaching any stop or target level is one
+``searchsorted`` for all trades and combinations of a batch at once.  A bar
+reaching both levels counts as a loss (bar order unknown, pessimistic).
+Trades reaching neither within ``max_bars`` (or the end of the data) stay
+open and are marked to the last close.
+
+PnL is in R of the export's stop distance (position size unchanged), so the
+combinations are comparable.  Large sweeps are split into time-ordered
+chunks of trades fanned out over a process pool; each chunk only ships the
+bars its trades span.
+
+CLI::
+
+    python sweep.py data/sample_trades.csv data/sample_ohlcv.csv --sl 0.5,1,1.5 --rr 1,2,3
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import jobs
+import signals
+import store
+from replay import MAX_OPEN_BARS, UNCOVERED, windows
+
+MODES = ("rr", "tp")
+MAX_COMBOS = 400
+MAX_BARS = 4 * MAX_OPEN_BARS
+DEFAULT_SL = (1.0,)
+DEFAULT_TARGET = (1.0,)
+# Elemen path (trade x bar) per batch numpy: batas memori (~10 array sementara)
+BATCH_BARS = 1_000_000
+# Sel (trade x kombinasi) per chunk yang dikirim ke proses worker
+CHUNK_CELLS = 2_000_000
+# Di bawah ini tidak ada pool (start proses lebih mahal dari hitungannya)
+PARALLEL_CELLS = 5_000_000
+# Di atas ini (baris export x kombinasi) /api/sweep menyerahkan hitungan ke job ``sweep``
+SYNC_CELLS = 1_000_000
+WORKERS = max(1, (os.cpu_count() or 1) // 2)
+
+OPEN, WIN, LOSS = signals.NONE, signals.PROFIT, signals.LOSS
+
+
+class BadGrid(ValueError):
+    pass
+
+
+def parse_values(param: Optional[str], default: Sequence[float]) -> List[float]:
+    """``?sl=0.5,1,1.5`` -> sorted unique positive floats."""
+    if param is None or param == "":
+        return list(default)
+    try:
+        values = sorted({float(v) for v in str(param).split(",") if v.strip()})
+    except ValueError:
+        raise BadGrid(f"Not a number list: {param}")
+    if not values or not all(np.isfinite(v) and v > 0 for v in values):
+        raise BadGrid(f"Values must be positive: {param}")
+    return values
+
+
+def grid(sl: Optional[str] = None, rr: Optional[str] = None, tp: Optional[str] = None) -> dict:
+    """Validated grid: ``sl`` multipliers x (``rr`` targets or ``tp`` multipliers)."""
+    if rr and tp:
+        raise BadGrid("Use either rr or tp, not both")
+    mode = "tp" if tp else "rr" if rr else "tp"
+    out = {"mode": mode, "sl": parse_values(sl, DEFAULT_SL),
+           "target": parse_values(tp if mode == "tp" else rr, DEFAULT_TARGET)}
+    if len(out["sl"]) * len(out["target"]) > MAX_COMBOS:
+        raise BadGrid(f"At most {MAX_COMBOS} combinations")
+    return out
+
+
+def check_max_bars(value) -> int:
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise BadGrid(f"max_bars must be an integer: {value}")
+    if not 1 <= value <= MAX_BARS:
+        raise BadGrid(f"max_bars must be between 1 and {MAX_BARS}")
+    return value
+
+
+def combos(spec: dict) -> Dict[str, np.ndarray]:
+    sl, target = zip(*itertools.product(spec["sl"], spec["target"]))
+    return {"sl": np.array(sl), "target": np.array(target)}
+
+
+def derived_name(ohlcv_entry, spec: dict, max_bars: int) -> str:
+    """``store`` derived artifact name on the export, per OHLCV version and grid."""
+    return store.versioned_name("sweep", ohlcv_entry, spec, max_bars)
+
+
+def _first_at_least(running: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """Per row of non-decreasing ``running`` (B, H): first column >= each of
+    ``levels`` (B, C), H if none.  Rows are shifted apart so one sorted
+    ``searchsorted`` answers every row."""
+    b, h = running.shape
+    top = float(levels.max()) + 1.0
+    shift = np.arange(b, dtype=np.float64)[:, None] * (top + 1.0)
+    flat = (np.clip(running, 0.0, top) + shift).ravel()
+    pos = np.searchsorted(flat, (levels + shift).ravel(), side="left").reshape(levels.shape)
+    return pos - np.arange(b)[:, None] * h
+
+
+def simulate(high: np.ndarray, low: np.ndarray, close: np.ndarray, start: np.ndarray,
+             side: np.ndarray, entry: np.ndarray, risk: np.ndarray, sl_r: np.ndarray,
+             tp_r: np.ndarray, max_bars: int) -> Dict[str, np.ndarray]:
+    """Outcome, pnl (R) and bars held per (trade, combination).
+
+    ``start`` indexes the entry bar in ``high``/``low``/``close``; ``sl_r`` and
+    ``tp_r`` are the stop/target distances in R, shape (trades, combos).
+    """
+    n, c = sl_r.shape
+    out = {"outcome": np.zeros((n, c), dtype=np.int8), "pnl": np.empty((n, c)),
+           "bars": np.empty((n, c), dtype=np.int32)}
+    length = np.minimum(max_bars, len(high) - start)
+    step = max(1, BATCH_BARS // max(1, max_bars))
+    for lo in range(0, n, step):
+        hi = min(n, lo + step)
+        h = int(length[lo:hi].max())
+        idx = start[lo:hi, None] + np.arange(h)
+        inside = idx < (start[lo:hi] + length[lo:hi])[:, None]
+        idx = np.where(inside, idx, 0)
+        buy = (side[lo:hi] == signals.BUY)[:, None]
+        e, r = entry[lo:hi, None], risk[lo:hi, None]
+        up, down = (high[idx] - e) / r, (e - low[idx]) / r
+        favorable = np.where(inside, np.where(buy, up, down), -np.inf)
+        adverse = np.where(inside, np.where(buy, down, up), -np.inf)
+        first_sl = _first_at_least(np.maximum.accumulate(adverse, axis=1), sl_r[lo:hi])
+        first_tp = _first_at_least(np.maximum.accumulate(favorable, axis=1), tp_r[lo:hi])
+
+        ln = length[lo:hi, None]
+        hit_sl, hit_tp = first_sl < ln, first_tp < ln
+        loss = hit_sl & (~hit_tp | (first_sl <= first_tp))
+        win = hit_tp & ~loss
+        last = start[lo:hi, None] + ln - 1
+        mark = np.where(buy, close[last] - e, e - close[last]) / r
+        out["outcome"][lo:hi] = np.where(loss, LOSS, np.where(win, WIN, OPEN))
+        out["pnl"][lo:hi] = np.where(loss, -sl_r[lo:hi], np.where(win, tp_r[lo:hi], mark))
+        out["bars"][lo:hi] = np.where(loss, first_sl, np.where(win, first_tp, ln - 1))
+    return out
+
+
+def _simulate_chunk(args):
+    return simulate(*args)
+
+
+def run(trades: Dict[str, np.ndarray], ohlcv: Dict[str, np.ndarray], spec: dict,
+        max_bars: int = MAX_OPEN_BARS, workers: int = WORKERS) -> Dict[str, np.ndarray]:
+    """Sweep ``spec`` over ``signals.classify`` trades; matrices are (combos, trades)."""
+    grid_ = combos(spec)
+    n, c = len(trades["time"]), len(grid_["sl"])
+    bar_time = np.asarray(ohlcv["time"])
+    start, _, flags = windows(bar_time, trades["time"], np.full(n, np.nan))
+    entry = trades["entry"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        risk = np.abs(entry - trades["sl"])
+        target = np.abs(trades["tp"] - entry) / risk
+        ok = ((flags & UNCOVERED) == 0) & np.isfinite(entry) & np.isfinite(risk) & (risk > 0)
+        if spec["mode"] == "tp":
+            ok &= np.isfinite(target) & (target > 0)
+
+    outcome = np.zeros((c, n), dtype=np.int8)
+    pnl = np.full((c, n), np.nan)
+    bars = np.full((c, n), -1, dtype=np.int32)
+    # Urut per bar awal: tiap chunk hanya butuh rentang bar yang berdekatan
+    order = np.flatnonzero(ok)
+    order = order[np.argsort(start[order], kind="stable")]
+    high, low, close = (np.asarray(ohlcv[k]) for k in ("high", "low", "close"))
+    per_chunk = max(1, CHUNK_CELLS // c)
+    tasks = []
+    for lo in range(0, len(order), per_chunk):
+        pick = order[lo:lo + per_chunk]
+        first, stop = int(start[pick[0]]), min(len(high), int(start[pick[-1]]) + max_bars)
+        sl_r = np.broadcast_to(grid_["sl"], (len(pick), c))
+        if spec["mode"] == "rr":
+            tp_r = sl_r * grid_["target"]
+        else:
+            tp_r = target[pick, None] * grid_["target"]
+        tasks.append((pick, (high[first:stop], low[first:stop], close[first:stop],
+                             start[pick] - first, trades["side"][pick], entry[pick], risk[pick],
+                             np.ascontiguousarray(sl_r), np.ascontiguousarray(tp_r), max_bars)))
+
+    def store(pick, part):
+        outcome[:, pick] = part["outcome"].T
+        pnl[:, pick] = part["pnl"].T
+        bars[:, pick] = part["bars"].T
+
+    if workers > 1 and len(tasks) > 1 and len(order) * c >= PARALLEL_CELLS:
+        # spawn: aman dipanggil dari thread server maupun dari proses job
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            for i, ((pick, _), part) in enumerate(zip(tasks, pool.map(_simulate_chunk, [a for _, a in tasks]))):
+                store(pick, part)
+                jobs.report(i + 1, len(tasks))
+    else:
+        for i, (pick, args) in enumerate(tasks):
+            store(pick, simulate(*args))
+            jobs.report(i + 1, len(tasks))
+
+    return {"sl": grid_["sl"], "target": grid_["target"], "time": trades["time"],
+            "outcome": outcome, "pnl": pnl, "bars": bars, "simulated": ok}
+
+
+def from_signals(arrays: Dict[str, np.ndarray], ohlcv: Dict[str, np.ndarray], spec: dict,
+                 max_bars: int = MAX_OPEN_BARS) -> Dict[str, np.ndarray]:
+    """``store`` derived builder body over the export's ``signals`` arrays
+    (fetched by the caller)."""
+    trades, _ = signals.split(arrays)
+    return run({k: np.asarray(v) for k, v in trades.items()}, ohlcv, spec, max_bars)
+
+
+def summary(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Per combination: counts, win rate, total/expectancy R and max drawdown (R)."""
+    outcome, pnl = np.asarray(arrays["outcome"]), np.asarray(arrays["pnl"])
+    ok = np.asarray(arrays["simulated"])
+    outcome, pnl = outcome[:, ok], pnl[:, ok]
+    # Drawdown pada urutan waktu entry
+    order = np.argsort(np.asarray(arrays["time"])[ok], kind="stable")
+    equity = np.cumsum(pnl[:, order], axis=1)
+    peak = np.maximum.accumulate(np.concatenate([np.zeros((len(pnl), 1)), equity], axis=1), axis=1)[:, 1:]
+    wins, losses = (outcome == WIN).sum(axis=1), (outcome == LOSS).sum(axis=1)
+    closed = wins + losses
+    total = pnl.sum(axis=1)
+    return {
+        "trades": np.full(len(pnl), pnl.shape[1]),
+        "wins": wins,
+        "losses": losses,
+        "open": pnl.shape[1] - closed,
+        "win_rate": np.where(closed > 0, wins / np.maximum(closed, 1), np.nan),
+        "total_r": total,
+        "expectancy_r": total / pnl.shape[1] if pnl.shape[1] else np.full(len(pnl), np.nan),
+        "max_drawdown_r": (peak - equity).max(axis=1) if pnl.shape[1] else np.zeros(len(pnl)),
+    }
+
+
+def payload(name: str, arrays: Dict[str, np.ndarray], spec: dict,
+            combo: Optional[int] = None) -> dict:
+    """Grid, per-combination summary and the (combos x trades) matrices
+    flattened combo-major (combination ``i`` is ``[i * count:(i + 1) * count]``);
+    with ``combo`` only that combination's rows."""
+    outcome, pnl = np.asarray(arrays["outcome"]), np.asarray(arrays["pnl"])
+    if combo is not None:
+        outcome, pnl = outcome[combo:combo + 1], pnl[combo:combo + 1]
+    return {
+        "export": name,
+        "mode": spec["mode"],
+        "combos": {"count": int(len(arrays["sl"])), "sl": np.asarray(arrays["sl"]),
+                   "target": np.asarray(arrays["target"])},
+        "summary": summary(arrays),
+        "combo": combo,
+        "trades": {"count": int(len(arrays["time"])), "time": np.asarray(arrays["time"]),
+                   "simulated": np.asarray(arrays["simulated"]).astype(np.uint8)},
+        "outcome": outcome.ravel(),
+        "pnl": pnl.ravel(),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from store import ColumnStore
+    from ingest import is_export, load_ohlcv
+
+    parser = argparse.ArgumentParser(description="Sweep SL/TP multipliers over an export's entries")
+    parser.add_argument("export", help="trade export CSV")
+    parser.add_argument("ohlcv", help="OHLCV CSV the trades were taken on")
+    parser.add_argument("--sl", help="stop multipliers, e.g. 0.5,1,1.5 (default 1)")
+    parser.add_argument("--rr", help="R:R targets, e.g. 1,2,3")
+    parser.add_argument("--tp", help="target multipliers (default 1)")
+    parser.add_argument("--max-bars", type=int, default=MAX_OPEN_BARS)
+    args = parser.parse_args(argv)
+
+    spec = grid(args.sl, args.rr, args.tp)
+    store = ColumnStore(dedup=is_export)
+    ohlcv_entry = store.entry(args.ohlcv)
+    entry = store.entry(args.export)
+    trades = entry.derived("signals", signals.signals_from_entry)
+    arrays = entry.derived(derived_name(ohlcv_entry, spec, args.max_bars),
+                           lambda e: from_signals(trades, load_ohlcv(ohlcv_entry), spec, args.max_bars))
+    stats = summary(arrays)
+    print(f"{'sl':>6} {spec['mode']:>6} {'win%':>6} {'total R':>9} {'exp R':>7} {'maxDD R':>8}")
+    for i in np.argsort(-stats["total_r"]):
+        print(f"{arrays['sl'][i]:>6.2f} {arrays['target'][i]:>6.2f} {stats['win_rate'][i] * 100:>6.1f} "
+              f"{stats['total_r'][i]:>9.2f} {stats['expectancy_r'][i]:>7.3f} {stats['max_drawdown_r'][i]:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
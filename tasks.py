@@ -0,0 +1,123 @@
+"""Heavy chart computations run as background ``jobs`` in worker processes.
+
+Each worker process opens its own ``ColumnStore`` over the shared cache/
+(builds are coordinated by the store's file locks), computes the columnar
+cache and derived artifacts, and returns only a small summary; the server
+then maps the finished files, so the API endpoints answer from cache.
+"""
+import os
+from typing import List, Optional
+
+import analytics
+import ingest
+import jobs
+import pyramid
+import replay
+import signals
+import sweep
+import trades
+from store import CACHE_DIR, DATA_DIR, ColumnStore
+
+_store: Optional[ColumnStore] = None
+
+
+def open_store(data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR) -> ColumnStore:
+    """Column store for data/: trade exports deduplicated per chunk, appends extended."""
+    store = ColumnStore(data_dir=data_dir, cache_dir=cache_dir, dedup=ingest.is_export)
+    store.extenders["ohlcv"] = ingest.extend_ohlcv
+    store.extenders["pyramid"] = pyramid.extend
+    store.extenders["signals"] = signals.extend
+    store.extenders[trades.INDEX_NAME] = trades.extend_index
+    return store
+
+
+def _worker_store() -> ColumnStore:
+    global _store
+    if _store is None:
+        _store = open_store()
+    return _store
+
+
+def source_key(paths: List[str]) -> list:
+    """Job cache key part: path, mtime and size of every source file."""
+    out = []
+    for path in paths:
+        st = os.stat(path)
+        out.append([os.path.normpath(path), st.st_mtime_ns, st.st_size])
+    return out
+
+
+def ingest_path(store: ColumnStore, path: str, first: int = 0, steps: int = 3) -> dict:
+    """Column cache plus the chart artifacts of one file (job steps ``first`` .. ``first + 2``)."""
+    jobs.step(first, steps, f"parsing {os.path.basename(path)}")
+    entry = store.entry(path)
+    kind = ingest.table_kind(entry.columns)
+    if kind == "ohlcv":
+        jobs.step(first + 1, steps, "converting candles")
+        ingest.load_ohlcv(entry)
+        jobs.step(first + 2, steps, "aggregating timeframes")
+        entry.derived("pyramid", pyramid.build)
+    elif kind == "trades":
+        jobs.step(first + 1, steps, "classifying trades")
+        entry.derived("signals", signals.signals_from_entry)
+        jobs.step(first + 2, steps, "computing analytics")
+        entry.derived("analytics", analytics.analytics_from_entry)
+        entry.derived(trades.INDEX_NAME, trades.build_index)
+    return {"rows": entry.rows, "columns": entry.columns, "kind": kind}
+
+
+def ingest_dataset(params: dict) -> dict:
+    """Job ``ingest``: ``{"dataset", "remove_on_error"}``."""
+    path = ingest.dataset_path(params["dataset"])
+    try:
+        return ingest_path(_worker_store(), path)
+    except jobs.Cancelled:
+        raise
+    except Exception:
+        # Upload yang gagal di-parse tidak dibiarkan di data/
+        if params.get("remove_on_error"):
+            os.remove(path)
+            _worker_store().sweep()
+        raise
+
+
+def prepare(params: dict) -> dict:
+    """Job ``prepare``: everything the chart page needs for ``{"ohlcv", "export"}``."""
+    names = [params["ohlcv"]] + ([params["export"]] if params.get("export") else [])
+    store = _worker_store()
+    out = {}
+    for i, name in enumerate(names):
+        info = ingest_path(store, ingest.dataset_path(name), first=3 * i, steps=3 * len(names))
+        out[name] = {"rows": info["rows"], "kind": info["kind"]}
+    return out
+
+
+def replay_export(params: dict) -> dict:
+    """Job ``replay``: replay ``export`` over ``ohlcv``; returns the mismatch summary."""
+    store = _worker_store()
+    jobs.step(0, 3, "loading candles")
+    ohlcv_entry = store.entry(ingest.dataset_path(params["ohlcv"]))
+    ohlcv = ingest.load_ohlcv(ohlcv_entry)
+    jobs.step(1, 3, "loading trades")
+    entry = store.entry(ingest.dataset_path(params["export"]))
+    jobs.step(2, 3, "replaying trades")
+    arrays = entry.derived(replay.derived_name(ohlcv_entry), lambda e: replay.replay_entry(e, ohlcv))
+    return replay.summary(arrays)
+
+
+def sweep_export(params: dict) -> dict:
+    """Job ``sweep``: SL/TP grid (``sl``, ``rr`` or ``tp``, ``max_bars``) over ``export``'s entries."""
+    spec = sweep.grid(params.get("sl"), params.get("rr"), params.get("tp"))
+    max_bars = sweep.check_max_bars(params.get("max_bars") or replay.MAX_OPEN_BARS)
+    store = _worker_store()
+    jobs.step(0, 3, "loading candles")
+    ohlcv_entry = store.entry(ingest.dataset_path(params["ohlcv"]))
+    ohlcv = ingest.load_ohlcv(ohlcv_entry)
+    jobs.step(1, 3, "loading trades")
+    entry = store.entry(ingest.dataset_path(params["export"]))
+    trades_ = entry.derived("signals", signals.signals_from_entry)
+    jobs.step(2, 3, "simulating exits")
+    arrays = entry.derived(sweep.derived_name(ohlcv_entry, spec, max_bars),
+                           lambda e: sweep.from_signals(trades_, ohlcv, spec, max_bars))
+    return {"combos": int(len(arrays["sl"])), "trades": int(len(arrays["time"])),
+            "simulated": int(arrays["simulated"].sum())}
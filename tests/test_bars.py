@@ -0,0 +1,150 @@
+"""``bars`` bucketing/aggregation and the ``pyramid`` levels, incl. append extenders."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bars
+import pyramid
+import tasks
+from ingest import OHLCV_FIELDS
+
+T0 = 1_704_067_200  # 2024-01-01 00:00 UTC, Senin
+
+
+def candles(n, interval=900, start=T0, seed=0, gaps=False):
+    rng = np.random.default_rng(seed)
+    step = np.full(n, interval, dtype=np.int64)
+    if gaps:
+        step[rng.random(n) < 0.05] *= rng.integers(2, 200)
+    time = start + np.cumsum(step) - interval
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[:1], close[:-1]]
+    spread = rng.random(n)
+    return {
+        "time": time.astype(np.int64),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.random(n) * 1000,
+    }
+
+
+def brute(cols, seconds):
+    """Agregasi per bucket dengan pandas sebagai pembanding."""
+    df = pd.DataFrame(cols)
+    df["bucket"] = bars.bucket_start(df["time"].to_numpy(), seconds)
+    g = df.groupby("bucket", sort=True)
+    out = g.agg(open=("open", "first"), high=("high", "max"), low=("low", "min"),
+                close=("close", "last"), volume=("volume", "sum")).reset_index()
+    return {"time": out["bucket"].to_numpy(), **{k: out[k].to_numpy() for k in OHLCV_FIELDS[1:]}}
+
+
+def assert_same(a, b):
+    for k in OHLCV_FIELDS:
+        np.testing.assert_allclose(a[k], b[k], err_msg=k)
+
+
+@pytest.mark.parametrize("seconds, expect", [
+    (bars.HOUR, T0 + 3 * bars.HOUR),
+    (4 * bars.HOUR, T0),
+    (bars.DAY, T0),
+    (bars.WEEK, T0),  # minggu mulai Senin
+])
+def test_bucket_start(seconds, expect):
+    assert bars.bucket_start(np.int64(T0 + 3 * bars.HOUR + 59 * 60), seconds) == expect
+
+
+def test_week_buckets_start_on_monday():
+    sunday_night = T0 + 6 * bars.DAY + 23 * bars.HOUR
+    got = bars.bucket_start(np.array([sunday_night, sunday_night + bars.HOUR]), bars.WEEK)
+    assert got.tolist() == [T0, T0 + bars.WEEK]
+    assert pd.to_datetime(got, unit="s").dayofweek.tolist() == [0, 0]
+
+
+@pytest.mark.parametrize("seconds", [bars.HOUR, 4 * bars.HOUR, bars.DAY, bars.WEEK, 3 * bars.DAY])
+def test_aggregate_matches_groupby(seconds):
+    cols = candles(5000, start=T0 + 7 * 900, gaps=True)
+    assert_same(bars.aggregate(cols, bars.bucket_start(cols["time"], seconds)), brute(cols, seconds))
+
+
+def test_aggregate_empty():
+    cols = candles(0)
+    assert all(len(v) == 0 for v in bars.aggregate(cols, cols["time"]).values())
+
+
+def test_window_is_inclusive():
+    cols = candles(100)
+    got = bars.window(cols, T0 + 900, T0 + 3 * 900)
+    assert got["time"].tolist() == [T0 + 900, T0 + 1800, T0 + 2700]
+    assert len(bars.window(cols, T0 + 1, T0 + 899)["time"]) == 0
+
+
+def test_downsample_bounds_bars():
+    cols = candles(20000, gaps=True)
+    out, size = bars.downsample(cols, 500)
+    assert size in bars.BUCKET_LADDER and size > 900
+    assert 0 < len(out["time"]) <= 500
+    assert_same(out, brute(cols, size))
+    same, interval = bars.downsample(cols, 20000)
+    assert interval == 0 and same is cols
+
+
+def test_pick_bucket():
+    assert bars.pick_bucket(bars.DAY, 24) == bars.HOUR
+    assert bars.pick_bucket(bars.DAY, 25) == bars.HOUR
+    assert bars.pick_bucket(bars.DAY, 1000, minimum=900) == 30 * bars.MINUTE
+    assert bars.pick_bucket(1000 * 52 * bars.WEEK, 10) == 100 * 52 * bars.WEEK
+
+
+def write_csv(path, cols, mode="w"):
+    df = pd.DataFrame({"timestamp": cols["time"], **{k: cols[k] for k in OHLCV_FIELDS[1:]}})
+    df.to_csv(path, index=False, mode=mode, header=mode == "w")
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    return str(data), str(tmp_path / "cache")
+
+
+def test_pyramid_levels(dirs):
+    data, cache = dirs
+    cols = candles(3000, start=T0 + 5 * 900, gaps=True)
+    path = os.path.join(data, "bars.csv")
+    write_csv(path, cols)
+    arrays = tasks.open_store(data, cache).entry(path).derived("pyramid", pyramid.build)
+    levels = pyramid.Pyramid(cols, arrays)
+    assert levels.timeframes == ["15m", "1h", "4h", "1d", "1w"]
+    for label in levels.labels:
+        assert_same(levels.level(label), brute(cols, pyramid.TIMEFRAMES[label]))
+
+
+def test_pyramid_extend_after_append(dirs):
+    data, cache = dirs
+    cols = candles(4000, seed=3)
+    # potong di tengah bucket 1h/4h/1d/1w: bucket terakhir harus dihitung ulang
+    cut = 2000 + 2
+    path = os.path.join(data, "bars.csv")
+    write_csv(path, {k: v[:cut] for k, v in cols.items()})
+    store = tasks.open_store(data, cache)
+    store.entry(path).derived("pyramid", pyramid.build)
+
+    write_csv(path, {k: v[cut:] for k, v in cols.items()}, mode="a")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    entry = store.entry(path)
+    assert entry.meta.get("appended_from") == cut
+    assert entry.has_derived("pyramid")  # dibawa extender, bukan dibangun ulang
+    extended = entry.derived("pyramid", pyramid.build)
+    fresh = pyramid.build(entry)
+    assert extended.keys() == fresh.keys()
+    for k in fresh:
+        np.testing.assert_allclose(extended[k], fresh[k], err_msg=k)
+    levels = pyramid.Pyramid(cols, extended)
+    assert levels.labels == ["1h", "4h", "1d", "1w"]
+    for label in levels.labels:
+        assert_same(levels.level(label), brute(cols, pyramid.TIMEFRAMES[label]))
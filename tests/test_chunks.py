@@ -0,0 +1,109 @@
+"""``chunks.ChunkStore``: aligned packs, dedup and reuse of chunks across packs."""
+import os
+
+import numpy as np
+
+import chunks
+from chunks import ALIGN, ChunkStore, cut_points
+
+
+def table(n, seed=0):
+    rng = np.random.default_rng(seed)
+    time = np.cumsum(rng.integers(1, 900, n)).astype(np.int64)
+    return {
+        "time": time,
+        "side": rng.integers(0, 2, n).astype(np.int8),
+        "bin": rng.integers(0, 7, n).astype(np.int32),
+        "price": rng.normal(100, 5, n),
+    }
+
+
+def pack(store, cols, starts):
+    return store.pack(list(cols.items()), starts)
+
+
+def offsets(store):
+    store._refresh()
+    return [(pack, offset) for pack, offset, _ in store._index.values()]
+
+
+def test_every_chunk_is_aligned(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    cols = table(1000)
+    # chunk 3 baris: int8/int32 berakhir di byte ganjil sebelum chunk float64 berikutnya
+    starts = np.array([0, 3, 10, 501, 997], dtype=np.int64)
+    refs = pack(store, cols, starts)
+    assert all(offset % ALIGN == 0 for _, offset in offsets(store))
+    for name, arr in cols.items():
+        loaded = store.load(refs[name], arr.dtype)
+        assert np.array_equal(loaded, arr)
+        assert all(r[2] % ALIGN == 0 for r in refs[name])
+
+
+def test_identical_table_reuses_chunks(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    cols = table(5000)
+    starts = cut_points(cols["time"], 5000)
+    first = pack(store, cols, starts)
+    packs = sorted(os.listdir(tmp_path))
+    again = pack(store, cols, starts)
+    assert again == first
+    assert sorted(os.listdir(tmp_path)) == packs  # tidak ada pack baru
+
+    # store baru (proses lain) membaca index dari disk
+    other = ChunkStore(str(tmp_path))
+    assert pack(other, cols, starts) == first
+
+
+def test_edit_only_stores_changed_chunks(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    cols = table(20000)
+    first = pack(store, cols, cut_points(cols["time"], 20000))
+
+    # sisipkan satu trade di tengah: hanya chunk di sekitarnya yang berubah
+    at = 10000
+    edited = {k: np.insert(v, at, v[at]) for k, v in cols.items()}
+    starts = cut_points(edited["time"], 20001)
+    second = pack(store, edited, starts)
+    for name, arr in edited.items():
+        assert np.array_equal(store.load(second[name], arr.dtype), arr)
+        old = {r[0] for r in first[name]}
+        fresh = [r for r in second[name] if r[0] not in old]
+        assert 1 <= len(fresh) <= 2
+        assert len(fresh) < len(second[name]) // 10
+        # chunk lama tetap di pack lama
+        assert {r[1] for r in second[name] if r[0] in old} == {first[name][0][1]}
+
+
+def test_cut_points_follow_content():
+    key = table(50000)["time"]
+    starts = cut_points(key, len(key))
+    sizes = np.diff(np.r_[starts, len(key)])
+    assert starts[0] == 0
+    assert sizes.min() >= chunks.MIN_ROWS or len(sizes) == 1
+    assert sizes.max() <= chunks.MAX_ROWS
+    # buang 5 baris pertama: batas sesudahnya tetap sama (digeser)
+    shifted = cut_points(key[5:], len(key) - 5)
+    assert set((starts[2:] - 5).tolist()) <= set(shifted.tolist())
+
+
+def test_take_matches_load(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    cols = table(3000)
+    refs = pack(store, cols, cut_points(cols["time"], 3000))
+    rows = np.array([2999, 0, 17, 1500, 17, 2048])
+    for name, arr in cols.items():
+        assert np.array_equal(store.take(refs[name], arr.dtype, rows), arr[rows])
+
+
+def test_reuses_chunks_of_collected_pack_only_when_present(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    cols = table(2000)
+    starts = cut_points(cols["time"], 2000)
+    first = pack(store, cols, starts)
+    old = first["time"][0][1]
+    assert store.collect([], min_age=0) == [old]
+    second = pack(store, cols, starts)
+    assert {r[1] for refs in second.values() for r in refs} != {old}
+    for name, arr in cols.items():
+        assert np.array_equal(store.load(second[name], arr.dtype), arr)
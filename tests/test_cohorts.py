@@ -0,0 +1,77 @@
+"""``cohorts`` pivots against pandas and the memo bound."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cohorts
+import tasks
+
+T0 = 1_700_000_000
+
+
+@pytest.fixture
+def export(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        "timestamp": T0 + 900 * np.arange(n),
+        "signal": rng.choice(["buy", "sell"], n),
+        "outcome": rng.choice(["TP", "SL", "BE"], n),
+        "pnl": rng.normal(0, 10, n).round(2),
+        "rsi_bin": rng.choice(["lo", "mid", "hi", ""], n),
+        "hour_utc": rng.integers(0, 4, n),
+    })
+    data = tmp_path / "data"
+    data.mkdir()
+    path = os.path.join(data, "run_export.csv")
+    df.to_csv(path, index=False)
+    store = tasks.open_store(str(data), str(tmp_path / "cache"))
+    cohorts._memo.clear()
+    cohorts._memo_bytes = 0
+    yield store.entry(path), pd.read_csv(path, keep_default_na=False)
+    cohorts._memo.clear()
+    cohorts._memo_bytes = 0
+
+
+def test_pivot_matches_crosstab(export):
+    entry, df = export
+    result = cohorts.pivot(entry, ("rsi_bin", "hour_utc"))
+    payload = result["payload"]
+    rsi, hours = payload["labels"]
+    df["rsi_bin"] = df["rsi_bin"].replace("", None)
+    want = pd.crosstab(df["rsi_bin"].fillna("<null>"), df["hour_utc"])
+    for i, label in enumerate(rsi):
+        for j, hour in enumerate(hours):
+            assert payload["trades"][i][j] == want.loc["<null>" if label is None else label, hour]
+    assert payload["total"]["trades"] == len(df)
+    # BE jatuh ke tanda pnl (kaskade signals.classify)
+    wins = (df["outcome"] == "TP") | ((df["outcome"] == "BE") & (df["pnl"] > 0))
+    assert payload["total"]["wins"] == int(wins.sum())
+    assert result["cell"].dtype == np.int32
+
+    picked = cohorts.cell_trades(result, [rsi.index("mid"), hours.index(2)])
+    expect = np.flatnonzero(((df["rsi_bin"] == "mid") & (df["hour_utc"] == 2)).to_numpy())
+    assert picked.tolist() == expect.tolist()
+
+
+def test_where_filter(export):
+    entry, df = export
+    payload = cohorts.pivot(entry, ("signal",), cohorts.parse_where("rsi_bin:hi|lo"))["payload"]
+    sub = df[df["rsi_bin"].isin(["hi", "lo"])]
+    assert dict(zip(payload["labels"][0], payload["trades"])) == sub["signal"].value_counts().to_dict()
+
+
+def test_memo_bounded_by_bytes(export, monkeypatch):
+    entry, _ = export
+    first = cohorts.pivot(entry, ("rsi_bin",))
+    assert cohorts.pivot(entry, ("rsi_bin",)) is first
+    assert cohorts._memo_bytes == sum(size for _, size in cohorts._memo.values())
+    # tiap pivot menahan kode grup + cell per trade: batas kecil menggusur yang lama
+    monkeypatch.setattr(cohorts, "MEMO_BYTES", 3 * 500 * 4)
+    cohorts.pivot(entry, ("hour_utc",))
+    cohorts.pivot(entry, ("signal",))
+    assert cohorts._memo_bytes <= cohorts.MEMO_BYTES
+    assert cohorts._memo_bytes == sum(size for _, size in cohorts._memo.values())
+    assert cohorts.pivot(entry, ("rsi_bin",)) is not first
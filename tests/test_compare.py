@@ -0,0 +1,31 @@
+"""``compare`` worker pool sizing."""
+import pytest
+
+import compare
+
+
+@pytest.mark.parametrize("cpus, servers, configured, expect", [
+    (8, None, None, 8),
+    (8, "4", None, 2),
+    (8, "16", None, 1),
+    (None, "2", None, 1),
+    (8, "4", "3", 3),
+    (8, None, "0", 1),
+])
+def test_pool_size(monkeypatch, cpus, servers, configured, expect):
+    monkeypatch.setattr(compare.os, "cpu_count", lambda: cpus)
+    for name, value in (("CHART_WORKERS", servers), ("CHART_COMPARE_WORKERS", configured)):
+        if value is None:
+            monkeypatch.delenv(name, raising=False)
+        else:
+            monkeypatch.setenv(name, value)
+    assert compare.pool_size() == expect
+
+
+def test_shutdown_drops_pool(monkeypatch):
+    monkeypatch.setenv("CHART_COMPARE_WORKERS", "1")
+    pool = compare._pool()
+    assert compare._pool() is pool and pool._max_workers == 1
+    compare.shutdown()
+    assert compare._executor is None
+    compare.shutdown()
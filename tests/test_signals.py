@@ -0,0 +1,159 @@
+"""``signals.classify`` / ``signals.markers`` against the chart page's JS cascade."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import signals
+import store
+from signals import BUY, LOSS, NONE, PROFIT, SELL
+
+T0 = 1_700_000_000
+
+
+def classify(**columns):
+    n = max(len(v) for v in columns.values())
+    columns.setdefault("timestamp", [T0 + 900 * i for i in range(n)])
+    return signals.classify(pd.DataFrame(columns))
+
+
+@pytest.mark.parametrize("outcome, result", [
+    ("SL", LOSS), ("loss", LOSS), (" Lost ", LOSS), ("-1", LOSS),
+    ("TP", PROFIT), ("win", PROFIT), ("take_profit", PROFIT), ("Profit", PROFIT), ("1", PROFIT),
+    ("BE", NONE), ("", NONE),
+])
+def test_outcome_strings(outcome, result):
+    assert classify(outcome=[outcome])["result"].tolist() == [result]
+
+
+def test_outcome_beats_pnl_and_prices():
+    got = classify(outcome=["TP", "SL"], pnl=[-1.0, 2.0], entry_price=[100, 100], exit_price=[90, 110])
+    assert got["result"].tolist() == [PROFIT, LOSS]
+
+
+def test_numeric_outcome_column():
+    assert classify(outcome=[1, -1, 0])["result"].tolist() == [PROFIT, LOSS, NONE]
+
+
+def test_pnl_sign():
+    got = classify(outcome=["", "BE", "", ""], pnl=[2.5, -0.1, 0.0, np.nan])
+    assert got["result"].tolist() == [PROFIT, LOSS, NONE, NONE]
+
+
+@pytest.mark.parametrize("side, exit_price, result", [
+    ("buy", 110, PROFIT), ("buy", 90, LOSS), ("long", 110, PROFIT),
+    ("sell", 110, LOSS), ("sell", 90, PROFIT), ("SHORT", 90, PROFIT), ("buy", 100, NONE),
+])
+def test_exit_vs_entry_by_side(side, exit_price, result):
+    got = classify(signal=[side], entry_price=[100.0], exit_price=[exit_price])
+    assert got["result"].tolist() == [result]
+    assert got["side"].tolist() == [SELL if side.lower() in ("sell", "short") else BUY]
+
+
+def test_sl_tp_distance():
+    got = classify(exit_price=[109, 91, 100], sl=[90, 90, 90], tp=[110, 110, 110])
+    assert got["result"].tolist() == [PROFIT, LOSS, NONE]
+
+
+def test_text_fields_take_first_non_empty():
+    # ``row.outcome || row.result``, ``row.signal || row.side || 'buy'``
+    got = classify(outcome=["", np.nan, "BE"], result=["WIN", "SL", "TP"],
+                   signal=["", "sell", np.nan], side=["sell", "buy", ""])
+    assert got["result"].tolist() == [PROFIT, LOSS, NONE]
+    assert got["side"].tolist() == [SELL, SELL, BUY]
+
+
+def test_number_fields_take_first_present_column():
+    # ``Number(row.entry_price ?? row.price)``: empty cell is 0, no fallthrough
+    got = classify(entry_price=[np.nan, 100.0], price=[100.0, 50.0], sl=[""] * 2)
+    assert got["entry"].tolist() == [0.0, 100.0]
+    assert got["sl"].tolist() == [0.0, 0.0]
+    # kolom tidak ada -> alias berikutnya
+    got = classify(price=[100.0], stop_loss=[95.0])
+    assert got["entry"].tolist() == [100.0]
+    assert got["sl"].tolist() == [95.0]
+    assert np.isnan(got["tp"]).all() and np.isnan(got["exit"]).all()
+
+
+def test_empty_pnl_counts_as_zero():
+    # Number("") === 0: bukan NaN, jadi tidak untung/rugi, lanjut ke harga
+    got = classify(pnl=[np.nan], entry_price=[100.0], exit_price=[90.0])
+    assert got["result"].tolist() == [LOSS]
+
+
+@pytest.mark.parametrize("column, values", [
+    ("timestamp", [T0 * 1000, (T0 + 60) * 1000]),
+    ("timestamp", [T0, T0 + 60]),
+    ("datetime", ["2023-11-14T22:13:20Z", "2023-11-14 22:14:20"]),
+    ("time", [float(T0), T0 + 60.0]),
+])
+def test_times(column, values):
+    got = signals.classify(pd.DataFrame({column: values, "outcome": ["TP", "SL"]}))
+    assert got["time"].tolist() == [T0, T0 + 60]
+
+
+def test_rows_without_time_are_dropped():
+    got = signals.classify(pd.DataFrame({"Timestamp ": [T0, np.nan, 0, T0 + 60],
+                                         "Outcome": ["TP", "TP", "TP", "SL"]}))
+    assert got["row"].tolist() == [0, 3]
+    assert got["result"].tolist() == [PROFIT, LOSS]
+
+
+def test_time_aliases_take_first_non_empty():
+    got = signals.classify(pd.DataFrame({"datetime": ["", "2023-11-14T22:13:20Z"],
+                                         "timestamp": [T0 + 60, T0 + 120]}))
+    assert got["time"].tolist() == [T0 + 60, T0]
+
+
+def test_style_ids():
+    entry_ids = [signals.style_id(signals.ENTRY, s, r) for s in (BUY, SELL) for r in (LOSS, NONE, PROFIT)]
+    assert entry_ids == list(range(6))
+    assert [signals.style_id(k, s, NONE) for k in (signals.SL, signals.TP) for s in (BUY, SELL)] == [6, 7, 8, 9]
+    assert [signals.STYLES[i]["text"] for i in range(6)] == [
+        "LOSS BUY", "ENTRY BUY", "TP BUY", "LOSS SELL", "ENTRY SELL", "TP SELL"]
+    assert [(s["type"], s["side"], s["shape"]) for s in signals.STYLES[6:]] == [
+        ("sl", "buy", "arrowDown"), ("sl", "sell", "arrowUp"),
+        ("tp", "buy", "arrowUp"), ("tp", "sell", "arrowDown")]
+
+
+def test_markers():
+    trades = classify(timestamp=[T0 + 900, T0, T0 + 900], signal=["buy", "sell", "sell"],
+                      outcome=["TP", "SL", ""], entry_price=[100.0, 200.0, 300.0],
+                      sl=[95.0, 210.0, 290.0], tp=[110.0, 180.0, 320.0])
+    marks = signals.markers(trades)
+    # urut waktu, lalu (trade, entry/sl/tp)
+    assert marks["trade"].tolist() == [1, 1, 1, 0, 0, 0, 2, 2, 2]
+    assert marks["time"].tolist() == [T0] * 3 + [T0 + 900] * 6
+    assert marks["price"].tolist() == [200.0, 210.0, 180.0, 100.0, 95.0, 110.0, 300.0, 290.0, 320.0]
+    assert marks["style"].tolist() == [3, 7, 9, 2, 6, 8, 4, 7, 9]
+
+
+def test_markers_skip_missing_levels():
+    # tanpa kolom sl/tp hanya marker entry; sel kosong di kolom yang ada bernilai 0
+    marks = signals.markers(classify(entry_price=[100.0], tp=[np.nan]))
+    assert marks["price"].tolist() == [100.0, 0.0]
+    assert marks["style"].tolist() == [1, 8]
+
+
+def test_entry_index_keeps_one_version_per_ohlcv(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    export, ohlcv = data / "trades.csv", data / "bars.csv"
+    export.write_text("timestamp,signal\n1700000000,buy\n")
+    ohlcv.write_text("timestamp,close\n1700000000,1\n")
+    columns = store.ColumnStore(str(data), str(tmp_path / "cache"))
+    entry = columns.entry(str(export))
+    first = signals.index_name(columns.entry(str(ohlcv)))
+    entry.derived(first, lambda e: {"x": np.arange(3)})
+
+    with open(ohlcv, "a") as f:
+        f.write("1700000900,2\n")
+    st = os.stat(ohlcv)
+    os.utime(ohlcv, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    second = signals.index_name(columns.entry(str(ohlcv)))
+    assert second != first
+    entry.derived(second, lambda e: {"x": np.arange(4)})
+    derived = os.listdir(os.path.join(entry.dir, "derived"))
+    assert [d for d in derived if d.startswith("entry_index") and "." not in d] == [second]
+    assert not entry.has_derived(first)
@@ -0,0 +1,119 @@
+"""``sweep`` SL/TP simulation against a bar-by-bar loop."""
+import numpy as np
+import pytest
+
+import sweep
+from signals import BUY, SELL
+
+
+def brute(high, low, close, start, side, entry, risk, sl_r, tp_r, max_bars):
+    n, c = sl_r.shape
+    outcome = np.zeros((n, c), dtype=np.int8)
+    pnl = np.empty((n, c))
+    held = np.empty((n, c), dtype=np.int32)
+    for i in range(n):
+        length = min(max_bars, len(high) - start[i])
+        sign = 1 if side[i] == BUY else -1
+        for k in range(c):
+            stop = entry[i] - sign * sl_r[i, k] * risk[i]
+            target = entry[i] + sign * tp_r[i, k] * risk[i]
+            result = None
+            for j in range(length):
+                bar = start[i] + j
+                hit_sl = low[bar] <= stop if sign == 1 else high[bar] >= stop
+                hit_tp = high[bar] >= target if sign == 1 else low[bar] <= target
+                if hit_sl:  # SL dan TP di bar yang sama -> loss
+                    result = (sweep.LOSS, -sl_r[i, k], j)
+                elif hit_tp:
+                    result = (sweep.WIN, tp_r[i, k], j)
+                if result:
+                    break
+            if result is None:
+                last = close[start[i] + length - 1]
+                result = (sweep.OPEN, sign * (last - entry[i]) / risk[i], length - 1)
+            outcome[i, k], pnl[i, k], held[i, k] = result
+    return {"outcome": outcome, "pnl": pnl, "bars": held}
+
+
+def path(bars, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, bars))
+    open_ = np.r_[close[:1], close[:-1]]
+    high = np.maximum(open_, close) + rng.random(bars)
+    low = np.minimum(open_, close) - rng.random(bars)
+    return high, low, close
+
+
+@pytest.mark.parametrize("seed, max_bars, batch", [(0, 50, sweep.BATCH_BARS), (1, 7, 30), (2, 400, 1000)])
+def test_simulate_matches_loop(monkeypatch, seed, max_bars, batch):
+    monkeypatch.setattr(sweep, "BATCH_BARS", batch)
+    rng = np.random.default_rng(seed)
+    bars, n = 600, 80
+    high, low, close = path(bars, seed)
+    # sebagian entry dekat ujung data: path terpotong sebelum max_bars
+    start = np.r_[rng.integers(0, bars - 1, n - 3), [bars - 1, bars - 2, bars - 5]]
+    side = rng.choice([BUY, SELL], n).astype(np.int8)
+    entry = close[start] + rng.normal(0, 0.3, n)
+    risk = rng.uniform(0.5, 4, n)
+    grid = sweep.combos({"sl": [0.5, 1.0, 2.0], "target": [0.5, 1.5, 3.0]})
+    sl_r = np.ascontiguousarray(np.broadcast_to(grid["sl"], (n, 9)))
+    tp_r = sl_r * grid["target"]
+    args = (high, low, close, start, side, entry, risk, sl_r, tp_r, max_bars)
+    got, want = sweep.simulate(*args), brute(*args)
+    assert np.array_equal(got["outcome"], want["outcome"])
+    assert np.array_equal(got["bars"], want["bars"])
+    np.testing.assert_allclose(got["pnl"], want["pnl"])
+    assert (want["outcome"] == sweep.OPEN).any() and (want["outcome"] == sweep.WIN).any()
+
+
+def test_first_at_least_matches_loop():
+    rng = np.random.default_rng(3)
+    running = np.maximum.accumulate(rng.normal(0, 2, (40, 30)), axis=1)
+    running[5] = -np.inf
+    levels = rng.uniform(0.01, 6, (40, 4))
+    got = sweep._first_at_least(running, levels)
+    for i in range(40):
+        for k in range(4):
+            hits = np.flatnonzero(running[i] >= levels[i, k])
+            assert got[i, k] == (hits[0] if len(hits) else 30)
+
+
+def test_run_skips_uncovered_and_chunks(monkeypatch):
+    monkeypatch.setattr(sweep, "CHUNK_CELLS", 20)
+    high, low, close = path(300, 4)
+    bar_time = 1_700_000_000 + 900 * np.arange(300, dtype=np.int64)
+    rng = np.random.default_rng(4)
+    n = 40
+    time = np.sort(rng.choice(bar_time[:-1], n, replace=False)) + 60
+    time[0] = bar_time[0] - 900  # sebelum data OHLCV
+    start = np.searchsorted(bar_time, time, side="right") - 1
+    side = rng.choice([BUY, SELL], n).astype(np.int8)
+    entry = close[np.maximum(start, 0)]
+    sign = np.where(side == BUY, 1, -1)
+    trades = {"time": time, "side": side, "entry": entry,
+              "sl": entry - sign * 2.0, "tp": entry + sign * 3.0}
+    trades["sl"][3] = entry[3]  # risk 0 -> tidak disimulasikan
+    spec = {"mode": "tp", "sl": [1.0, 2.0], "target": [0.5, 1.0]}
+    got = sweep.run(trades, {"time": bar_time, "high": high, "low": low, "close": close},
+                    spec, max_bars=60, workers=1)
+    ok = np.ones(n, dtype=bool)
+    ok[[0, 3]] = False
+    assert np.array_equal(got["simulated"], ok)
+    assert (got["outcome"][:, ~ok] == sweep.OPEN).all() and np.isnan(got["pnl"][:, ~ok]).all()
+
+    grid = sweep.combos(spec)
+    sl_r = np.broadcast_to(grid["sl"], (ok.sum(), 4))
+    tp_r = 1.5 * np.broadcast_to(grid["target"], (ok.sum(), 4))
+    want = brute(high, low, close, start[ok], side[ok], entry[ok], np.full(ok.sum(), 2.0),
+                 sl_r, tp_r, 60)
+    assert np.array_equal(got["outcome"][:, ok], want["outcome"].T)
+    np.testing.assert_allclose(got["pnl"][:, ok], want["pnl"].T)
+    assert np.array_equal(got["bars"][:, ok], want["bars"].T)
+
+
+def test_grid_validation():
+    assert sweep.grid("1,0.5,1", "2") == {"mode": "rr", "sl": [0.5, 1.0], "target": [2.0]}
+    assert sweep.grid(tp="1.5")["mode"] == "tp"
+    for bad in [("0",), ("a",), ("1", "2", "3"), (",".join(map(str, range(1, 30))), ",".join(map(str, range(1, 30))))]:
+        with pytest.raises(sweep.BadGrid):
+            sweep.grid(*bad)
@@ -0,0 +1,119 @@
+"""``trades`` time index and ``page`` cursor paging."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tasks
+import trades
+
+T0 = 1_700_000_000
+
+
+def index(times):
+    """Index seperti ``build_index``: urut waktu, tie urut baris."""
+    times = np.asarray(times, dtype=np.int64)
+    order = np.argsort(times, kind="stable")
+    return {"entry.time": times[order], "entry.row": order.astype(np.int64)}
+
+
+def walk(idx, limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        got = trades.page(idx, limit=limit, cursor=cursor, **kwargs)
+        pages.append(got)
+        cursor = got["next"]
+        if cursor is None:
+            return pages
+
+
+def brute(times, start=None, end=None):
+    return [r for r, t in sorted(enumerate(times), key=lambda p: (p[1], p[0]))
+            if (start is None or t >= start) and (end is None or t < end)]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50, 1000])
+def test_pages_cover_ties_once(limit):
+    rng = np.random.default_rng(limit)
+    # banyak trade berbagi timestamp yang sama
+    times = (T0 + 900 * rng.integers(0, 30, 200)).tolist()
+    idx = index(times)
+    pages = walk(idx, limit)
+    rows = np.concatenate([p["rows"] for p in pages]).tolist()
+    assert rows == brute(times)
+    assert all(len(p["rows"]) <= limit for p in pages)
+    assert all(p["total"] == len(times) for p in pages)
+    for p in pages[:-1]:
+        assert p["next"] == f"{p['time'][-1]}_{p['rows'][-1]}"
+
+
+@pytest.mark.parametrize("limit", [1, 4, 25])
+def test_pages_within_range(limit):
+    rng = np.random.default_rng(7)
+    times = (T0 + 900 * rng.integers(0, 40, 300)).tolist()
+    start, end = T0 + 900 * 10, T0 + 900 * 20
+    pages = walk(index(times), limit, start=start, end=end)
+    rows = np.concatenate([p["rows"] for p in pages]).tolist()
+    assert rows == brute(times, start, end)
+    assert pages[0]["total"] == len(rows)
+    times_out = np.concatenate([p["time"] for p in pages])
+    assert times_out.min() >= start and times_out.max() < end
+
+
+def test_cursor_stable_across_appends():
+    times = [T0, T0, T0, T0 + 60, T0 + 60]
+    first = trades.page(index(times), limit=2)
+    assert first["rows"].tolist() == [0, 1] and first["next"] == f"{T0}_1"
+    # baris baru dengan timestamp yang sama masuk sesudah baris lama (tie by row)
+    times += [T0, T0 + 30]
+    rest = trades.page(index(times), limit=100, cursor=first["next"])
+    assert rest["rows"].tolist() == [2, 5, 6, 3, 4]
+    assert rest["next"] is None
+
+
+def test_empty_and_last_page():
+    idx = index([T0, T0 + 60])
+    assert trades.page(idx, start=T0 + 61)["rows"].tolist() == []
+    last = trades.page(idx, limit=2)
+    assert last["next"] is None
+    assert trades.page(idx, cursor=f"{T0 + 60}_1")["rows"].tolist() == []
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", "1_2_3", "1.5_2", "_"])
+def test_bad_cursor(cursor):
+    with pytest.raises(trades.BadCursor):
+        trades.page(index([T0]), cursor=cursor)
+
+
+def write_export(path, times, mode="w"):
+    df = pd.DataFrame({"timestamp": times, "signal": "buy", "outcome": "TP",
+                       "close_ts": [t + 3600 for t in times]})
+    df.to_csv(path, index=False, mode=mode, header=mode == "w")
+
+
+def test_index_extends_after_append(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    path = os.path.join(data, "run_export.csv")
+    head = [T0 + 60 * (i // 3) for i in range(300)]
+    write_export(path, head)
+    store = tasks.open_store(str(data), str(tmp_path / "cache"))
+    store.entry(path).derived(trades.INDEX_NAME, trades.build_index)
+
+    # baris susulan: sebagian lebih awal dari baris terakhir -> urut ulang
+    tail = [T0 + 60 * 99, T0, T0 + 60 * 200]
+    write_export(path, tail, mode="a")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    entry = store.entry(path)
+    assert entry.meta.get("appended_from") == len(head)
+    extended = entry.derived(trades.INDEX_NAME, trades.build_index)
+    fresh = trades.build_index(entry)
+    for k in fresh:
+        assert np.array_equal(extended[k], fresh[k]), k
+    rows = np.concatenate([p["rows"] for p in walk(extended, 7)]).tolist()
+    assert rows == brute(head + tail)
+    close = trades.page(extended, by="close", start=T0 + 3600, end=T0 + 3660)
+    assert close["rows"].tolist() == [0, 1, 2, 301]
+    assert trades.column_values(entry, "timestamp", close["rows"]) == [T0] * 4